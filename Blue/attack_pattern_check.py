@@ -1,8 +1,9 @@
 import os
 import json
 import re
-import openai
 from pathlib import Path
+from Utils.jsun import load_json, resolve_json_path
+from Utils.llm_client import chat_completion
 
 # Set up base directory and important paths
 BASE_DIR = Path(__file__).resolve().parent
@@ -12,8 +13,7 @@ LOGS_PATH = BASE_DIR.parent / "logs"
 # Query the OpenAI LLM with a prompt and return the response as a string
 def query_openai(prompt: str, model: str = "gpt-4o-mini", temperature: float = 0.7) -> str:
     try:
-        openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = openai_client.chat.completions.create(
+        response = chat_completion(
             model=model,
             messages=[{"role": "user", "content": prompt}],
             temperature=temperature,
@@ -58,13 +58,12 @@ def load_all_previous_sequences(experiment_dir):
     experiment_path = Path(experiment_dir)
 
     for config_folder in experiment_path.glob("hp_config_*"):
-        sessions_file = config_folder / "sessions.json"
-        if not sessions_file.exists():
+        sessions_file = resolve_json_path(config_folder / "sessions.json")
+        if sessions_file is None:
             print(f"Skipping {config_folder}: sessions.json not found.")
             continue
         try:
-            with open(sessions_file, "r", encoding="utf8") as f:
-                sessions = json.load(f)
+            sessions = load_json(sessions_file)
         except Exception as e:
             print(f"Failed to load or parse {sessions_file}: {e}")
             continue
@@ -0,0 +1,97 @@
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from Utils.jsun import load_json, save_json_to_file
+
+class ConfigPool:
+    '''
+        Honeypot configurations prepared ahead of time, so a reconfiguration only has to
+        look one up. A background thread generates configurations with generate (by
+        default generate_new_honeypot_config) until the pool holds size of them.
+
+        Configurations are saved to the config_pool folder of the experiment and loaded
+        again when the experiment is resumed.
+    '''
+    def __init__(self, experiment_path, size: int,
+            generate: Callable[[Path], Tuple[str, Dict[str, Any]]] = None, retry_delay: float = 10.0):
+        self.experiment_path = Path(experiment_path)
+        self.path = self.experiment_path / "config_pool"
+        self.size = size
+        self.generate = generate
+        self.retry_delay = retry_delay
+        self.configs: Dict[str, Dict[str, Any]] = {}
+        self.failures = 0
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.load()
+
+    def load(self):
+        for config_path in sorted(self.path.glob("config_*.json")):
+            self.configs[config_path.stem[len("config_"):]] = load_json(config_path)
+
+    def ids(self) -> List[str]:
+        with self.condition:
+            return list(self.configs)
+
+    def get(self, config_id: str) -> Dict[str, Any]:
+        with self.condition:
+            return self.configs[config_id]
+
+    def add(self, honeypot_config: Dict[str, Any]) -> str:
+        """
+        Add a configuration and return its ID in the pool, the ID of the configuration
+        unless another configuration already has it.
+        """
+        with self.condition:
+            for existing_id, existing in self.configs.items():
+                if existing == honeypot_config:
+                    return existing_id
+            config_id = str(honeypot_config.get("id", len(self.configs)))
+            base_id, i = config_id, 1
+            while config_id in self.configs:
+                config_id = f"{base_id}_{i}"
+                i += 1
+            self.configs[config_id] = honeypot_config
+            save_json_to_file(honeypot_config, self.path / f"config_{config_id}.json", False)
+            self.condition.notify_all()
+            return config_id
+
+    def wait_for(self, num_configs: int, timeout: float = None) -> bool:
+        """
+        Wait until the pool holds num_configs configurations, return whether it does.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: len(self.configs) >= num_configs, timeout)
+
+    def start(self):
+        """
+        Start filling the pool in the background.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._fill, name="config-pool", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """
+        Stop filling the pool, a configuration being generated is still added.
+        """
+        self.stopped.set()
+
+    def _fill(self):
+        if self.generate is None:
+            from Blue.new_config_pipeline import generate_new_honeypot_config
+            self.generate = generate_new_honeypot_config
+        while not self.stopped.is_set() and len(self.ids()) < self.size:
+            try:
+                config_id, honeypot_config = self.generate(self.experiment_path)
+            except Exception as e:
+                print(f"Could not generate a configuration for the pool: {e}")
+                config_id, honeypot_config = None, None
+            if honeypot_config is None:
+                self.failures += 1
+                self.stopped.wait(self.retry_delay)
+                continue
+            pool_id = self.add(honeypot_config)
+            print(f"Configuration {pool_id} added to the pool ({len(self.ids())} / {self.size})")
@@ -0,0 +1,172 @@
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+class ConfigGenerationError(RuntimeError):
+    """Raised when no new honeypot configuration could be generated."""
+
+class ConfigPrefetcher:
+    '''
+        Generates the next honeypot configuration in a background thread while attacks
+        still run against the current one, so a reconfiguration only has to restart the
+        containers. generate (by default generate_new_honeypot_config) reads the sessions
+        of the experiment, so once refresh_after more sessions were recorded the prepared
+        configuration is generated again from them. refresh_after=None never refreshes it.
+
+        Generation starts after the first session on a configuration, once the criterion
+        reports at most lead_sessions sessions until it could reconfigure (add_session).
+        Criteria that cannot tell, and lead_sessions=None, prepare it right away. Nothing
+        is generated once the LLM budget of costs (by default the transport's) is spent,
+        what the generations cost is counted in it under the "config_prefetch" category.
+
+        A failed generation is retried after retry_delay, or right away once take waits
+        for it. take only generates the configuration itself if nothing was being prepared.
+    '''
+    def __init__(self, experiment_path, refresh_after: int = 5,
+            generate: Callable[[Path], Tuple[str, Dict[str, Any]]] = None, retry_delay: float = 10.0,
+            lead_sessions: Optional[int] = None, costs=None):
+        assert refresh_after is None or refresh_after >= 1, f"refresh_after must be positive ({refresh_after} < 1)"
+        assert lead_sessions is None or lead_sessions >= 0, f"lead_sessions must not be negative ({lead_sessions} < 0)"
+        self.experiment_path = Path(experiment_path)
+        self.refresh_after = refresh_after
+        self.generate = generate
+        self.retry_delay = retry_delay
+        self.lead_sessions = lead_sessions
+        self.costs = costs
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.sessions = 0
+        self.config_start = 0
+        # reported by the criterion with the latest session, None if it cannot tell
+        self.sessions_until_reconfigure = None
+        # (config_id, honeypot_config, sessions it was generated from, its cost)
+        self.prepared = None
+        self.generating = False
+        self.failed = False
+        self.retry_now = False
+        self.failures = 0
+        self.generated = 0
+        self.discarded = 0
+        self.cost_usd = 0.0
+        self.discarded_cost_usd = 0.0
+        self.thread = None
+
+    def start(self):
+        if self.generate is None:
+            from Blue.new_config_pipeline import generate_new_honeypot_config
+            self.generate = generate_new_honeypot_config
+        if self.costs is None:
+            from Utils.llm_client import get_transport
+            self.costs = get_transport().costs
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._prefetch, name="config-prefetcher", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """
+        Stop preparing configurations, a generation in progress is left to finish.
+        """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def add_session(self, sessions_until_reconfigure: Optional[int] = None):
+        """
+        Called once a session against the current configuration has been recorded, with
+        what the criterion reports after it (None if it cannot tell).
+        """
+        with self.condition:
+            self.sessions += 1
+            self.sessions_until_reconfigure = sessions_until_reconfigure
+            self.condition.notify_all()
+
+    def take(self) -> Tuple[str, Dict[str, Any]]:
+        """
+        Return the prepared configuration, waiting for one being generated or retried if
+        there is none yet. Preparing the one after it starts with the first session on the
+        new configuration. Raises ConfigGenerationError if no configuration could be generated.
+        """
+        with self.condition:
+            failures = self.failures
+            self.retry_now = self.failed
+            self.condition.notify_all()
+            self.condition.wait_for(lambda: self.prepared is not None or self.stopped or self.thread is None
+                or self.failures > failures or not (self.generating or self._needs_config()))
+            prepared = self.prepared
+            self.prepared = None
+            failed = self.failures > failures
+            self.config_start = self.sessions
+            self.sessions_until_reconfigure = None
+            self.retry_now = False
+        if prepared is None:
+            if failed:
+                raise ConfigGenerationError("Could not prepare the next configuration")
+            print("No configuration prepared, generating one now.")
+            config_id, honeypot_config = self.generate(self.experiment_path)
+            if honeypot_config is None:
+                raise ConfigGenerationError("Could not generate the next configuration")
+            return config_id, honeypot_config
+        config_id, honeypot_config, _, _ = prepared
+        return config_id, honeypot_config
+
+    def stats(self) -> Dict[str, Any]:
+        with self.condition:
+            return {"generated": self.generated, "discarded": self.discarded, "failed": self.failures,
+                "cost_usd": self.cost_usd, "discarded_cost_usd": self.discarded_cost_usd}
+
+    def _reconfiguration_near(self) -> bool:
+        return (self.lead_sessions is None or self.sessions_until_reconfigure is None
+            or self.sessions_until_reconfigure <= self.lead_sessions)
+
+    def _needs_config(self) -> bool:
+        if self.sessions <= self.config_start or not self._reconfiguration_near():
+            return False
+        if self.costs is not None and self.costs.exceeded():
+            return False
+        if self.prepared is None:
+            return True
+        return self.refresh_after is not None and self.sessions - self.prepared[2] >= self.refresh_after
+
+    def _prefetch(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.stopped or self._needs_config())
+                if self.stopped:
+                    return
+                self.generating = True
+                self.failed = False
+                sessions = self.sessions
+                config_start = self.config_start
+
+            spent = self.costs.category_spent("config_prefetch")
+            try:
+                with self.costs.category("config_prefetch"):
+                    config_id, honeypot_config = self.generate(self.experiment_path)
+            except Exception as e:
+                print(f"Could not prepare the next configuration: {e}")
+                config_id, honeypot_config = None, None
+            # only this thread generates in the background, so the difference is this generation
+            cost = self.costs.category_spent("config_prefetch") - spent
+
+            with self.condition:
+                self.generating = False
+                self.cost_usd += cost
+                if honeypot_config is not None:
+                    self.generated += 1
+                    # replaced by a fresher one, or generated for a configuration no longer deployed
+                    if self.prepared is not None:
+                        self.discarded += 1
+                        self.discarded_cost_usd += self.prepared[3]
+                    elif self.config_start != config_start:
+                        self.discarded += 1
+                        self.discarded_cost_usd += cost
+                    if self.config_start == config_start:
+                        self.prepared = (config_id, honeypot_config, sessions, cost)
+                failed = honeypot_config is None
+                self.failed = failed
+                self.failures += failed
+                self.condition.notify_all()
+            if failed:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.stopped or self.retry_now, self.retry_delay)
+                    self.retry_now = False
@@ -1,7 +1,6 @@
 import json
 import random
 from pathlib import Path
-import openai
 import os
 import numpy as np
 from sentence_transformers import SentenceTransformer
@@ -11,7 +10,8 @@ import sys
 import time
 import fcntl
 from config import llm_model_config
-from Utils.jsun import load_json
+from Utils.jsun import load_json, resolve_json_path
+from Utils.llm_client import chat_completion
 
 # Add parent directory to sys.path to allow imports from project root
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -35,8 +35,7 @@ def query_openai(prompt: str, model: str = None, temperature: float = 0.7) -> st
     """
     if model is None:
         model = llm_model_config
-    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    response = openai_client.chat.completions.create(
+    response = chat_completion(
         model=model,
         messages=[{"role": "user", "content": prompt}],
         temperature=temperature,
@@ -121,12 +120,11 @@ def sample_previous_configs(config_dir, sample_size=5):
             with open(config_file, "r", encoding="utf8") as f:
                 config_data = json.load(f)
             
-            sessions_file = hp_config_dir / "sessions.json"
+            sessions_file = resolve_json_path(hp_config_dir / "sessions.json")
             session_data = None
-            if sessions_file.exists():
+            if sessions_file is not None:
                 try:
-                    with open(sessions_file, "r", encoding="utf8") as f:
-                        session_data = json.load(f)
+                    session_data = load_json(sessions_file)
                 except Exception as e:
                     print(f"Error loading session data from {sessions_file}: {e}")
                     session_data = None
@@ -137,7 +135,7 @@ def sample_previous_configs(config_dir, sample_size=5):
                 "config": config_data,
                 "sessions": session_data,
                 "config_path": str(config_file),
-                "sessions_path": str(sessions_file) if sessions_file.exists() else None
+                "sessions_path": str(sessions_file) if sessions_file is not None else None
             })
             
         except Exception as e:
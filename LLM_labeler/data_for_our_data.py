@@ -1,15 +1,21 @@
 from pathlib import Path
+import os
+import sys
 import json
 
+# Add parent directory to sys.path to allow imports from project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Utils.jsun import load_json
+
 BASE_DIR = Path(__file__).resolve().parent
 
 new_path = BASE_DIR.parent / "logs" / "experiment_2025-07-12T15_56_53"
 
 data_path = BASE_DIR.parent / "LLM_labeler" / "data"
 
-with open(new_path / "sessions.json", "r", encoding="utf8") as f:
-    true_data = json.load(f)
-    
+# falls back to the sessions.jsonl written by newer experiments
+true_data = load_json(new_path / "sessions.json")
+
 with open(data_path / "our_data_predictions.json", "r", encoding="utf8") as f:
     pred_data = json.load(f)
 
@@ -1,5 +1,5 @@
 import os
-import openai
+import sys
 import json
 from dotenv import load_dotenv
 from tqdm import tqdm
@@ -7,13 +7,16 @@ import re
 import base64
 from typing import List, Dict, Any
 
+# Add parent directory to sys.path to allow imports from project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Utils.llm_client import chat_completion
+
 # Load API key
 load_dotenv()
 OPENAI_API_KEY= os.getenv("OPENAI_API_KEY")
 
 def query_openai(prompt: str, model: str, temperature: float = 0.7, max_tokens=150) -> str:
-    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    response = openai_client.chat.completions.create(
+    response = chat_completion(
         model=model,
         messages=[
             {"role": "system", "content": "You are a cybersecurity analyst."},
@@ -1,10 +1,14 @@
 from dotenv import load_dotenv
 from pathlib import Path
 import os
-import openai
+import sys
 import json
 import re
 
+# Add parent directory to sys.path to allow imports from project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Utils.llm_client import chat_completion
+
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
@@ -13,8 +17,7 @@ BASE_DIR = Path(__file__).resolve().parent
 data_path = BASE_DIR.parent / "LLM_labeler" / "data"
 
 def query_openai(prompt: str, model: str = "gpt-4.1", temperature: float = 0.7, max_tokens: int = 32768):
-    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    response = openai_client.chat.completions.create(
+    response = chat_completion(
         model=model,
         messages=[
             {"role": "user", "content": prompt}
@@ -1,10 +1,15 @@
 from dotenv import load_dotenv
 from pathlib import Path
 import os
-import openai
+import sys
 import json
 import re
 
+# Add parent directory to sys.path to allow imports from project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Utils.llm_client import chat_completion
+from Utils.jsun import load_json
+
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
@@ -15,8 +20,7 @@ new_path = BASE_DIR.parent / "logs" / "experiment_2025-07-12T15_56_53"
 
 
 def query_openai(prompt: str, model: str = "gpt-4.1", temperature: float = 0.7, max_tokens: int = 32768):
-    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    response = openai_client.chat.completions.create(
+    response = chat_completion(
         model=model,
         messages=[
             {"role": "user", "content": prompt}
@@ -47,8 +51,7 @@ def main():
     with open(data_path / "sample_train_corpus_expanded.json", "r", encoding="utf8") as f:
         train_data = json.load(f)
         
-    with open(new_path / "sessions.json", "r", encoding="utf8") as f:
-        test_data = json.load(f)
+    test_data = load_json(new_path / "sessions.json")
 
     clean_train_data = [{"session": row["session"], "full_session": row["full_session"]} for row in train_data]
     clean_test_data = []
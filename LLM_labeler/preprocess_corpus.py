@@ -21,7 +21,8 @@ def main():
         for i in range(len(df)):
             session = df["session"].loc[i]
             labels = df["labels"].loc[i]
-            commands_split = divide_statements(session, False)
+            # the corpus labels were made for the plain split, quotes included
+            commands_split = divide_statements(session, False, shell_aware=False)
             labels_split = expand_labels(labels)
             assert len(commands_split) == len(labels_split)
             data.append({
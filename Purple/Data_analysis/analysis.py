@@ -32,7 +32,7 @@ filter_empty_sessions = False
 use_omni_sessions = False
 print(f"Analyzing experiment {selected_experiment}")
 
-from Utils.jsun import load_json
+from Utils.jsun import load_json, resolve_json_path
 import numpy as np
 from Purple.Data_analysis.metrics import measure_session_length, measure_mitre_distribution, \
     measure_entropy_session_length, measure_entropy_techniques, measure_entropy_tactics
@@ -45,7 +45,7 @@ configs = sorted(
 )
 
 session_file_name = "omni_sessions.json" if use_omni_sessions else "sessions.json"
-sessions_list = [load_json(path / config / session_file_name) for config in configs if session_file_name in os.listdir(path / config)]
+sessions_list = [load_json(path / config / session_file_name) for config in configs if resolve_json_path(path / config / session_file_name)]
 
 if filter_empty_sessions:
     new_sessions_list = []
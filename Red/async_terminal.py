@@ -0,0 +1,156 @@
+import asyncio
+import threading
+from typing import Optional
+
+try:
+    import asyncssh
+except ImportError:
+    asyncssh = None
+
+from Red.terminal_buffer import OutputWindow, PromptDetector, TerminalOutput
+
+def require_asyncssh():
+    if asyncssh is None:
+        raise ImportError("The async terminal backend needs asyncssh, install it with 'pip install asyncssh'")
+
+TOO_LONG_MARKER = "***COMMAND TOOK TO LONG TO RUN, KILLING COMMAND***\n"
+
+class AsyncShell:
+    '''
+        Interactive shell on a Kali container over asyncssh. Output is read in chunks as
+        it arrives, prompts are detected incrementally and only a bounded window of the
+        output is kept. send_command can be called from any thread, the shell itself
+        lives on the event loop of its backend.
+    '''
+    def __init__(self, backend: "AsyncTerminalBackend", connection, process, prompt_patterns,
+            tail_chars: int, head_chars: int = 0):
+        self.backend = backend
+        self.connection = connection
+        self.process = process
+        self.detector = PromptDetector(prompt_patterns)
+        self.tail_chars = tail_chars
+        self.head_chars = head_chars
+        self.pending = ""
+
+    async def read_until_prompt(self, window: OutputWindow, timeout: float) -> bool:
+        """
+        Read output into window until a prompt is found, False on timeout or EOF.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        chunk, self.pending = self.pending, ""
+        while True:
+            if chunk:
+                end = self.detector.feed(chunk)
+                if end is not None:
+                    window.append(chunk[:end])
+                    self.pending = chunk[end:]
+                    return True
+                window.append(chunk)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                chunk = await asyncio.wait_for(self.process.stdout.read(4096), remaining)
+            except asyncio.TimeoutError:
+                return False
+            if not chunk:
+                return False
+
+    async def run(self, command: str, timeout: float) -> TerminalOutput:
+        window = OutputWindow(self.tail_chars, self.head_chars)
+        self.detector.reset()
+        self.process.stdin.write(command + "\r")
+        if await self.read_until_prompt(window, timeout):
+            return self._response(window)
+
+        if self.process.stdout.at_eof():
+            return self._response(window, "")
+
+        # same recovery as the pexpect backend: interrupt and wait a little for the prompt
+        command_response = self._response(window, "")
+        window = OutputWindow(self.tail_chars, self.head_chars)
+        self.detector.reset()
+        self.process.stdin.write("\r\n")
+        self.process.stdin.write("\x03")
+        if await self.read_until_prompt(window, 5):
+            command_response2 = self._response(window)
+        else:
+            command_response2 = self._response(window, "")
+        return TerminalOutput(
+            command_response + TOO_LONG_MARKER + command_response2,
+            command_response.dropped_chars + command_response2.dropped_chars,
+            timed_out=True
+        )
+
+    def _response(self, window: OutputWindow, matched: str = None) -> TerminalOutput:
+        matched = self.detector.matched if matched is None else matched
+        text = window.text(window.cut_marker())
+        if matched and text.endswith(matched):
+            text = text[:-len(matched)]
+        return TerminalOutput(f"{text.strip()}{matched}", window.total_dropped())
+
+    def send_command(self, command: str, timeout: float) -> TerminalOutput:
+        return self.backend.run_coroutine(self.run(command, timeout))
+
+    def close(self):
+        self.backend.run_coroutine(self._close())
+
+    async def _close(self):
+        self.process.close()
+        self.connection.close()
+        await self.connection.wait_closed()
+
+    def isalive(self) -> bool:
+        return not self.process.stdout.at_eof()
+
+class AsyncTerminalBackend:
+    '''
+        Runs all async shells of the process on one event loop in a background thread.
+        Attack threads block only on the result of their own command, while the loop
+        multiplexes the output of every open shell, so hundreds of shells need no more
+        than one thread.
+    '''
+    def __init__(self, prompt_patterns, tail_chars: int = 10000, head_chars: int = 0,
+            connect_timeout: float = 30, password: str = 'toor'):
+        require_asyncssh()
+        self.prompt_patterns = [pattern for pattern in prompt_patterns if isinstance(pattern, str)]
+        self.tail_chars = tail_chars
+        self.head_chars = head_chars
+        self.connect_timeout = connect_timeout
+        self.password = password
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-terminal", daemon=True)
+        self.thread.start()
+
+    def run_coroutine(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def open_shell(self, port) -> AsyncShell:
+        return self.run_coroutine(self._open_shell(port))
+
+    async def _open_shell(self, port) -> AsyncShell:
+        connection = await asyncio.wait_for(asyncssh.connect(
+            "localhost",
+            port=int(port),
+            username="root",
+            password=self.password,
+            known_hosts=None
+        ), self.connect_timeout)
+        process = await connection.create_process(term_type="xterm-256color", encoding="utf-8")
+        shell = AsyncShell(self, connection, process, self.prompt_patterns, self.tail_chars, self.head_chars)
+        # wait for the first prompt, discarding the login banner
+        if not await shell.read_until_prompt(OutputWindow(self.tail_chars), self.connect_timeout):
+            await shell._close()
+            raise ConnectionError(f"No prompt from the Kali container on port {port}")
+        return shell
+
+_backend: Optional[AsyncTerminalBackend] = None
+_backend_lock = threading.Lock()
+
+def get_async_backend(prompt_patterns, tail_chars: int = 10000, head_chars: int = 0) -> AsyncTerminalBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = AsyncTerminalBackend(prompt_patterns, tail_chars, head_chars)
+        return _backend
@@ -0,0 +1,74 @@
+import json
+from typing import Any, Dict, List
+
+# keys only kept in the full logs, never sent to the attacker LLM
+LOG_ONLY_KEYS = ("honeypot_logs", "metadata")
+
+def estimate_tokens(message: Dict[str, Any]) -> int:
+    """
+    Rough token count of a message, about four characters per token.
+    """
+    size = len(str(message.get("content") or ""))
+    if message.get("tool_calls"):
+        size += len(json.dumps(message["tool_calls"], default=str))
+    return size // 4 + 4
+
+def compact_tool_content(content: str, max_chars: int) -> str:
+    """
+    Keep the start and the end of a long tool output, which is where terminal commands
+    print what they did and where the prompt ended up.
+    """
+    if len(content) <= max_chars:
+        return content
+    head = max_chars // 4
+    tail = max_chars - head
+    removed = len(content) - head - tail
+    return f"{content[:head]}\n***OUTPUT COMPACTED, {removed} CHARACTERS REMOVED***\n{content[-tail:]}"
+
+class AttackerContext:
+    '''
+        Builds the messages sent to the attacker LLM from the full message history.
+        When the history exceeds token_budget, tool outputs older than the keep_recent
+        most recent messages are truncated. The system prompt and recent turns are
+        sent verbatim.
+
+        Messages are compacted up to a boundary that only moves forward, in steps of at
+        least keep_recent messages and only when the budget is exceeded, so the prompt
+        prefix stays the same between most calls and keeps hitting the OpenAI prompt cache.
+        The message history itself is never modified.
+    '''
+    def __init__(self, token_budget: int = None, keep_recent: int = 6, compacted_tool_chars: int = 400):
+        assert token_budget is None or token_budget > 0, f"Token budget must be positive ({token_budget})"
+        assert keep_recent >= 0, f"Number of recent messages kept must be non-negative ({keep_recent} < 0)"
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.compacted_tool_chars = compacted_tool_chars
+        self.boundary = 0
+        self.compacted: Dict[int, Dict[str, Any]] = {}
+
+    def build(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.token_budget is not None:
+            total_tokens = sum(estimate_tokens(message) for message in self._view(messages))
+            new_boundary = len(messages) - self.keep_recent
+            if total_tokens > self.token_budget and new_boundary - self.boundary >= max(self.keep_recent, 1):
+                self.boundary = new_boundary
+        return self._view(messages)
+
+    def _view(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        view = []
+        for i, message in enumerate(messages):
+            if i < self.boundary and message.get("role") == "tool":
+                if i not in self.compacted:
+                    self.compacted[i] = self._compact(message)
+                view.append(self.compacted[i])
+            else:
+                view.append(self._strip(message))
+        return view
+
+    def _compact(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        message = self._strip(message)
+        message["content"] = compact_tool_content(str(message.get("content", "")), self.compacted_tool_chars)
+        return message
+
+    def _strip(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in message.items() if key not in LOG_ONLY_KEYS}
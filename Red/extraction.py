@@ -1,185 +1,199 @@
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 import sys
 import json
 import os
 
 # Add parent directory to sys.path to allow imports from project root
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from Utils.jsun import save_json_to_file, load_json
+from Utils.jsun import save_json_to_file, load_json, iter_jsonl
 from Utils.logprecis import recombine_labels, divide_statements
+from Red.log_parser import honeypot_events
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# only keep commands when the attacker has gained access
-def extract_session(logs: Dict[str, Any]) -> Dict[str, Any]:
-    session_log = {}
-
-    session_string = ""
-    tactics = []
-    techniques = []
-    full_session = []
-
-    for i, entry in enumerate(logs):
-        if entry["role"] != "assistant":
-            continue
-
-        if not entry["tool_calls"]:
-            continue
-    
-        # Get follow up message
-        num_tool_calls = len(entry["tool_calls"])
-        tool_entry_index = i + num_tool_calls + 1
-
-        # If terminates before tool call
-        if tool_entry_index >= len(logs):
-            continue
-
-        follow_up_entry = logs[tool_entry_index]
-        assert follow_up_entry["role"] == "assistant"
-        follow_up_content = follow_up_entry["content"]
-        
-        for j, tool in enumerate(entry["tool_calls"]):
+def parse_terminal_call(tool) -> Dict[str, Any]:
+    """
+    Arguments of a terminal_input tool call with its raw and cleaned MITRE labels.
+    """
+    arguments = tool["function"]["arguments"]
+    if type(arguments) is str:
+        arguments = json.loads(arguments)
+
+    if "tactic_used" in arguments:
+        tactic = arguments["tactic_used"]
+        tactic_clean = str(tactic).split(":")[-1]
+    else:
+        tactic = "Error: No tactic found"
+        tactic_clean = "Error: No tactic found"
+    if "technique_used" in arguments:
+        technique = arguments["technique_used"]
+        technique_clean = str(technique).split(":")[-1]
+    else:
+        technique = "Error: No technique found"
+        technique_clean = "Error: No technique found"
+
+    return {
+        "arguments": arguments,
+        "tactic_raw": tactic,
+        "tactic": tactic_clean,
+        "technique_raw": technique,
+        "technique": technique_clean
+    }
+
+class SessionAccumulator:
+    """Commands and labels of one kind of session, turned into a session log at the end."""
+    def __init__(self):
+        self.commands = []
+        self.tactics = []
+        self.techniques = []
+        self.full_session = []
+
+    def add(self, record: Dict[str, Any]):
+        self.commands.append(record["command"])
+        self.tactics.append(record["tactic"])
+        self.techniques.append(record["technique"])
+        self.full_session.append(record)
+
+    def to_session_log(self, discovered_honeypot: str = None) -> Dict[str, Any]:
+        session_log = {}
+        session_log["session"] = " ".join(self.commands).strip()
+        if discovered_honeypot is not None:
+            session_log["discovered_honeypot"] = discovered_honeypot
+        session_log["tactics"] = recombine_labels(self.tactics)
+        session_log["techniques"] = recombine_labels(self.techniques)
+        assert len(self.tactics) == len(self.techniques)
+        session_log["length"] = len(self.tactics)
+        session_log["full_session"] = list(self.full_session)
+        return session_log
+
+class SessionExtractor:
+    '''
+        Single pass extraction of both sessions of an attack from its log entries:
+        - session: the commands the honeypot saw, from the honeypot logs of the tool responses.
+          Only these count as commands run once the attacker has gained access.
+        - omni session: every command the attacker sent to its terminal.
+
+        Entries are fed one at a time, e.g. while streaming a JSONL log. The commands of
+        an assistant turn are labeled with the reasoning that follows its tool responses,
+        so they are emitted once the next assistant entry arrives, or by finish().
+    '''
+    def __init__(self):
+        self.session = SessionAccumulator()
+        self.omni_session = SessionAccumulator()
+        self.pending_calls = None
+        self.pending_tools = []
+        self.last_entries = []
+
+    def add(self, entry: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Feed the next log entry and return the ("session" | "omni", record) pairs it completed.
+        """
+        self.last_entries = self.last_entries[-1:] + [entry]
+        records = []
+        if entry["role"] == "tool":
+            if self.pending_calls is not None:
+                self.pending_tools.append(entry)
+        elif entry["role"] == "assistant":
+            if self.pending_calls is not None:
+                records = self._emit(entry["content"])
+            if entry.get("tool_calls"):
+                self.pending_calls = entry["tool_calls"]
+                self.pending_tools = []
+        return records
+
+    def finish(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Emit the commands of the last turn, which has no reasoning after it.
+        """
+        if self.pending_calls is None:
+            return []
+        return self._emit(None)
+
+    def discovered_honeypot(self) -> str:
+        """
+        Whether the attacker terminated because it discovered the honeypot. The terminate
+        tool response is the last entry, or the one before the follow-up message.
+        """
+        for entry in self.last_entries:
+            if entry["role"] == "tool" and entry["name"] == "terminate":
+                return "yes" if entry["content"] else "no"
+        return "unknown"
+
+    def session_log(self) -> Dict[str, Any]:
+        return self.session.to_session_log()
+
+    def omni_session_log(self) -> Dict[str, Any]:
+        return self.omni_session.to_session_log(self.discovered_honeypot())
+
+    def _emit(self, follow_up_content) -> List[Tuple[str, Dict[str, Any]]]:
+        records = []
+        for j, tool in enumerate(self.pending_calls):
             if tool["function"]["name"] != "terminal_input":
                 continue
+            call = parse_terminal_call(tool)
+            labels = {key: call[key] for key in ("tactic_raw", "tactic", "technique_raw", "technique")}
+
+            commands = str(call["arguments"].get("input", "")).strip()
+            if commands:
+                for command in divide_statements(commands):
+                    record = {"command": command, **labels, "content": follow_up_content}
+                    self.omni_session.add(record)
+                    records.append(("omni", record))
 
-            arguments = tool["function"]["arguments"]
-            if type(arguments) is str:
-                arguments = json.loads(arguments)
-
-            if "tactic_used" in arguments:
-                tactic = arguments["tactic_used"]
-                tactic_clean = str(tactic).split(":")[-1]
-            else:
-                tactic = "Error: No tactic found"
-                tactic_clean = "Error: No tactic found"
-            if "technique_used" in arguments:
-                technique = arguments["technique_used"]
-                technique_clean = str(technique).split(":")[-1]
-            else:
-                technique = "Error: No technique found"
-                technique_clean = "Error: No technique found"
-
-            hp_entry = logs[i + j + 1]
+            if j >= len(self.pending_tools):
+                continue
+            hp_entry = self.pending_tools[j]
             # check that hp iteration is a tool
             assert hp_entry["role"] == "tool"
-            if "honeypot_logs" not in hp_entry:
-                continue
-            for log in hp_entry["honeypot_logs"]:
+            for log in honeypot_events(hp_entry.get("honeypot_logs")):
                 if "event" not in log:
                     continue
-                
+
                 event = log["event"]
                 if str(event["Protocol"]).lower() != "ssh":
                     continue
 
                 if "Command" in event and str(event["Command"]).strip():
-                    hp_commands = str(event["Command"]).strip()
-                    for hp_command in divide_statements(hp_commands):
-                        session_string += hp_command + " "
-                        full_session.append({
-                            "command": hp_command,
-                            "tactic_raw": tactic,
-                            "tactic": tactic_clean,
-                            "technique_raw": technique,
-                            "technique": technique_clean,
-                            "content": follow_up_content
-                        })
-                        tactics.append(tactic_clean)
-                        techniques.append(technique_clean)
-
-    session_string = session_string.strip()
-    session_log["session"] = session_string
-    session_log["tactics"] = recombine_labels(tactics)
-    session_log["techniques"] = recombine_labels(techniques)
-    assert len(tactics) == len(techniques)
-    session_log["length"] = len(tactics)
-    session_log["full_session"] = full_session
-    return session_log
-
-def extract_everything_session(logs: Dict[str, Any]) -> Dict[str, Any]:
-    session_log = {}
-    session_string = ""
-    tactics = []
-    techniques = []
-    full_session = []
-
-    for i, entry in enumerate(logs):
-        if entry["role"] != "assistant":
-            continue
-
-        if not entry["tool_calls"]:
-            continue
-    
-        # Get follow up message
-        num_tool_calls = len(entry["tool_calls"])
-        tool_entry_index = i + num_tool_calls + 1
-
-        # If terminates before tool call
-        if tool_entry_index >= len(logs):
-            continue
-
-        follow_up_entry = logs[tool_entry_index]
-        assert follow_up_entry["role"] == "assistant"
-        follow_up_content = follow_up_entry["content"]
-        
-        for tool in entry["tool_calls"]:
-            if tool["function"]["name"] != "terminal_input":
-                continue
+                    for hp_command in divide_statements(str(event["Command"]).strip()):
+                        record = {"command": hp_command, **labels, "content": follow_up_content}
+                        self.session.add(record)
+                        records.append(("session", record))
+
+        self.pending_calls = None
+        self.pending_tools = []
+        return records
+
+def iter_session_records(entries: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield the ("session" | "omni", record) pairs of a log as it is read.
+    """
+    extractor = SessionExtractor()
+    for entry in entries:
+        yield from extractor.add(entry)
+    yield from extractor.finish()
+
+def extract_sessions(entries: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Session and omni session of a log in a single pass. entries can be any iterable,
+    e.g. iter_jsonl over the attack log, so the log is never fully loaded.
+    """
+    extractor = SessionExtractor()
+    for entry in entries:
+        extractor.add(entry)
+    extractor.finish()
+    return extractor.session_log(), extractor.omni_session_log()
 
-            arguments = tool["function"]["arguments"]
-            if type(arguments) is str:
-                arguments = json.loads(arguments)
-
-            if "tactic_used" in arguments:
-                tactic = arguments["tactic_used"]
-                tactic_clean = str(tactic).split(":")[-1]
-            else:
-                tactic = "Error: No tactic found"
-                tactic_clean = "Error: No tactic found"
-            if "technique_used" in arguments:
-                technique = arguments["technique_used"]
-                technique_clean = str(technique).split(":")[-1]
-            else:
-                technique = "Error: No technique found"
-                technique_clean = "Error: No technique found"
-
-            commands = str(arguments["input"]).strip() 
-            if commands:
-                for command in divide_statements(commands):
-                    session_string += command + " "
-                    full_session.append({
-                        "command": command,
-                        "tactic_raw": tactic,
-                        "tactic": tactic_clean,
-                        "technique_raw": technique,
-                        "technique": technique_clean,
-                        "content": follow_up_content
-                    })
-                    tactics.append(tactic_clean)
-                    techniques.append(technique_clean)
-
-    # grab terminate command
-    discovered_honeypot = "unknown"
-    terminate_entry = logs[-2]
-    if terminate_entry["role"] == "tool" and terminate_entry["name"] == "terminate":
-        discovered_honeypot = "yes" if terminate_entry["content"] else "no"
-
-    session_string = session_string.strip()
-    session_log["session"] = session_string
-    session_log["discovered_honeypot"] = discovered_honeypot
-    session_log["tactics"] = recombine_labels(tactics)
-    session_log["techniques"] = recombine_labels(techniques)
-    assert len(tactics) == len(techniques)
-    session_log["length"] = len(tactics)
-    session_log["full_session"] = full_session
-    return session_log
+# only keep commands when the attacker has gained access
+def extract_session(logs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    return extract_sessions(logs)[0]
+
+def extract_everything_session(logs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    return extract_sessions(logs)[1]
 
 if __name__ == "__main__":
     experiment_path = BASE_DIR / "logs" / "experiment_2025-06-25T" / "hp_config_1"
-    log_path = experiment_path / "full_logs" / "attack_1.json"
-    logs = load_json(log_path)
-    
-    session_log = extract_session(logs)
+    log_path = experiment_path / "full_logs" / "attack_1.jsonl"
+    session_log = extract_session(iter_jsonl(log_path))
     session_path = experiment_path / "sessions" / "session_1.json"
     save_json_to_file(session_log, session_path)
\ No newline at end of file
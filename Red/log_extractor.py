@@ -1,37 +1,199 @@
 import subprocess
 import datetime
-import json
 import os
+import threading
+from collections import deque
+from itertools import islice
 
-last_checked = datetime.datetime.now(datetime.UTC).isoformat()
-def get_new_hp_logs():
+import config
+from Red.log_parser import JsonLinesParser
+
+def container_name():
+    return f"{os.getenv('RUNID')}_blue_lagoon_1"
+
+def timestamp_key(timestamp: str) -> str:
     """
-    Fetch new logs from the Beelzebub container since the last check.
-    Returns a list of parsed JSON objects or raw logs if parsing fails.
-    """
-    global last_checked
-    process = subprocess.Popen(
-        ["sudo", "docker", "logs", f"{os.getenv('RUNID')}_blue_lagoon_1", "--since", last_checked],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1
-    )
-    last_checked = datetime.datetime.now(datetime.UTC).isoformat()
-
-    log_output = process.stdout.read().strip()
-    if log_output:
-        #print(log_output)
-        try:
-            log_lines = log_output.strip().split('\n')
-            logs = [json.loads(line) for line in log_lines if line.strip()]
-            return logs  # Return parsed JSON objects instead of string
-        except json.JSONDecodeError:
-            # If parsing fails, return raw logs as fallback
-            return {"raw_logs": log_output, "error": "Failed to parse JSON"}
+    Sortable form of a docker RFC3339Nano timestamp, whose fraction has its trailing zeros cut.
+    """
+    seconds, _, fraction = timestamp.rstrip("Z").partition(".")
+    return f"{seconds}.{fraction:0<9}"
+
+class HoneypotLogFollower:
+    """
+    Follows the Beelzebub container logs with a single `docker logs -f` process in a
+    background thread, parsing each line into a bounded in-memory ring buffer. Every
+    event gets a sequence number, so sessions read new events with a memory lookup
+    instead of spawning `docker logs` before every tool call, and without gaps or
+    duplicates between reads.
+
+    When the container is restarted (e.g. on reconfiguration) the follower reconnects
+    and continues after the timestamp of the last line it read.
+    """
+    def __init__(self, max_events: int = 100000, reconnect_delay: float = 1.0):
+        self.events = deque(maxlen=max_events)
+        self.parser = JsonLinesParser()
+        self.next_seq = 0
+        self.condition = threading.Condition()
+        self.reconnect_delay = reconnect_delay
+        self.since = datetime.datetime.now(datetime.UTC).isoformat()
+        self.last_timestamp = ""
+        self.process = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._follow, name="honeypot-log-follower", daemon=True)
+        self.thread.start()
+
+    def current_seq(self) -> int:
+        with self.condition:
+            return self.next_seq
+
+    def events_since(self, seq: int):
+        """
+        Return the events with a sequence number of at least seq, the next sequence number
+        to read from, and how many events were already dropped from the ring buffer.
+        """
+        with self.condition:
+            oldest = self.next_seq - len(self.events)
+            missed = max(0, oldest - seq)
+            start = max(seq, oldest) - oldest
+            events = list(islice(self.events, start, None))
+            return events, self.next_seq, missed
+
+    def stop(self):
+        self.stopped.set()
+        if self.process is not None:
+            self.process.terminate()
+
+    def _follow(self):
+        while not self.stopped.is_set():
+            try:
+                self.process = subprocess.Popen(
+                    ["sudo", "docker", "logs", "-f", "--timestamps", container_name(), "--since", self.since],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    bufsize=1
+                )
+            except OSError as e:
+                print(f"Could not follow the honeypot logs: {e}")
+                self.stopped.wait(self.reconnect_delay)
+                continue
+            for line in self.process.stdout:
+                self._add_line(line)
+            self._add_events(self.parser.flush())
+            self.process.wait()
+            # the container stopped or is not up yet
+            self.stopped.wait(self.reconnect_delay)
+
+    def _add_line(self, line: str):
+        timestamp, _, payload = line.rstrip("\n").partition(" ")
+        if not payload.strip():
+            return
+        # --since repeats the lines at the timestamp we reconnect from
+        key = timestamp_key(timestamp)
+        if key <= self.last_timestamp:
+            return
+        self.last_timestamp = key
+        self.since = timestamp
+        self._add_events(self.parser.feed(payload + "\n"))
+
+    def _add_events(self, events):
+        if not events:
+            return
+        with self.condition:
+            self.events.extend(events)
+            self.next_seq += len(events)
+            self.condition.notify_all()
+
+_follower = None
+_follower_lock = threading.Lock()
+
+def get_log_follower() -> HoneypotLogFollower:
+    global _follower
+    with _follower_lock:
+        if _follower is None:
+            _follower = HoneypotLogFollower(config.honeypot_log_buffer_size)
+        return _follower
+
+def stop_log_follower():
+    with _follower_lock:
+        if _follower is not None:
+            _follower.stop()
+
+class HoneypotLogCursor:
+    """
+    Keeps track of which Beelzebub logs an attack session has already seen.
+    When source_ip is set, only events coming from that IP are returned, so that
+    concurrent sessions from different Kali containers do not read each other's logs.
+    Events without a source IP are matched on the Beelzebub session ID of earlier events.
+
+    With config.follow_honeypot_logs the logs are read from the shared log follower,
+    otherwise `docker logs --since` is run on every call.
+    """
+    def __init__(self, source_ip: str = None):
+        self.source_ip = source_ip
+        self.last_checked = datetime.datetime.now(datetime.UTC).isoformat()
+        self.follower = get_log_follower() if config.follow_honeypot_logs else None
+        self.seq = self.follower.current_seq() if self.follower else 0
+        self.missed = 0
+        self.session_ids = set()
+        self.parser = self.follower.parser if self.follower else JsonLinesParser()
+
+    def get_new_logs(self):
+        """
+        Fetch new logs from the Beelzebub container since the last check.
+        Returns a list of parsed JSON objects, lines that do not parse are quarantined by the parser.
+        """
+        if self.follower is not None:
+            logs, self.seq, missed = self.follower.events_since(self.seq)
+            if missed:
+                self.missed += missed
+                print(f"Warning: {missed} honeypot log events dropped from the log buffer before they were read.")
+            return self.filter_logs(logs)
+
+        process = subprocess.Popen(
+            ["sudo", "docker", "logs", container_name(), "--since", self.last_checked],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        self.last_checked = datetime.datetime.now(datetime.UTC).isoformat()
+
+        # parsed line by line as the output arrives, a bad line only loses itself
+        logs = []
+        for line in process.stdout:
+            logs += self.parser.feed(line)
+        logs += self.parser.flush()
+        process.wait()
 
         # trace = langfuse.trace(name="on-demand-log-check")
         # for line in log_output.splitlines():
         #     trace.span(name="log").log(line)
 
-    return []  # Return empty list instead of empty string
+        return self.filter_logs(logs)
+
+    def filter_logs(self, logs):
+        if self.source_ip is None:
+            return logs
+        filtered = []
+        for log in logs:
+            event = log.get("event", {})
+            if event.get("SourceIp") == self.source_ip:
+                if event.get("ID"):
+                    self.session_ids.add(event["ID"])
+                filtered.append(log)
+            elif not event.get("SourceIp") and event.get("ID") in self.session_ids:
+                filtered.append(log)
+        return filtered
+
+def get_new_hp_logs():
+    """
+    Fetch new logs from the Beelzebub container since the last check.
+    Returns a list of parsed JSON objects.
+    """
+    global default_cursor
+    if default_cursor is None:
+        default_cursor = HoneypotLogCursor()
+    return default_cursor.get_new_logs()
+
+default_cursor = None
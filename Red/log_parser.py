@@ -0,0 +1,112 @@
+import json
+import threading
+from collections import deque
+from typing import Any, Dict, List
+
+class JsonLinesParser:
+    '''
+        Incremental parser of JSON lines, e.g. the Beelzebub container logs. Text can be
+        fed in chunks of any size: an incomplete last line is kept until the rest of it
+        arrives. Every valid line becomes an event, one bad line never costs the others.
+
+        A line that starts a JSON object but does not parse is joined with the lines after
+        it, in case the writer split a long line, up to max_pending_chars. Lines that still
+        do not parse are quarantined, the last max_quarantine of them are kept for debugging.
+    '''
+    def __init__(self, max_pending_chars: int = 1_000_000, max_quarantine: int = 1000):
+        self.max_pending_chars = max_pending_chars
+        self.lock = threading.Lock()
+        self.partial = ""
+        self.pending = ""
+        self.quarantine = deque(maxlen=max_quarantine)
+        self.parsed_lines = 0
+        self.joined_lines = 0
+        self.quarantined_lines = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Parse the complete lines of chunk, return the events found.
+        """
+        with self.lock:
+            lines = (self.partial + chunk).split("\n")
+            self.partial = lines.pop()
+            return self._parse_lines(lines)
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Parse whatever is left at the end of the stream.
+        """
+        with self.lock:
+            lines = [self.partial] if self.partial else []
+            self.partial = ""
+            events = self._parse_lines(lines)
+            if self.pending:
+                self._quarantine(self.pending)
+                self.pending = ""
+            return events
+
+    def _parse_lines(self, lines: List[str]) -> List[Dict[str, Any]]:
+        events = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if self.pending:
+                joined = self.pending + line
+                event = self._loads(joined)
+                if event is not None:
+                    self.pending = ""
+                    self.joined_lines += 1
+                    events.append(event)
+                    continue
+                if len(joined) <= self.max_pending_chars and not line.startswith("{"):
+                    self.pending = joined
+                    continue
+                self._quarantine(self.pending)
+                self.pending = ""
+
+            event = self._loads(line)
+            if event is not None:
+                events.append(event)
+            elif line.startswith("{"):
+                self.pending = line
+            else:
+                self._quarantine(line)
+        self.parsed_lines += len(events)
+        return events
+
+    def _loads(self, line: str):
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        return event if isinstance(event, dict) else None
+
+    def _quarantine(self, line: str):
+        self.quarantined_lines += 1
+        self.quarantine.append(line)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "parsed_lines": self.parsed_lines,
+                "joined_lines": self.joined_lines,
+                "quarantined_lines": self.quarantined_lines
+            }
+
+def parse_json_lines(text: str) -> List[Dict[str, Any]]:
+    """
+    All valid events of a block of JSON lines, skipping the lines that do not parse.
+    """
+    parser = JsonLinesParser()
+    return parser.feed(text) + parser.flush()
+
+def honeypot_events(honeypot_logs) -> List[Dict[str, Any]]:
+    """
+    The events of the honeypot logs of a tool response. Older logs hold a
+    {"raw_logs", "error"} dict instead of a list when one line did not parse,
+    the valid lines of those are parsed again.
+    """
+    if isinstance(honeypot_logs, dict):
+        return parse_json_lines(str(honeypot_logs.get("raw_logs", "")))
+    return honeypot_logs or []
@@ -24,6 +24,18 @@ class ReconfigCriteria(str, Enum):
     BASIC = "basic"
     MEAN_INCREASE = "mean_increase"
     ENTROPY = "entropy"
+    SESSION_LENGTH = "session_length"
+    CHANGE_POINT = "change_point"
+    BANDIT = "bandit"
+
+class KaliEndpoint:
+    """SSH port of a Kali container and the IP it attacks the honeypot from."""
+    def __init__(self, port: str, ip: str = None):
+        self.port = str(port)
+        self.ip = ip
+
+    def __repr__(self):
+        return f"KaliEndpoint(port={self.port}, ip={self.ip})"
 
 class LLMConfig:
     """Configuration for the LLM host and model."""
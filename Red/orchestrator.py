@@ -0,0 +1,182 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import config
+from Red import sangria_config
+from Red.model import KaliEndpoint
+from Red.sangria import run_single_attack
+from Utils.tracing import SessionTracer
+from Utils.jsun import JsonlWriter
+from Utils.llm_client import get_transport
+
+BOLD   = "\033[1m"
+RESET  = "\033[0m"
+
+def get_kali_endpoints() -> List[KaliEndpoint]:
+    """
+    Return the Kali endpoints from config.py, or the single Kali container
+    of docker-compose.yml for the current RUNID if none are configured.
+    Simulated command lines need no Kali, so every parallel attack gets an empty endpoint.
+    """
+    if config.simulate_command_line:
+        return [None] * config.num_parallel_attacks
+    if config.kali_endpoints:
+        endpoints = [KaliEndpoint(port, ip) for port, ip in config.kali_endpoints]
+    else:
+        endpoints = [KaliEndpoint('30' + str(os.getenv('RUNID')))]
+    if len(endpoints) < config.num_parallel_attacks:
+        print(f"Warning: {config.num_parallel_attacks} parallel attacks requested but only "
+            f"{len(endpoints)} Kali endpoint(s) configured, running {len(endpoints)} at a time. "
+            f"Add endpoints to config.kali_endpoints to run more.")
+    return endpoints
+
+class AttackOrchestrator:
+    '''
+        Runs attack sessions concurrently, at most one per Kali endpoint, against the
+        current honeypot configuration. Results are handed back in attack order, so the
+        caller can update the reconfigurator exactly as in a sequential run.
+
+        Attacks are started ahead of the one being waited for, up to the limit given by
+        the caller. If the caller reconfigures after attack i, the attacks already started
+        after i ran against the old configuration; they are cancelled, their logs removed
+        and they are run again against the new configuration. The tokens they used are
+        returned by discard_in_flight, so the spend on discarded attacks can be recorded.
+
+        Sessions are extracted while the attacks run. The latest partial session of every
+        running attack is kept in partial_sessions and handed to on_partial_session under
+        lock, until the attack is discarded. Callers updating what on_partial_session
+        updates hold the same lock. A line with the live metrics of the partial session
+        is appended to partial_sessions_path (if given) each time.
+    '''
+    def __init__(self, num_of_attacks: int, max_session_length: int,
+            endpoints: List[KaliEndpoint], num_workers: int = 1,
+            on_partial_session: Callable[[int, Dict[str, Any]], None] = None, partial_sessions_path: Path = None):
+        assert endpoints, "At least one Kali endpoint is needed to run attacks"
+        assert num_workers >= 1, f"The number of parallel attacks must be positive ({num_workers} < 1)"
+        self.num_of_attacks = num_of_attacks
+        self.max_session_length = max_session_length
+        self.num_workers = min(num_workers, len(endpoints))
+
+        self.endpoints: queue.Queue = queue.Queue()
+        for endpoint in endpoints:
+            self.endpoints.put(endpoint)
+
+        self.executor = ThreadPoolExecutor(max_workers=self.num_workers)
+        self.in_flight: Dict[int, Tuple] = {}
+        self.stop_event = threading.Event()
+        self.next_attack = 0
+        self.full_logs_path = None
+        self.config_counter = 0
+        self.config_id = None
+        self.lock = threading.Lock()
+        self.on_partial_session = on_partial_session
+        self.partial_sessions: Dict[int, Dict[str, Any]] = {}
+        self.partial_writer = JsonlWriter(partial_sessions_path) if partial_sessions_path is not None else None
+
+    def schedule(self, first_attack: int, full_logs_path: Path, config_counter: int, limit: int = None,
+            config_id: str = None):
+        """
+        Start running attacks from first_attack against the given configuration, config_id
+        identifies it for the cache of simulated command output.
+        """
+        self.next_attack = first_attack
+        self.full_logs_path = Path(full_logs_path)
+        self.config_counter = config_counter
+        self.config_id = config_id
+        self.stop_event = threading.Event()
+        self.fill(limit)
+
+    def fill(self, limit: int = None):
+        """
+        Start new attacks until every worker is busy or all attacks before limit (default:
+        all attacks) have been started. No attacks are started once the LLM budget is spent.
+        """
+        num_of_attacks = self.num_of_attacks if limit is None else min(limit, self.num_of_attacks)
+        while self.next_attack < num_of_attacks and len(self.in_flight) < self.num_workers:
+            if get_transport().costs.exceeded():
+                break
+            attack_index = self.next_attack
+            logs_path = self.full_logs_path / f"attack_{attack_index+1}.jsonl"
+            future = self.executor.submit(self._run_attack, attack_index, logs_path,
+                self.config_counter, self.config_id, self.stop_event)
+            self.in_flight[attack_index] = (future, logs_path)
+            self.next_attack += 1
+
+    def result(self, attack_index: int):
+        """
+        Wait for the given attack to finish and return its session extractor, tokens used
+        and timing records.
+        """
+        future, _ = self.in_flight.pop(attack_index)
+        try:
+            return future.result()
+        finally:
+            with self.lock:
+                self.partial_sessions.pop(attack_index, None)
+
+    def discard_in_flight(self) -> List[Dict[str, Any]]:
+        """
+        Stop all running attacks and remove their logs, e.g. before reconfiguring.
+        Returns the tokens used by each discarded attack that had already started.
+        """
+        self.stop_event.set()
+        discarded = []
+        for attack_index, (future, logs_path) in sorted(self.in_flight.items()):
+            if not future.cancel():
+                try:
+                    _, tokens_used, _ = future.result()
+                    discarded.append({"attack": attack_index, "configuration": self.config_counter, **tokens_used})
+                except Exception as e:
+                    print(f"Discarded attack {attack_index+1} failed: {e}")
+            if logs_path.exists():
+                logs_path.unlink()
+            print(f"Discarded attack {attack_index+1}, it will be run again on the new configuration.")
+        self.in_flight = {}
+        with self.lock:
+            self.partial_sessions = {}
+        return discarded
+
+    def shutdown(self) -> List[Dict[str, Any]]:
+        discarded = self.discard_in_flight()
+        self.executor.shutdown(wait=True)
+        if self.partial_writer is not None:
+            self.partial_writer.close()
+        return discarded
+
+    def _run_attack(self, attack_index: int, logs_path: Path, config_counter: int, config_id: str,
+            stop_event: threading.Event):
+        endpoint = self.endpoints.get()
+        try:
+            print(f"{BOLD}Attack {attack_index+1} / {self.num_of_attacks}, configuration {config_counter}{RESET}")
+            messages = sangria_config.get_messages(attack_index)
+            tracer = SessionTracer(attack_index)
+            start_time = time.time()
+
+            def on_partial_session(session):
+                with self.lock:
+                    # a discarded attack ran against the old configuration
+                    if stop_event.is_set():
+                        return
+                    self.partial_sessions[attack_index] = session
+                    if self.partial_writer is not None:
+                        techniques = {entry["technique"] for entry in session["full_session"]}
+                        self.partial_writer.write({
+                            "attack": attack_index,
+                            "configuration": config_counter,
+                            "elapsed_seconds": time.time() - start_time,
+                            "length": session["length"],
+                            "techniques": len(techniques - {""})
+                        })
+                    if self.on_partial_session is not None:
+                        self.on_partial_session(attack_index, session)
+
+            extractor, tokens_used = run_single_attack(messages, self.max_session_length, logs_path,
+                attack_index, config_counter, endpoint, stop_event, tracer, config_id, on_partial_session)
+            return extractor, tokens_used, tracer.records()
+        finally:
+            self.endpoints.put(endpoint)
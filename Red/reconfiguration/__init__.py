@@ -1,4 +1,7 @@
 from Red.reconfiguration.basic import BasicReconfigCriterion
 from Red.reconfiguration.entropy import EntropyReconfigCriterion
 from Red.reconfiguration.mean_increase import MeanIncreaseReconfigCriterion
-from Red.reconfiguration.never import NeverReconfigCriterion
\ No newline at end of file
+from Red.reconfiguration.never import NeverReconfigCriterion
+from Red.reconfiguration.session_length import SessionLengthReconfigCriterion
+from Red.reconfiguration.change_point import ChangePointReconfigCriterion
+from Red.reconfiguration.bandit import BanditReconfigCriterion
\ No newline at end of file
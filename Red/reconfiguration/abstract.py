@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 class AbstractReconfigCriterion(ABC):
     def __init__(self, reset_every_reconfig: bool = True):
@@ -16,4 +16,20 @@ class AbstractReconfigCriterion(ABC):
 
     @abstractmethod
     def should_reconfigure(self) -> bool:
-        ...
\ No newline at end of file
+        ...
+
+    def sessions_until_reconfigure(self) -> Optional[int]:
+        """
+        The fewest further sessions after which should_reconfigure can return True, or
+        None if the criterion cannot tell. Attacks started beyond it would run against a
+        configuration that may be replaced before they finish.
+        """
+        return None
+
+    def update_partial(self, session: Dict[str, Any]):
+        """
+        Called with the partial session of an attack that is still running, each time it
+        grows. The complete session is still passed to update once the attack ends, so
+        criteria that only look at complete sessions can ignore this.
+        """
+        pass
\ No newline at end of file
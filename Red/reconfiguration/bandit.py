@@ -0,0 +1,111 @@
+import math
+import random
+from typing import Dict, List
+
+from Red.reconfiguration.abstract import AbstractReconfigCriterion
+from Red.reconfiguration.online import WelfordStats
+
+ALGORITHMS = ["ucb", "thompson"]
+REWARDS = ["new_techniques", "session_length"]
+
+class BanditReconfigCriterion(AbstractReconfigCriterion):
+    '''
+        Treats the honeypot configurations of a config pool as the arms of a bandit. A pull
+        runs the current configuration for sessions_per_pull sessions, its reward is the mean
+        reward of those sessions:
+        - new_techniques: techniques not seen before in the experiment.
+        - session_length: commands the attacker ran in the honeypot.
+        After each pull the next arm is chosen with UCB1 or Thompson sampling (with a normal
+        posterior on the mean reward), untried arms first. Reconfigures when it differs from
+        the current arm, next_arm is then the ID of the configuration to deploy.
+
+        Arm statistics are kept across reconfigurations, reset only starts a new pull. The
+        pool runs a background thread, so it is attached with attach_pool and left out when
+        the criterion is pickled into a checkpoint.
+    '''
+    def __init__(self, algorithm: str = "ucb", reward: str = "new_techniques", sessions_per_pull: int = 5,
+            exploration: float = 1.0, reset_every_reconfig: bool = True):
+        assert algorithm in ALGORITHMS, f"Algorithm '{algorithm}' is not supported. Supported algorithms: {ALGORITHMS}"
+        assert reward in REWARDS, f"Reward '{reward}' is not supported. Supported rewards: {REWARDS}"
+        assert sessions_per_pull >= 1, f"A pull must have at least one session ({sessions_per_pull} < 1)"
+        self.algorithm = algorithm
+        self.reward = reward
+        self.sessions_per_pull = sessions_per_pull
+        self.exploration = exploration
+        self.arms: Dict[str, WelfordStats] = {}
+        self.seen_techniques = set()
+        self.current_arm = None
+        self.next_arm = None
+        self.total_pulls = 0
+        self.random = random.Random()
+        self.pool = None
+        super().__init__(reset_every_reconfig)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["pool"] = None
+        return state
+
+    def attach_pool(self, pool, current_arm: str):
+        """
+        Choose arms from the configurations in pool, the one with ID current_arm is deployed.
+        """
+        self.pool = pool
+        self.current_arm = current_arm
+        self.next_arm = current_arm
+
+    def reset(self):
+        self.pull_rewards = WelfordStats()
+
+    def update(self, session):
+        match self.reward:
+            case "new_techniques":
+                techniques = {
+                    command_entry["technique"]
+                    for command_entry in session.get("full_session", [])
+                    if command_entry.get("technique")
+                }
+                reward = len(techniques - self.seen_techniques)
+                self.seen_techniques |= techniques
+            case "session_length":
+                reward = session.get("length", 0)
+        self.pull_rewards.add(reward)
+
+    def should_reconfigure(self):
+        if self.pull_rewards.count < self.sessions_per_pull:
+            return False
+
+        self.arms.setdefault(self.current_arm, WelfordStats()).add(self.pull_rewards.mean)
+        self.total_pulls += 1
+        # the next pull of the same arm starts now, a reconfiguration starts it again with reset
+        self.pull_rewards = WelfordStats()
+
+        arm_ids = self.pool.ids() if self.pool is not None else []
+        self.next_arm = self.select_arm(arm_ids or [self.current_arm])
+        return self.next_arm != self.current_arm
+
+    def sessions_until_reconfigure(self):
+        return max(1, self.sessions_per_pull - self.pull_rewards.count)
+
+    def switch_arm(self) -> str:
+        """
+        Make next_arm the current arm, once its configuration is deployed.
+        """
+        self.current_arm = self.next_arm
+        return self.current_arm
+
+    def select_arm(self, arm_ids: List[str]) -> str:
+        untried = [arm_id for arm_id in arm_ids if arm_id not in self.arms]
+        if untried:
+            return untried[0]
+        return max(arm_ids, key=self.score)
+
+    def score(self, arm_id: str) -> float:
+        stats = self.arms[arm_id]
+        match self.algorithm:
+            case "ucb":
+                return stats.mean + self.exploration * math.sqrt(2 * math.log(self.total_pulls) / stats.count)
+            case "thompson":
+                # the spread of one pull is unknown until the arm was pulled twice
+                std = stats.std() if stats.count > 1 else self.exploration
+                return self.random.gauss(stats.mean, std / math.sqrt(stats.count))
@@ -13,4 +13,7 @@ class BasicReconfigCriterion(AbstractReconfigCriterion):
         self.num_sessions += 1
         
     def should_reconfigure(self):
-        return self.num_sessions >= self.interval
\ No newline at end of file
+        return self.num_sessions >= self.interval
+
+    def sessions_until_reconfigure(self):
+        return max(1, self.interval - self.num_sessions)
@@ -0,0 +1,37 @@
+from Red.reconfiguration.abstract import AbstractReconfigCriterion
+from Red.reconfiguration.online import PageHinkley, Cusum
+
+METHODS = ["page_hinkley", "cusum"]
+
+class ChangePointReconfigCriterion(AbstractReconfigCriterion):
+    '''
+        Reconfigures once a change point detector finds a drop in session length, i.e.
+        attackers have started to engage less with the configuration. delta and threshold
+        are in standard deviations of the session length:
+        - page_hinkley compares each session to the mean of all sessions before it.
+        - cusum compares each session to the mean of the first warmup sessions, it needs
+          a longer warmup for a stable baseline.
+        Each update is O(1).
+    '''
+    def __init__(self, method: str = "page_hinkley", delta: float = 0.5, threshold: float = 10.0,
+            warmup: int = 10, reset_every_reconfig: bool = False):
+        assert method in METHODS, f"Method '{method}' is not supported. Supported methods: {METHODS}"
+        self.method = method
+        assert threshold > 0, f"The threshold must be positive ({threshold} <= 0)"
+        self.delta = delta
+        self.threshold = threshold
+        self.warmup = warmup
+        super().__init__(reset_every_reconfig)
+
+    def reset(self):
+        match self.method:
+            case "page_hinkley":
+                self.detector = PageHinkley(self.delta, self.threshold, self.warmup)
+            case "cusum":
+                self.detector = Cusum(self.delta, self.threshold, self.warmup)
+
+    def update(self, session):
+        self.detector.add(session.get("length", 0))
+
+    def should_reconfigure(self):
+        return self.detector.detected()
@@ -1,23 +1,15 @@
-import math
-import numpy as np
-
-from typing import List
-from collections import Counter
 from Red.reconfiguration.abstract import AbstractReconfigCriterion
+from Red.reconfiguration.online import OnlineEntropy, MovingAverage
 
 VARIABLES = ["techniques", "session_length"]
 
-def compute_entropy(prob_dist: List[float], base=math.e) -> float:
-    return -sum(p * math.log(p, base) for p in prob_dist if p > 0)
-
-def get_prob_dist(data: Counter) -> List[float]:
-    total = sum(data.values())
-    return [freq / total for freq in data.values()]
-
-def moving_average(x: np.ndarray, w: int):
-    return np.convolve(x, np.ones(w), 'valid') / w
-
 class EntropyReconfigCriterion(AbstractReconfigCriterion):
+    '''
+        Reconfigures once the entropy of the techniques used, or of the session lengths,
+        stops changing: when the moving average over window_size sessions moves less than
+        tolerance. The entropy and its moving average are updated in constant time, so the
+        cost per session does not grow with the number of sessions.
+    '''
     def __init__(self, variable: str, tolerance: float = 1e-2,
             window_size: int = 1, reset_every_reconfig: bool = False):
         assert variable in VARIABLES, f"Variable '{variable}' is not supported. Supported variables: {VARIABLES}"
@@ -28,24 +20,24 @@ class EntropyReconfigCriterion(AbstractReconfigCriterion):
         super().__init__(reset_every_reconfig)
 
     def reset(self):
-        self.entropies: List[float] = [0]
-        self.counter = Counter()
+        self.entropy = OnlineEntropy()
+        # a window of 0 does no smoothing, like a window of 1
+        self.smoothed_entropies = MovingAverage(max(1, self.window_size))
+        self.smoothed_entropies.add(0)
 
     def update(self, session):
         match self.variable:
             case "techniques":
                 for command_entry in session.get("full_session", []):
                     if "technique" in command_entry and command_entry["technique"]:
-                        self.counter.update([command_entry["technique"]])
+                        self.entropy.add(command_entry["technique"])
             case "session_length":
-                raise NotImplementedError("My bad lol // Sackarias")
-        prob_dist = get_prob_dist(self.counter)
-        entropy_value = compute_entropy(prob_dist)
-        self.entropies.append(entropy_value)
-        
+                self.entropy.add(session.get("length", 0))
+        self.smoothed_entropies.add(self.entropy.entropy())
+
     def should_reconfigure(self):
-        if len(self.entropies) < self.window_size:
+        if not self.smoothed_entropies.ready():
             return False
-        
-        smoothed_entropies = moving_average(self.entropies, self.window_size)
-        return abs(smoothed_entropies[-1] - smoothed_entropies[-2]) < self.tolerance
\ No newline at end of file
+
+        smoothed_entropies = self.smoothed_entropies
+        return abs(smoothed_entropies.current() - smoothed_entropies.previous()) < self.tolerance
@@ -17,6 +17,7 @@ class MeanIncreaseReconfigCriterion(AbstractReconfigCriterion):
 
     def reset(self):
         self.values: List[int] = [0]
+        self.max_session_length = 0
         if self.reset_techniques:
             self.techniques: set[str] = set([])
 
@@ -28,7 +29,8 @@ class MeanIncreaseReconfigCriterion(AbstractReconfigCriterion):
                         self.techniques.add(command_entry["technique"])
                         self.values.append(len(self.techniques))
             case "max_session_length":
-                raise NotImplementedError("My bad lol // Sackarias")
+                self.max_session_length = max(self.max_session_length, session.get("length", 0))
+                self.values.append(self.max_session_length)
 
     def should_reconfigure(self):
         if len(self.values) < self.window_size:
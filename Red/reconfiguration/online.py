@@ -0,0 +1,218 @@
+import heapq
+import math
+from collections import Counter, deque
+from typing import Hashable
+
+class OnlineEntropy:
+    '''
+        Shannon entropy (natural log) of the distribution of the values seen so far,
+        updated in O(1) per value. With N values of which n_i are value i,
+        H = log N - sum(n_i log n_i) / N, so only N and the running sum are needed.
+    '''
+    def __init__(self):
+        self.counter = Counter()
+        self.total = 0
+        self.sum_n_log_n = 0.0
+
+    def add(self, value: Hashable, count: int = 1):
+        n = self.counter[value]
+        self.counter[value] = n + count
+        self.total += count
+        self.sum_n_log_n += (n + count) * math.log(n + count) - (n * math.log(n) if n else 0.0)
+
+    def entropy(self) -> float:
+        if self.total == 0:
+            return 0.0
+        # rounding in the running sum must not make a single value look uncertain
+        return max(0.0, math.log(self.total) - self.sum_n_log_n / self.total)
+
+class MovingAverage:
+    '''
+        Mean of the last window values, plus the mean one value earlier, kept in a ring
+        buffer of window + 1 values so both are updated in O(1).
+    '''
+    def __init__(self, window: int):
+        assert window >= 1, f"Window size must be positive ({window} < 1)"
+        self.window = window
+        self.values = deque(maxlen=window + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float):
+        if len(self.values) == self.values.maxlen:
+            self.sum -= self.values[0]
+        self.values.append(value)
+        self.sum += value
+        self.count += 1
+
+    def ready(self) -> bool:
+        """Whether there are enough values for the current and the previous mean."""
+        return len(self.values) == self.values.maxlen
+
+    def current(self) -> float:
+        return (self.sum - (self.values[0] if self.ready() else 0)) / min(self.window, len(self.values))
+
+    def previous(self) -> float:
+        return (self.sum - self.values[-1]) / min(self.window, len(self.values) - 1)
+
+class WelfordStats:
+    '''
+        Mean and variance of all values seen so far with Welford's algorithm, which is
+        O(1) per value and numerically stable.
+    '''
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def variance(self) -> float:
+        """Sample variance, 0 until there are two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def std(self) -> float:
+        return math.sqrt(self.variance())
+
+class WindowedMedian:
+    '''
+        Median of the last window values, from a max-heap of the lower half and a min-heap
+        of the upper half. Values leaving the window are removed lazily, once they reach
+        the top of their heap, so each value costs O(log window). Once the removed values
+        outnumber the window the heaps are rebuilt, which keeps that amortized.
+    '''
+    def __init__(self, window: int):
+        assert window >= 1, f"Window size must be positive ({window} < 1)"
+        self.window = window
+        self.values = deque()
+        self.low = []  # negated, so the largest of the lower half is on top
+        self.high = []
+        self.low_size = 0
+        self.high_size = 0
+        self.delayed = Counter()
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, value: float):
+        if not self.low or value <= -self.low[0]:
+            heapq.heappush(self.low, -value)
+            self.low_size += 1
+        else:
+            heapq.heappush(self.high, value)
+            self.high_size += 1
+        self.values.append(value)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._rebalance()
+        if len(self.low) + len(self.high) > 2 * self.window + 1:
+            self._rebuild()
+
+    def median(self) -> float:
+        if not self.values:
+            return 0.0
+        if self.low_size > self.high_size:
+            return -self.low[0]
+        return (-self.low[0] + self.high[0]) / 2
+
+    def _remove(self, value: float):
+        self.delayed[value] += 1
+        if value <= -self.low[0]:
+            self.low_size -= 1
+            if value == -self.low[0]:
+                self._prune(self.low, -1)
+        else:
+            self.high_size -= 1
+            if value == self.high[0]:
+                self._prune(self.high, 1)
+
+    def _rebalance(self):
+        if self.low_size > self.high_size + 1:
+            heapq.heappush(self.high, -heapq.heappop(self.low))
+            self.low_size -= 1
+            self.high_size += 1
+            self._prune(self.low, -1)
+        elif self.low_size < self.high_size:
+            heapq.heappush(self.low, -heapq.heappop(self.high))
+            self.low_size += 1
+            self.high_size -= 1
+            self._prune(self.high, 1)
+
+    def _rebuild(self):
+        ordered = sorted(self.values)
+        half = (len(ordered) + 1) // 2
+        self.low = [-value for value in ordered[:half]]
+        self.high = ordered[half:]
+        heapq.heapify(self.low)
+        heapq.heapify(self.high)
+        self.low_size = len(self.low)
+        self.high_size = len(self.high)
+        self.delayed = Counter()
+
+    def _prune(self, heap, sign: int):
+        while heap and self.delayed[sign * heap[0]]:
+            value = sign * heap[0]
+            self.delayed[value] -= 1
+            if not self.delayed[value]:
+                del self.delayed[value]
+            heapq.heappop(heap)
+
+class PageHinkley:
+    '''
+        Page-Hinkley test for a drop in the mean of a stream. Each value is standardized
+        with the running mean and standard deviation of the values before it, and the
+        cumulative drop, less delta per value, is compared to its lowest point so far.
+        A change is detected once it rises threshold above it. Values during the first
+        warmup only feed the statistics. O(1) per value.
+    '''
+    def __init__(self, delta: float, threshold: float, warmup: int = 5):
+        self.delta = delta
+        self.threshold = threshold
+        self.warmup = max(2, warmup)
+        self.stats = WelfordStats()
+        self.cumulative = 0.0
+        self.minimum = 0.0
+
+    def add(self, value: float) -> bool:
+        if self.stats.count >= self.warmup:
+            self.cumulative += standardized_drop(self.stats, value) - self.delta
+            self.minimum = min(self.minimum, self.cumulative)
+        self.stats.add(value)
+        return self.detected()
+
+    def detected(self) -> bool:
+        return self.cumulative - self.minimum > self.threshold
+
+class Cusum:
+    '''
+        One-sided CUSUM for a drop in the mean of a stream below the mean of its first
+        warmup values. Each value is standardized with the mean and standard deviation of
+        that baseline; the sum of how far they fall below it, less delta each, restarts at 0
+        and a change is detected once it exceeds threshold. O(1) per value.
+    '''
+    def __init__(self, delta: float, threshold: float, warmup: int = 5):
+        self.delta = delta
+        self.threshold = threshold
+        self.warmup = max(2, warmup)
+        self.baseline = WelfordStats()
+        self.sum = 0.0
+
+    def add(self, value: float) -> bool:
+        if self.baseline.count < self.warmup:
+            self.baseline.add(value)
+        else:
+            self.sum = max(0.0, self.sum + standardized_drop(self.baseline, value) - self.delta)
+        return self.detected()
+
+    def detected(self) -> bool:
+        return self.sum > self.threshold
+
+def standardized_drop(stats: WelfordStats, value: float) -> float:
+    """How many standard deviations value is below the mean."""
+    # constant values so far, a drop of the whole mean is one standard deviation
+    std = stats.std() or abs(stats.mean) or 1.0
+    return (stats.mean - value) / std
@@ -0,0 +1,50 @@
+from Red.reconfiguration.abstract import AbstractReconfigCriterion
+from Red.reconfiguration.online import WelfordStats, WindowedMedian, MovingAverage
+
+STATISTICS = ["mean", "median"]
+
+class SessionLengthReconfigCriterion(AbstractReconfigCriterion):
+    '''
+        Reconfigures when attackers engage less: when the mean or median length of the last
+        window_size sessions falls more than threshold standard deviations below the mean
+        length of all sessions against the configuration. The overall mean and standard
+        deviation are kept with Welford's algorithm, so each update is O(1) for the mean
+        and O(log window_size) for the median.
+    '''
+    def __init__(self, statistic: str = "median", window_size: int = 5, threshold: float = 2.0,
+            reset_every_reconfig: bool = False):
+        assert statistic in STATISTICS, f"Statistic '{statistic}' is not supported. Supported statistics: {STATISTICS}"
+        self.statistic = statistic
+        assert window_size >= 1, f"Window size must be positive ({window_size} < 1)"
+        self.window_size = window_size
+        self.threshold = threshold
+        super().__init__(reset_every_reconfig)
+
+    def reset(self):
+        self.stats = WelfordStats()
+        match self.statistic:
+            case "mean":
+                self.window = MovingAverage(self.window_size)
+            case "median":
+                self.window = WindowedMedian(self.window_size)
+
+    def update(self, session):
+        length = session.get("length", 0)
+        self.stats.add(length)
+        self.window.add(length)
+
+    def windowed_length(self) -> float:
+        match self.statistic:
+            case "mean":
+                return self.window.current()
+            case "median":
+                return self.window.median()
+
+    def should_reconfigure(self):
+        # the overall statistics need sessions from before the window
+        if self.stats.count <= self.window_size:
+            return False
+        return self.windowed_length() < self.stats.mean - self.threshold * self.stats.std()
+
+    def sessions_until_reconfigure(self):
+        return max(1, self.window_size + 1 - self.stats.count)
@@ -0,0 +1,263 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from Red.model import ReconfigCriteria
+from Red.reconfiguration import EntropyReconfigCriterion, BasicReconfigCriterion, \
+    MeanIncreaseReconfigCriterion, NeverReconfigCriterion, SessionLengthReconfigCriterion, \
+    ChangePointReconfigCriterion
+from Utils.jsun import load_json
+
+CRITERIA = {
+    ReconfigCriteria.NO_RECONFIG: NeverReconfigCriterion,
+    ReconfigCriteria.BASIC: BasicReconfigCriterion,
+    ReconfigCriteria.MEAN_INCREASE: MeanIncreaseReconfigCriterion,
+    ReconfigCriteria.ENTROPY: EntropyReconfigCriterion,
+    ReconfigCriteria.SESSION_LENGTH: SessionLengthReconfigCriterion,
+    ReconfigCriteria.CHANGE_POINT: ChangePointReconfigCriterion,
+}
+
+# parameters only read by should_reconfigure, policies that differ only in these share
+# the state their criteria build in update
+DECISION_PARAMS = {
+    ReconfigCriteria.BASIC: ("interval",),
+    ReconfigCriteria.MEAN_INCREASE: ("tolerance", "window_size"),
+    ReconfigCriteria.ENTROPY: ("tolerance",),
+    ReconfigCriteria.SESSION_LENGTH: ("threshold",),
+}
+
+def load_experiment_sessions(experiment_path: Path) -> List[Dict[str, Any]]:
+    """
+    Sessions of every configuration of an experiment, in the order they were run.
+    """
+    experiment_path = Path(experiment_path)
+    configs = [path for path in experiment_path.glob("hp_config_*") if path.is_dir()]
+    sessions = []
+    for config_path in sorted(configs, key=lambda path: int(path.name.split('_')[-1])):
+        try:
+            sessions += load_json(config_path / "sessions.json")
+        except FileNotFoundError:
+            continue
+    return sessions
+
+def compact_session(session: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The parts of a session the reconfiguration criteria read, so replays and the
+    sessions sent to worker processes stay small.
+    """
+    return {
+        "length": session.get("length", 0),
+        "full_session": [
+            {"technique": entry["technique"]}
+            for entry in session.get("full_session", [])
+            if entry.get("technique")
+        ]
+    }
+
+def expand_grid(grid: Dict[str, Dict[str, List[Any]]]) -> List[Dict[str, Any]]:
+    """
+    Every policy of a parameter grid, e.g.
+    {"entropy": {"variable": ["techniques"], "tolerance": [1e-2, 1e-3], "window_size": [1, 5]}}
+    gives 4 entropy policies, each a dict with the criterion and its parameters. The
+    parameters are the keyword arguments of the criterion, plus min_num_of_attacks_reconfig.
+    """
+    policies = []
+    for method, params in grid.items():
+        names = list(params)
+        for values in itertools.product(*(params[name] for name in names)):
+            policies.append({"criterion": ReconfigCriteria(method).value, **dict(zip(names, values))})
+    return policies
+
+def simulate_policy(policy: Dict[str, Any], sessions: List[Dict[str, Any]],
+        keep_curve: bool = False) -> Dict[str, Any]:
+    """
+    Replay sessions through the criterion of a policy like main.py does, and return after
+    which sessions it would have reconfigured and how many techniques were discovered.
+    A technique counts as discovered the first time it is seen on a configuration, so the
+    discovery curve shows what each new configuration adds.
+
+    The sessions are replayed as recorded: the replay cannot tell how attackers would have
+    behaved against the configurations the policy would have deployed instead.
+    """
+    kwargs = dict(policy)
+    method = ReconfigCriteria(kwargs.pop("criterion"))
+    min_attacks = kwargs.pop("min_num_of_attacks_reconfig", 0)
+    criterion = CRITERIA[method](**kwargs)
+    criterion.reset()
+
+    reconfigurations = []
+    config_attacks = 0
+    seen = set()
+    discoveries = 0
+    curve = []
+    for i, session in enumerate(sessions):
+        criterion.update(session)
+        config_attacks += 1
+        for entry in session["full_session"]:
+            if entry["technique"] not in seen:
+                seen.add(entry["technique"])
+                discoveries += 1
+        if keep_curve:
+            curve.append(discoveries)
+
+        if criterion.should_reconfigure() and config_attacks >= min_attacks:
+            reconfigurations.append(i)
+            if criterion.reset_every_reconfig:
+                criterion.reset()
+            config_attacks = 0
+            seen = set()
+
+    result = {
+        "policy": policy,
+        "reconfigurations": reconfigurations,
+        "num_configurations": len(reconfigurations) + 1,
+        "discoveries": discoveries,
+        "discoveries_per_configuration": discoveries / (len(reconfigurations) + 1)
+    }
+    if keep_curve:
+        result["discovery_curve"] = curve
+    return result
+
+class PolicyRun:
+    """Replay of one policy in a sweep, see simulate_policy."""
+    def __init__(self, index: int, policy: Dict[str, Any]):
+        self.index = index
+        self.policy = policy
+        kwargs = dict(policy)
+        self.method = ReconfigCriteria(kwargs.pop("criterion"))
+        self.min_attacks = kwargs.pop("min_num_of_attacks_reconfig", 0)
+        self.kwargs = kwargs
+        self.criterion = CRITERIA[self.method](**kwargs)
+        self.decision_key = tuple(kwargs.get(key) for key in DECISION_PARAMS.get(self.method, ()))
+        self.reconfigurations = []
+        self.config_attacks = 0
+        self.seen = set()
+        self.discoveries = 0
+        self.curve = []
+
+    def group_key(self):
+        decision_params = DECISION_PARAMS.get(self.method, ()) + ("reset_every_reconfig",)
+        state_params = {key: value for key, value in self.kwargs.items() if key not in decision_params}
+        return self.method.value, tuple(sorted(state_params.items()))
+
+    def result(self, keep_curve: bool) -> Dict[str, Any]:
+        result = {
+            "policy": self.policy,
+            "reconfigurations": self.reconfigurations,
+            "num_configurations": len(self.reconfigurations) + 1,
+            "discoveries": self.discoveries,
+            "discoveries_per_configuration": self.discoveries / (len(self.reconfigurations) + 1)
+        }
+        if keep_curve:
+            result["discovery_curve"] = self.curve
+        return result
+
+def simulate_group(runs: List[PolicyRun], sessions: List[Dict[str, Any]], keep_curve: bool = False):
+    """
+    Same results as simulate_policy for each run, for runs with the same group_key. Runs
+    whose criteria were last reset after the same session have the same state, so update is
+    called once on a shared criterion and its state is handed to the criterion of a run
+    with the same decision parameters, whose should_reconfigure answers for all of them.
+    """
+    method = runs[0].method
+    decision_params = set(DECISION_PARAMS.get(method, ())) | {"reset_every_reconfig"}
+
+    def shared_criterion():
+        criterion = CRITERIA[method](**runs[0].kwargs)
+        criterion.reset()
+        return criterion
+
+    seen = set()
+    for run in runs:
+        run.seen = seen
+    # runs by the session after which their criteria were last reset
+    branches = {-1: (shared_criterion(), runs)}
+    for i, session in enumerate(sessions):
+        techniques = {entry["technique"] for entry in session["full_session"]}
+        new_techniques = {}
+        segments = {}
+        next_branches = {}
+        reset_runs = []
+        for start, (criterion, branch_runs) in branches.items():
+            criterion.update(session)
+            state = {key: value for key, value in vars(criterion).items() if key not in decision_params}
+            decisions = {}
+            kept_runs = []
+            for run in branch_runs:
+                if run.decision_key not in decisions:
+                    run.criterion.__dict__.update(state)
+                    decisions[run.decision_key] = run.criterion.should_reconfigure()
+                run.config_attacks += 1
+                # runs that reconfigured after the same session share their seen techniques
+                if id(run.seen) not in new_techniques:
+                    new = techniques - run.seen
+                    run.seen |= new
+                    new_techniques[id(run.seen)] = len(new)
+                run.discoveries += new_techniques[id(run.seen)]
+                if keep_curve:
+                    run.curve.append(run.discoveries)
+
+                if decisions[run.decision_key] and run.config_attacks >= run.min_attacks:
+                    run.reconfigurations.append(i)
+                    run.config_attacks = 0
+                    run.seen = segments.setdefault(i, set())
+                    if run.criterion.reset_every_reconfig:
+                        reset_runs.append(run)
+                        continue
+                kept_runs.append(run)
+            if kept_runs:
+                next_branches[start] = (criterion, kept_runs)
+        if reset_runs:
+            next_branches[i] = (shared_criterion(), reset_runs)
+        branches = next_branches
+
+_worker_sessions = None
+
+def _init_worker(sessions):
+    global _worker_sessions
+    _worker_sessions = sessions
+
+def _simulate_chunk(groups, keep_curve):
+    results = []
+    for group in groups:
+        runs = [PolicyRun(index, policy) for index, policy in group]
+        simulate_group(runs, _worker_sessions, keep_curve)
+        results += [(run.index, run.result(keep_curve)) for run in runs]
+    return results
+
+def sweep(policies: List[Dict[str, Any]], sessions: Iterable[Dict[str, Any]], keep_curve: bool = False,
+        num_workers: int = None) -> List[Dict[str, Any]]:
+    """
+    Simulate every policy on the same sessions, see simulate_policy. Policies that only
+    differ in their decision parameters are replayed together, and these groups are
+    spread over num_workers processes (default: one per CPU). The sessions are sent to
+    each worker once. Results are in the order of policies.
+    """
+    sessions = [compact_session(session) for session in sessions]
+    num_workers = num_workers or os.cpu_count() or 1
+
+    groups = {}
+    for index, policy in enumerate(policies):
+        groups.setdefault(PolicyRun(index, policy).group_key(), []).append((index, policy))
+    # largest groups first, dealt out so every worker gets about the same number of policies
+    chunks = [[] for _ in range(min(num_workers, len(groups)) or 1)]
+    sizes = [0] * len(chunks)
+    for group in sorted(groups.values(), key=len, reverse=True):
+        smallest = sizes.index(min(sizes))
+        chunks[smallest].append(group)
+        sizes[smallest] += len(group)
+
+    if len(chunks) == 1:
+        _init_worker(sessions)
+        chunk_results = [_simulate_chunk(chunks[0], keep_curve)]
+    else:
+        with ProcessPoolExecutor(len(chunks), initializer=_init_worker, initargs=(sessions,)) as executor:
+            chunk_results = list(executor.map(_simulate_chunk, chunks, itertools.repeat(keep_curve)))
+
+    results = [None] * len(policies)
+    for chunk in chunk_results:
+        for index, result in chunk:
+            results[index] = result
+    return results
@@ -0,0 +1,98 @@
+import ast
+import copy
+import json
+from typing import Any, Callable, Dict, List
+
+from Red.extraction import SessionExtractor
+from Utils.jsun import JsonlWriter
+
+def serialize_message(msg) -> Dict[str, Any]:
+    """
+    JSON serializable copy of a message for the logs, with the tool call arguments and
+    tool responses parsed into JSON objects where possible.
+    """
+    if hasattr(msg, 'model_dump'):
+        # For Pydantic models (like ChatCompletionMessage)
+        msg = msg.model_dump()
+    elif hasattr(msg, 'dict'):
+        # Alternative method for some object types
+        msg = msg.dict()
+    else:
+        # the message history sent to the LLM must keep its string fields
+        msg = copy.deepcopy(msg)
+
+    if msg.get('role') == 'assistant' and msg.get('tool_calls'):
+        for tool_call in msg['tool_calls']:
+            if 'function' in tool_call and 'arguments' in tool_call['function']:
+                try:
+                    tool_call['function']['arguments'] = json.loads(tool_call['function']['arguments'])
+                except (json.JSONDecodeError, TypeError):
+                    pass  # Keep as string if not valid JSON
+
+    elif msg.get('role') == 'tool' and 'content' in msg:
+        try:
+            msg['content'] = json.loads(msg['content'])
+        except (json.JSONDecodeError, TypeError):
+            # If it's not valid JSON, try to evaluate as Python literal
+            try:
+                msg['content'] = ast.literal_eval(msg['content'])
+            except (ValueError, SyntaxError):
+                # Keep as string if neither JSON nor valid Python literal
+                pass
+    return msg
+
+class SessionLog:
+    '''
+        Full log of an attack session, written once per message and extracted into a
+        session while the attack runs.
+
+        The honeypot logs of a terminal command are only fetched before the next tool
+        call, so a terminal_input tool response is held back together with the messages
+        after it until the next terminal command starts, or the session ends. All batches
+        of honeypot logs fetched in the meantime are added to it. Every message is written
+        in its final form, so the log never needs to be rewritten at the end.
+
+        on_partial_session is called with the session extracted so far whenever new
+        commands are extracted, before the session is closed.
+    '''
+    def __init__(self, path, on_partial_session: Callable[[Dict[str, Any]], None] = None):
+        self.writer = JsonlWriter(path, flush_every=10, truncate=True)
+        self.extractor = SessionExtractor()
+        self.on_partial_session = on_partial_session
+        self.held: List[Dict[str, Any]] = []
+
+    def append(self, message, awaiting_honeypot_logs: bool = False):
+        if awaiting_honeypot_logs:
+            self.release()
+            message.setdefault("honeypot_logs", [])
+            self.held.append(message)
+        elif self.held:
+            self.held.append(message)
+        else:
+            self._commit(message)
+
+    def add_honeypot_logs(self, logs):
+        """
+        Add a batch of honeypot logs to the held terminal_input tool response.
+        Logs fetched while no terminal command ran yet are dropped.
+        """
+        if self.held and logs:
+            self.held[0]["honeypot_logs"].extend(logs)
+
+    def release(self):
+        held, self.held = self.held, []
+        for message in held:
+            self._commit(message)
+
+    def close(self) -> SessionExtractor:
+        self.release()
+        self.extractor.finish()
+        self.writer.close()
+        return self.extractor
+
+    def _commit(self, message):
+        entry = serialize_message(message)
+        self.writer.write(entry)
+        records = self.extractor.add(entry)
+        if records and self.on_partial_session is not None:
+            self.on_partial_session(self.extractor.session_log())
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import re
+import threading
+from typing import Dict, Tuple
+
+from Red.model import LLMModel
+from Utils.llm_client import chat_completion
+
+SYSTEM_PROMPT = 'You are simulating a command execution system in Kali Linux. You will receive commands to run and you should respond with the output of the command as if it was executed in a terminal.'
+
+# commands that neither change nor depend on the state of the shell, with the flags that
+# keep them read-only. Any other argument, e.g. hostname attacker or ifconfig eth0 down,
+# may change the machine.
+RECON_COMMANDS = {
+    "uname": {"-a", "-s", "-n", "-r", "-v", "-m", "-p", "-i", "-o", "--all"},
+    "id": {"-u", "-g", "-G", "-n", "-un", "-gn", "-Gn"},
+    "whoami": set(),
+    "hostname": {"-f", "-s", "-d", "-i", "-I", "--fqdn", "--short", "--domain", "--ip-address", "--all-ip-addresses"},
+    "arch": set(),
+    "nproc": {"--all"},
+    "lscpu": {"-e", "-J", "--extended", "--json"},
+    "ifconfig": {"-a", "-s"},
+    "groups": set(),
+}
+RECON_FILES = {
+    "/etc/passwd", "/etc/group", "/etc/os-release", "/etc/issue", "/etc/hostname",
+    "/etc/resolv.conf", "/proc/version", "/proc/cpuinfo"
+}
+SHELL_OPERATORS = re.compile(r"[;&|<>`$(){}\\*?~]")
+
+def normalize_command(command: str) -> str:
+    return " ".join(command.split())
+
+def is_recon_command(command: str) -> bool:
+    """
+    True for side-effect free recon commands whose output only depends on the machine,
+    e.g. uname -a, id or cat /etc/passwd, and can be cached.
+    """
+    if not command or SHELL_OPERATORS.search(command):
+        return False
+    tokens = command.split()
+    if tokens[0] in RECON_COMMANDS:
+        return all(token in RECON_COMMANDS[tokens[0]] for token in tokens[1:])
+    if tokens[0] == "ip" and len(tokens) > 1 and tokens[1] in ("a", "addr", "r", "route"):
+        return len(tokens) == 2
+    if tokens[0] == "cat" and len(tokens) > 1:
+        return all(token in RECON_FILES for token in tokens[1:])
+    return False
+
+def changes_recon_output(command: str) -> bool:
+    """
+    True for recon programs run with arguments that may change what recon commands show,
+    e.g. hostname attacker or ifconfig eth0 down.
+    """
+    tokens = command.split()
+    return bool(tokens) and (tokens[0] in RECON_COMMANDS or tokens[0] == "ip") and not is_recon_command(command)
+
+def config_key(honeypot_config) -> str:
+    """
+    Content hash of a honeypot configuration. Configuration counters and IDs repeat between
+    experiments, so cached output is keyed by this instead.
+    """
+    payload = json.dumps(honeypot_config, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf8")).hexdigest()[:16]
+
+class CommandCache:
+    '''
+        Simulated output of recon commands, keyed by honeypot configuration (config_key)
+        and normalized command. Shared by all sessions of the process, so every session
+        sees the same machine.
+    '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.responses: Dict[Tuple[str, str], str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, config_id, command: str):
+        with self.lock:
+            response = self.responses.get((str(config_id), command))
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return response
+
+    def put(self, config_id, command: str, response: str):
+        with self.lock:
+            self.responses.setdefault((str(config_id), command), response)
+
+    def to_dict(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "cached_commands": len(self.responses)}
+
+class SimulatedShell:
+    '''
+        Kali shell simulated by an LLM for one attack session. The history sent to the LLM
+        only holds the commands of this session, so the cost per command does not grow
+        with the number of attacks. Recon commands are answered from the shared cache when
+        another session of the same configuration already ran them, until the session runs
+        a command that may change their output.
+    '''
+    def __init__(self, config_id=None, cache: CommandCache = None, model: LLMModel = LLMModel.GPT_4O_MINI):
+        self.config_id = config_id
+        self.cache = cache
+        self.model = model
+        self.messages = [{'role': 'system', 'content': SYSTEM_PROMPT}]
+        self.changed_machine = False
+
+    def run(self, command: str) -> str:
+        normalized = normalize_command(command)
+        self.changed_machine = self.changed_machine or changes_recon_output(normalized)
+        cacheable = self.cache is not None and not self.changed_machine and is_recon_command(normalized)
+
+        command_text = self.cache.get(self.config_id, normalized) if cacheable else None
+        self.messages.append({'role': 'user', 'content': f'Run the command: {command}'})
+        if command_text is None:
+            raw_resp = chat_completion(model=self.model, messages=self.messages)
+            command_text = raw_resp.choices[0].message.content
+            if cacheable:
+                self.cache.put(self.config_id, normalized, command_text)
+
+        # cached answers are added too, so later commands stay consistent with them
+        self.messages.append({'role': 'assistant', 'content': command_text})
+        return command_text
+
+_cache = CommandCache()
+
+def get_command_cache() -> CommandCache:
+    return _cache
@@ -0,0 +1,210 @@
+import platform
+if platform.system() != 'Windows':
+    import pexpect
+import random
+import threading
+import time
+from typing import Dict, List
+
+import config
+
+KALI_PROMPT = r'└─\x1b\[1;31m#'
+# the echoed command line has a literal $(hostname), only the output matches
+HOSTNAME_PATTERN = r'@@([A-Za-z0-9._-]+)@@'
+HOSTNAME_COMMAND = 'echo "@@$(hostname)@@"'
+# a fresh login shell, so nothing set by the previous attack is left behind
+RESET_COMMAND = 'cd ~; exec env -i HOME="$HOME" TERM="$TERM" PATH="$PATH" "$SHELL" -l'
+
+class SSHPoolStats:
+    """Counters of the pool, wait_seconds is the time attacks waited for a shell."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquired = 0
+        self.reused = 0
+        self.connected = 0
+        self.failed_attempts = 0
+        self.discarded = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def add_wait(self, seconds: float):
+        with self.lock:
+            self.acquired += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "acquired": self.acquired,
+                "reused": self.reused,
+                "connected": self.connected,
+                "failed_attempts": self.failed_attempts,
+                "discarded": self.discarded,
+                "wait_seconds": self.wait_seconds,
+                "mean_wait_seconds": self.wait_seconds / self.acquired if self.acquired else 0.0,
+                "max_wait_seconds": self.max_wait_seconds
+            }
+
+class SSHPool:
+    '''
+        Pool of SSH sessions to the Kali containers, keyed by SSH port (one port per
+        RUNID or Kali endpoint). Released sessions are kept open and handed to the next
+        attack on the same endpoint, after checking that they are still on the Kali shell
+        and replacing that shell with a fresh login shell.
+
+        New connections are retried with jittered exponential backoff, at most
+        max_attempts times, so a container that is still starting delays an attack by
+        seconds and a dead endpoint fails with a ConnectionError instead of blocking forever.
+    '''
+    def __init__(self, max_attempts: int = 8, backoff_base: float = 1.0, backoff_max: float = 30.0,
+            connect_timeout: float = 30, reset_timeout: float = 10, password: str = 'toor'):
+        assert max_attempts >= 1, f"At least one connection attempt is needed ({max_attempts} < 1)"
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connect_timeout = connect_timeout
+        self.reset_timeout = reset_timeout
+        self.password = password
+        self.lock = threading.Lock()
+        self.idle: Dict[str, List] = {}
+        self.hostnames: Dict[int, str] = {}
+        self.stats = SSHPoolStats()
+
+    def acquire(self, port):
+        """
+        Return a ready SSH session to the Kali container listening on port.
+        """
+        port = str(port)
+        start = time.perf_counter()
+        ssh = None
+        while ssh is None:
+            with self.lock:
+                candidate = self.idle.get(port, []).pop() if self.idle.get(port) else None
+            if candidate is None:
+                ssh = self._connect_with_backoff(port)
+            elif self._reset(candidate):
+                self.stats.add(reused=1)
+                ssh = candidate
+            else:
+                self._discard(candidate)
+        self.stats.add_wait(time.perf_counter() - start)
+        return ssh
+
+    def release(self, port, ssh, discard: bool = False):
+        """
+        Give a session back to the pool, it is reset when it is acquired again. With discard
+        it is closed instead, e.g. when the attack using it failed.
+        """
+        if ssh is None:
+            return
+        if discard or not ssh.isalive():
+            self._discard(ssh)
+            return
+        with self.lock:
+            self.idle.setdefault(str(port), []).append(ssh)
+
+    def close_all(self):
+        """
+        Close every idle session, e.g. when the containers are restarted.
+        """
+        with self.lock:
+            idle = [ssh for sessions in self.idle.values() for ssh in sessions]
+            self.idle = {}
+        for ssh in idle:
+            self._discard(ssh)
+
+    def connect(self, port):
+        """
+        Open a new SSH session and wait for the Kali prompt, raises on failure.
+        """
+        ssh = pexpect.spawn(f'ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -p{port} root@localhost',
+            encoding='utf-8')
+        try:
+            while True:
+                index = ssh.expect([
+                    "password: ",
+                    r'\(yes/no/\[fingerprint\]\)\? ',
+                    KALI_PROMPT
+                ], timeout=self.connect_timeout)
+                if index == 0:
+                    ssh.sendline(self.password)
+                elif index == 1:
+                    ssh.sendline('yes')
+                else:
+                    break
+            hostname = self._hostname(ssh)
+        except Exception:
+            ssh.close(force=True)
+            raise
+        self.hostnames[id(ssh)] = hostname
+        return ssh
+
+    def _connect_with_backoff(self, port):
+        for attempt in range(self.max_attempts):
+            try:
+                ssh = self.connect(port)
+                self.stats.add(connected=1)
+                return ssh
+            except (pexpect.exceptions.EOF, pexpect.exceptions.TIMEOUT) as e:
+                self.stats.add(failed_attempts=1)
+                if attempt == self.max_attempts - 1:
+                    raise ConnectionError(f"Kali on port {port} not ready after {self.max_attempts} attempts") from e
+                delay = random.uniform(0.5, 1.0) * min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                print(f"Kali on port {port} not ready ({type(e).__name__}), retry {attempt+1} / {self.max_attempts-1} in {delay:.1f} seconds...")
+                time.sleep(delay)
+
+    def _hostname(self, ssh) -> str:
+        ssh.sendline(HOSTNAME_COMMAND)
+        ssh.expect(HOSTNAME_PATTERN, timeout=self.reset_timeout)
+        hostname = ssh.match.group(1)
+        ssh.expect(KALI_PROMPT, timeout=self.reset_timeout)
+        return hostname
+
+    def _reset(self, ssh) -> bool:
+        """
+        Interrupt whatever the last attack left running, check that the session is still
+        on the Kali shell (not e.g. logged into the honeypot) and start a fresh shell.
+        """
+        if not ssh.isalive():
+            return False
+        try:
+            ssh.sendcontrol('c')
+            ssh.expect(KALI_PROMPT, timeout=self.reset_timeout)
+            if self._hostname(ssh) != self.hostnames.get(id(ssh)):
+                return False
+            ssh.sendline(RESET_COMMAND)
+            ssh.expect(KALI_PROMPT, timeout=self.reset_timeout)
+            return self._hostname(ssh) == self.hostnames.get(id(ssh))
+        except (pexpect.exceptions.EOF, pexpect.exceptions.TIMEOUT):
+            return False
+
+    def _discard(self, ssh):
+        self.stats.add(discarded=1)
+        self.hostnames.pop(id(ssh), None)
+        try:
+            ssh.close(force=True)
+        except Exception:
+            pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_ssh_pool() -> SSHPool:
+    """
+    Return the SSH pool shared by all attacks, configured by config.py.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SSHPool(
+                config.ssh_connect_attempts,
+                config.ssh_backoff_base,
+                config.ssh_backoff_max
+            )
+        return _pool
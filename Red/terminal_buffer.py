@@ -0,0 +1,92 @@
+import re
+from typing import List, Optional
+
+class OutputWindow:
+    '''
+        Bounded buffer of the output of a terminal command. Keeps the first head_chars
+        characters and the last tail_chars characters, and counts what was dropped in
+        between, so memory stays constant whatever the command prints.
+    '''
+    def __init__(self, tail_chars: int, head_chars: int = 0):
+        assert tail_chars > 0, f"Tail window must be positive ({tail_chars})"
+        assert head_chars >= 0, f"Head window must be non-negative ({head_chars})"
+        self.tail_chars = tail_chars
+        self.head_chars = head_chars
+        self.head = ""
+        self.tail = ""
+        self.dropped = 0
+
+    def append(self, chunk: str):
+        if len(self.head) < self.head_chars:
+            taken = self.head_chars - len(self.head)
+            self.head += chunk[:taken]
+            chunk = chunk[taken:]
+        self.tail += chunk
+        # trim lazily, at most doubling the memory, to avoid copying on every small chunk
+        if len(self.tail) > 2 * self.tail_chars:
+            self.dropped += len(self.tail) - self.tail_chars
+            self.tail = self.tail[-self.tail_chars:]
+
+    def text(self, marker: str = None) -> str:
+        """
+        The kept output, with marker between head and tail if anything was dropped.
+        """
+        tail = self.tail
+        dropped = self.dropped
+        if len(tail) > self.tail_chars:
+            dropped += len(tail) - self.tail_chars
+            tail = tail[-self.tail_chars:]
+        if dropped and marker is not None:
+            return self.head + marker.format(dropped=dropped) + tail
+        return self.head + tail
+
+    def cut_marker(self) -> str:
+        """
+        Marker for text, telling the reader how much of the output was dropped.
+        """
+        if self.head_chars:
+            return "\n***TOO LONG OUTPUT FROM COMMAND, {dropped} CHARACTERS REMOVED***\n"
+        return f"***TOO LONG OUTPUT FROM COMMAND, ONLY SHOWING THE FINAL {self.tail_chars} characters***\n"
+
+    def total_dropped(self) -> int:
+        return self.dropped + max(0, len(self.tail) - self.tail_chars)
+
+class PromptDetector:
+    '''
+        Finds the shell prompt in streamed output. Every chunk is only searched together
+        with the last overlap characters before it, instead of searching the whole output
+        again, so detection costs the same for every chunk.
+    '''
+    def __init__(self, patterns: List[str], overlap: int = 256):
+        self.regex = re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+        self.overlap = overlap
+        self.carry = ""
+        self.matched = ""
+
+    def feed(self, chunk: str) -> Optional[int]:
+        """
+        Return the end of the first prompt as an index into chunk, None if there is none yet.
+        The matched prompt is kept in self.matched.
+        """
+        data = self.carry + chunk
+        offset = len(self.carry)
+        for match in self.regex.finditer(data):
+            # prompts ending in the carried over output were already seen
+            if match.end() > offset:
+                self.carry = ""
+                self.matched = match.group(0)
+                return match.end() - offset
+        self.carry = data[-self.overlap:]
+        return None
+
+    def reset(self):
+        self.carry = ""
+        self.matched = ""
+
+class TerminalOutput(str):
+    """Output of a terminal command, with the number of characters left out of it and whether it was killed."""
+    def __new__(cls, text: str, dropped_chars: int = 0, timed_out: bool = False):
+        output = super().__new__(cls, text)
+        output.dropped_chars = dropped_chars
+        output.timed_out = timed_out
+        return output
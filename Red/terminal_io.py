@@ -1,4 +1,3 @@
-import openai
 import platform
 if platform.system() != 'Windows':
     import pexpect
@@ -6,11 +5,16 @@ import datetime
 import config
 import os
 import time
+from Red.ssh_pool import get_ssh_pool
+from Red.async_terminal import AsyncShell, get_async_backend, require_asyncssh
+from Red.terminal_buffer import OutputWindow, PromptDetector, TerminalOutput
+from Red.simulated_shell import SimulatedShell
+from Red.timeout_policy import get_timeout_policy
 
-TIMEOUT = 60
-
-openai.api_key = os.getenv('OPENAI_API_KEY')
-openai_client = openai.OpenAI()
+TERMINAL_BACKENDS = ["pexpect", "async"]
+TIMEOUT = config.command_timeout
+# output shown to the attacker, longer output is cut while the command runs
+MAX_OUTPUT_CHARS = 10000
 
 prompt_patterns = [pexpect.EOF, 
                     r'└─\x1b\[1;31m#',
@@ -21,88 +25,124 @@ prompt_patterns = [pexpect.EOF,
                     r'\:\~\$ ',
                     "Please type 'yes', 'no' or the fingerprint: "]
 
-def start_ssh():
-    try:
-        ssh = pexpect.spawn('ssh -o StrictHostKeyChecking=no -p30' +  os.getenv('RUNID') +' root@localhost', encoding='utf-8')
-        ssh.expect("root@localhost's password: ")
-        ssh.sendline('toor')
-        ssh.expect(r'└─\x1b\[1;31m#', timeout=60)
-        ssh.before.strip()
-        return ssh
-    except pexpect.exceptions.EOF:
-        print("Got EOF error, trying again")
-        time.sleep(60)
-        return start_ssh()
+def check_terminal_backend(backend: str):
+    """
+        Fail before any attack starts if the terminal backend is unknown or not installed.
+    """
+    assert backend in TERMINAL_BACKENDS, f"Terminal backend '{backend}' is not supported. Supported backends: {TERMINAL_BACKENDS}"
+    if backend == "async":
+        require_asyncssh()
 
-def send_terminal_command(connection, command):
-    try:
-        connection.send(command + "\r")
-        connection.expect(prompt_patterns, timeout=TIMEOUT)
-        if not connection.match or connection.match is pexpect.EOF:
-            matched_pattern = ""
-        elif connection.match is pexpect.EOF:
-            print(f"Debug: Got an EOF.\n\tconnection.match = {connection.match}")
-            matched_pattern = ""
-        else:
-            matched_pattern = connection.match.group(0)
+def start_ssh(port=None):
+    """
+        Get an SSH session to a Kali container from the shared pool. Defaults to the Kali container of the current RUNID.
+        Hand it back with release_ssh once the attack is done, so the next attack can reuse it.
+        With config.terminal_backend "async", the session is an AsyncShell instead of a pexpect session.
+    """
+    if port is None:
+        port = '30' + os.getenv('RUNID')
+    if config.terminal_backend == "async":
+        return get_async_backend(prompt_patterns, MAX_OUTPUT_CHARS, config.terminal_output_head_chars).open_shell(port)
+    return get_ssh_pool().acquire(port)
 
-        command_response = f"{connection.before.strip()}{matched_pattern}"
-        return command_response
-    except pexpect.exceptions.TIMEOUT:
-        connection.sendline('\r')
-        connection.expect(r'.*')
-        matched_pattern = connection.match.group(0) if connection.match else ""
-        command_response = f"{connection.before.strip()}{matched_pattern}***COMMAND TOOK TO LONG TO RUN, KILLING COMMAND***\n"
-        connection.sendline('\r')
-        connection.sendcontrol('c')
-        connection.expect(prompt_patterns + [pexpect.TIMEOUT], timeout=5)
-        matched_pattern = connection.match.group(0) if connection.match and connection.match is not pexpect.TIMEOUT else ""
-        command_response2 = f"{connection.before.strip()}{matched_pattern}"
+def release_ssh(ssh, port=None, discard: bool = False):
+    """
+        Hand a session from start_ssh back to the pool. With discard, e.g. after an error left
+        it in an unknown state, it is closed instead of reused.
+    """
+    if isinstance(ssh, AsyncShell):
+        ssh.close()
+        return
+    if port is None:
+        port = '30' + os.getenv('RUNID')
+    get_ssh_pool().release(port, ssh, discard)
 
+def read_until_prompt(connection, window: OutputWindow, detector: PromptDetector, timeout: float) -> str:
+    """
+        Stream the output of a pexpect session into window until a prompt shows up.
+        Only the bounded window is kept, instead of pexpect's whole search buffer.
+        Returns "prompt", "eof" or "timeout".
+    """
+    deadline = time.monotonic() + timeout
+    chunk = connection.buffer
+    connection.buffer = ""
+    while True:
+        if chunk:
+            end = detector.feed(chunk)
+            if end is not None:
+                window.append(chunk[:end])
+                # whatever follows the prompt is left for the next command
+                connection.buffer = chunk[end:]
+                return "prompt"
+            window.append(chunk)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return "timeout"
+        try:
+            chunk = connection.read_nonblocking(size=4096, timeout=remaining)
+        except pexpect.exceptions.TIMEOUT:
+            return "timeout"
+        except pexpect.exceptions.EOF:
+            print("Terminal connection closed (EOF) while waiting for the prompt.")
+            return "eof"
 
-        return command_response + command_response2
+def window_response(window: OutputWindow, matched_pattern: str) -> TerminalOutput:
+    text = window.text(window.cut_marker())
+    if matched_pattern and text.endswith(matched_pattern):
+        text = text[:-len(matched_pattern)]
+    return TerminalOutput(f"{text.strip()}{matched_pattern}", window.total_dropped())
 
-command_messages = [
-    {
-        'role': 'system',
-        'content': 'You are simulating a command execution system in Kali Linux. You will receive commands to run and you should respond with the output of the command as if it was executed in a terminal.'
-    },
-]
+def send_terminal_command(connection, command):
+    """
+        Run a command in the terminal and wait for the prompt. With config.adaptive_timeouts the
+        deadline depends on how long commands of the same family took before, otherwise it is TIMEOUT.
+        Every run is recorded to the timeout policy.
+    """
+    policy = get_timeout_policy()
+    timeout = policy.timeout_for(command) if config.adaptive_timeouts else TIMEOUT
+    start = time.monotonic()
+    if isinstance(connection, AsyncShell):
+        command_response = connection.send_command(command, timeout)
+    else:
+        command_response = send_pexpect_command(connection, command, timeout)
+    policy.record(command, time.monotonic() - start, command_response.timed_out, timeout)
+    return command_response
+
+def send_pexpect_command(connection, command, timeout):
+    window = OutputWindow(MAX_OUTPUT_CHARS, config.terminal_output_head_chars)
+    detector = PromptDetector([pattern for pattern in prompt_patterns if isinstance(pattern, str)])
+    connection.send(command + "\r")
+    status = read_until_prompt(connection, window, detector, timeout)
+    if status != "timeout":
+        return window_response(window, detector.matched if status == "prompt" else "")
+
+    command_response = window_response(window, "")
+    window = OutputWindow(MAX_OUTPUT_CHARS, config.terminal_output_head_chars)
+    detector.reset()
+    connection.sendline('\r')
+    connection.sendcontrol('c')
+    status = read_until_prompt(connection, window, detector, 5)
+    command_response2 = window_response(window, detector.matched if status == "prompt" else "")
+
+    return TerminalOutput(
+        f"{command_response}***COMMAND TOOK TO LONG TO RUN, KILLING COMMAND***\n{command_response2}",
+        command_response.dropped_chars + command_response2.dropped_chars,
+        timed_out=True
+    )
 
 def terminal_input(command: str, ssh):
     """
         Run a command on the Kali Linux machine over SSH or simulate its execution with an LLM.
+        When simulating, ssh is the SimulatedShell of the session.
+        Output over MAX_OUTPUT_CHARS is cut to its end, plus its start if config.terminal_output_head_chars,
+        with a marker where it was cut, and the number of characters left out is kept in dropped_chars
+        of the returned output.
     """
-    command_response = ""
-    
-    # Run command on Kali over SSH
+    # Run command on Kali over SSH, the output is already cut while it is read
     if not config.simulate_command_line:
-        command_response = send_terminal_command(ssh, command)
-        if len(command_response) > 10000:
-            command_response = command_response[-10000:] + "\n***TOO LONG OUTPUT FROM COMMAND, ONLY SHOWING THE FINAL 10000 characters***"
-        
-        return command_response 
-
-    # Simulate command execution
-    else:
-        command_messages.append({
-            'role': 'user',
-            'content': f'Run the command: {command}'
-        })
+        return send_terminal_command(ssh, command)
 
-        # send to OpenAI and get back the assistant message
-        raw_resp = openai_client.chat.completions.create(
-            model='gpt-4o-mini',
-            messages=command_messages
-        )
-        msg = raw_resp.choices[0].message
-        # extract content string and append
-        command_text = msg.content
-        command_messages.append({
-            'role': 'assistant',
-            'content': command_text
-        })
-        
-    return command_text
-    
-    # return shell output in non-simulated or if simulate_execution is False
+    # Simulate command execution, each session has its own simulated shell
+    if ssh is None:
+        ssh = SimulatedShell()
+    return ssh.run(command)
@@ -0,0 +1,133 @@
+import json
+import math
+import os
+import re
+import shlex
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import config
+
+# wrappers that do not tell what the command is
+COMMAND_PREFIXES = {"sudo", "env", "nohup", "time", "timeout", "nice"}
+# flags and numbers (durations, priorities) given to the wrappers, e.g. timeout -s KILL 30
+PREFIX_ARGUMENT = re.compile(r"^(-.*|\d+(\.\d+)?[smhd]?|[A-Z]+)$")
+
+def command_family(command: str) -> str:
+    """
+    First program of the command plus its flags, e.g. 'nmap -p- -sV' for 'nmap -sV -p- 10.0.0.1'.
+    Values and targets are left out, so runs against other hosts share the family.
+    """
+    first_command = command.split("|")[0].split(";")[0].split("&&")[0]
+    try:
+        tokens = shlex.split(first_command)
+    except ValueError:
+        tokens = first_command.split()
+    while tokens and (tokens[0] in COMMAND_PREFIXES or "=" in tokens[0]):
+        wrapper = tokens.pop(0)
+        while wrapper in COMMAND_PREFIXES and tokens and PREFIX_ARGUMENT.match(tokens[0]):
+            tokens.pop(0)
+    if not tokens:
+        return ""
+    program = os.path.basename(tokens[0])
+    flags = sorted(set(token for token in tokens[1:] if token.startswith("-")))
+    return " ".join([program] + flags)
+
+class TimeoutPolicy:
+    '''
+        Per command family deadlines learned from how long commands took before. The
+        deadline of a family with at least min_samples runs is margin times the given
+        quantile of its durations, clamped to [min_timeout, max_timeout]. Other families
+        get default_timeout.
+
+        Runs that timed out are counted at twice their deadline, so a family of long scans
+        that keeps getting killed gets a longer deadline each time until it fits. Commands
+        still return as soon as the prompt shows up, the deadline only bounds hanging ones.
+        The durations are saved to path and shared between experiments.
+    '''
+    def __init__(self, path=None, default_timeout: float = 60, min_timeout: float = 10,
+            max_timeout: float = 600, quantile: float = 0.95, margin: float = 1.5,
+            min_samples: int = 5, max_samples: int = 200):
+        assert 0 < min_timeout <= max_timeout, f"Invalid timeout bounds [{min_timeout}, {max_timeout}]"
+        self.path = Path(path) if path else None
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.quantile = quantile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.durations: Dict[str, List[float]] = {}
+        self.timeouts: Dict[str, int] = {}
+        self.unsaved = 0
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    def timeout_for(self, command: str) -> float:
+        family = command_family(command)
+        with self.lock:
+            durations = sorted(self.durations.get(family, []))
+        if len(durations) < self.min_samples:
+            return self.default_timeout
+        index = max(0, math.ceil(self.quantile * len(durations)) - 1)
+        return min(self.max_timeout, max(self.min_timeout, self.margin * durations[index]))
+
+    def record(self, command: str, duration: float, timed_out: bool = False, deadline: float = None):
+        family = command_family(command)
+        if not family:
+            return
+        if timed_out:
+            duration = 2 * (deadline or duration)
+        with self.lock:
+            durations = self.durations.setdefault(family, [])
+            durations.append(duration)
+            del durations[:-self.max_samples]
+            if timed_out:
+                self.timeouts[family] = self.timeouts.get(family, 0) + 1
+            self.unsaved += 1
+            save = self.unsaved >= 20
+        if save:
+            self.save()
+
+    def load(self):
+        with open(self.path, "r", encoding="utf8") as f:
+            data = json.load(f)
+        with self.lock:
+            self.durations = {family: entry["durations"] for family, entry in data.items()}
+            self.timeouts = {family: entry.get("timeouts", 0) for family, entry in data.items()}
+
+    def save(self):
+        if self.path is None:
+            return
+        with self.lock:
+            data = {
+                family: {"durations": list(durations), "timeouts": self.timeouts.get(family, 0)}
+                for family, durations in self.durations.items()
+            }
+            self.unsaved = 0
+            # written and renamed under the lock, so concurrent saves cannot interleave
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf8") as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, self.path)
+
+_policy = None
+_policy_lock = threading.Lock()
+
+def get_timeout_policy() -> TimeoutPolicy:
+    """
+    Return the timeout policy shared by all sessions, configured by config.py.
+    """
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = TimeoutPolicy(
+                config.timeout_stats_path,
+                config.command_timeout,
+                config.command_timeout_min,
+                config.command_timeout_max
+            )
+        return _policy
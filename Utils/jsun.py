@@ -1,5 +1,6 @@
 import os
 import json
+import threading
 from pathlib import Path
 
 
@@ -42,17 +43,87 @@ def save_json_to_file(data, path: Path, verbose: bool = True):
     if verbose:
         print("File written:", os.path.exists(path), "Size:", os.path.getsize(path))
 
+def resolve_json_path(path):
+    """
+    Return the path of the JSON file, or of its JSON lines sibling (file.json -> file.jsonl)
+    if only that one exists. Returns None if neither exists.
+    """
+    path = Path(path)
+    if path.exists():
+        return path
+    if path.suffix == '.json' and path.with_suffix('.jsonl').exists():
+        return path.with_suffix('.jsonl')
+    return None
+
 def load_json(path):
     """
     Load a JSON file from the given path and return its contents as a Python object.
+    JSON lines files are loaded as a list, and file.json falls back to file.jsonl.
     """
+    path = Path(path)
+    resolved_path = resolve_json_path(path)
+
     # check if file exists
-    if not path.exists():
+    if resolved_path is None:
         raise FileNotFoundError(f"Path {path} does not exist.")
 
     # check if file is json
-    if not path.suffix == '.json':
+    if resolved_path.suffix == '.jsonl':
+        return list(iter_jsonl(resolved_path))
+    if not resolved_path.suffix == '.json':
         raise ValueError(f"Path {path} is not a JSON file.")
 
-    with open(path, 'r', encoding="utf8") as f:
+    with open(resolved_path, 'r', encoding="utf8") as f:
         return json.load(f)
+
+def iter_jsonl(path):
+    """
+    Lazily yield the records of a JSON lines file, one per line.
+    """
+    with open(path, 'r', encoding="utf8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class JsonlWriter:
+    '''
+        Append-only writer for JSON lines files. The file stays open and is flushed every
+        flush_every records, so a write costs the same however long the file already is.
+        Use it instead of append_json_to_file for logs written once per message or session.
+    '''
+    def __init__(self, path, flush_every: int = 1, truncate: bool = False):
+        assert flush_every >= 1, f"flush_every must be positive ({flush_every} < 1)"
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self.unflushed = 0
+        self.lock = threading.Lock()
+        self.file = open(self.path, 'w' if truncate else 'a', encoding="utf8")
+
+    def write(self, data):
+        line = json.dumps(data) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.unflushed += 1
+            if self.unflushed >= self.flush_every:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self._flush()
+                self.file.close()
+
+    def _flush(self):
+        self.file.flush()
+        self.unflushed = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import openai
+from openai.types.chat import ChatCompletion
+
+import config
+from Utils.pricing import CostTracker
+
+TRANSPORT_MODES = ["passthrough", "record", "replay"]
+
+class CassetteMissError(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+# request options that do not change the response
+NON_SEMANTIC_KWARGS = {"timeout", "extra_headers", "extra_query"}
+
+def request_key(kwargs: Dict[str, Any]) -> str:
+    """
+    Hash of everything that determines the LLM response we want to replay: all keyword
+    arguments of the request except NON_SEMANTIC_KWARGS. Arguments set to None count as
+    not given.
+    """
+    request = {
+        name: value for name, value in kwargs.items()
+        if name not in NON_SEMANTIC_KWARGS and value is not None
+    }
+    if "model" in request:
+        request["model"] = str(getattr(request["model"], "value", request["model"]))
+    payload = json.dumps(
+        request,
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+class CassetteStore:
+    '''
+        On-disk store of recorded chat completions, a single SQLite file holding
+        zlib-compressed JSON responses. The same request can be recorded several times;
+        each recording is stored under the request key and its occurrence number.
+    '''
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT NOT NULL, occurrence INTEGER NOT NULL, response BLOB NOT NULL, "
+                "PRIMARY KEY (key, occurrence))"
+            )
+
+    def get(self, key: str, occurrence: int) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT response FROM responses WHERE key = ? AND occurrence = ?", (key, occurrence)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def count(self, key: str) -> int:
+        with self.lock:
+            row = self.connection.execute("SELECT COUNT(*) FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0]
+
+    def put(self, key: str, occurrence: int, response: Dict[str, Any]):
+        blob = zlib.compress(json.dumps(response, separators=(",", ":")).encode("utf8"))
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, occurrence, response) VALUES (?, ?, ?)",
+                (key, occurrence, blob)
+            )
+
+# errors worth retrying, anything else is raised immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError
+)
+
+class TokenBucket:
+    '''
+        Token bucket refilled at rate_per_minute, holding at most one minute of tokens.
+        Callers reserve what they need and sleep until it is available, so concurrent
+        callers are spaced out instead of all retrying at once.
+    '''
+    def __init__(self, rate_per_minute: float):
+        assert rate_per_minute > 0, f"Rate must be positive ({rate_per_minute} <= 0)"
+        self.rate = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take amount tokens and return how many seconds to wait before using them.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+class LLMStats:
+    """Counters of the API calls, used to tune throughput against the account limits."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.throttled_seconds = 0.0
+        self.backoff_seconds = 0.0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "throttled_seconds": self.throttled_seconds,
+                "backoff_seconds": self.backoff_seconds
+            }
+
+def retry_after_seconds(error) -> Optional[float]:
+    """
+    Seconds the API asked us to wait, from the Retry-After headers of the error response.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+def estimate_request_tokens(kwargs) -> int:
+    prompt_tokens = len(json.dumps(kwargs.get("messages"), default=str)) // 4
+    completion_tokens = kwargs.get("max_completion_tokens") or kwargs.get("max_tokens") or 0
+    return prompt_tokens + completion_tokens
+
+class LLMTransport:
+    '''
+        Sends chat completion requests to OpenAI, records them to a cassette or replays
+        them from one:
+        - passthrough: call the API only.
+        - record: call the API and store every response in the cassette.
+        - replay: answer from the cassette without any network access. The n-th identical
+          request gets the n-th recorded response, or the last one if it was recorded fewer times.
+
+        API calls are paced by optional requests and tokens per minute buckets, and failed
+        calls are retried at most max_retries times with jittered exponential backoff,
+        or after the delay given by the Retry-After header.
+
+        The usage of every API response is priced by costs, replayed responses are free.
+    '''
+    def __init__(self, mode: str = "passthrough", cassette_path=None,
+            requests_per_minute: float = None, tokens_per_minute: float = None,
+            max_retries: int = 6, backoff_base: float = 1.0, backoff_max: float = 60.0,
+            budget_usd: float = None):
+        assert mode in TRANSPORT_MODES, f"Transport mode '{mode}' is not supported. Supported modes: {TRANSPORT_MODES}"
+        assert mode == "passthrough" or cassette_path, f"Transport mode '{mode}' needs a cassette path"
+        assert max_retries >= 0, f"Number of retries must be non-negative ({max_retries} < 0)"
+        self.mode = mode
+        self.store = CassetteStore(cassette_path) if mode != "passthrough" else None
+        self.occurrences: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self._client = None
+
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = LLMStats()
+        self.costs = CostTracker(budget_usd)
+
+    @property
+    def client(self) -> openai.OpenAI:
+        # created on first use, so replaying needs no API key
+        if self._client is None:
+            # retries are handled by the transport
+            self._client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return self._client
+
+    def chat_completion(self, **kwargs) -> ChatCompletion:
+        if self.mode == "passthrough":
+            return self._call_api(kwargs)
+
+        key = request_key(kwargs)
+        with self.lock:
+            occurrence = self.occurrences.get(key, 0)
+            self.occurrences[key] = occurrence + 1
+
+        if self.mode == "replay":
+            recorded = self.store.get(key, occurrence)
+            if recorded is None:
+                num_recorded = self.store.count(key)
+                if num_recorded == 0:
+                    raise CassetteMissError(f"No recorded response for request {key[:12]} in {self.store.path}")
+                recorded = self.store.get(key, num_recorded - 1)
+            return ChatCompletion.model_validate(recorded)
+
+        response = self._call_api(kwargs)
+        self.store.put(key, occurrence, response.model_dump(mode="json"))
+        return response
+
+    def _call_api(self, kwargs) -> ChatCompletion:
+        for attempt in range(self.max_retries + 1):
+            self._throttle(kwargs)
+            try:
+                self.stats.add(requests=1)
+                response = self.client.chat.completions.create(**kwargs)
+                self.costs.add_usage(kwargs.get("model"), getattr(response, "usage", None))
+                return response
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.RateLimitError):
+                    self.stats.add(rate_limited=1)
+                    if getattr(e, "code", None) == "insufficient_quota":
+                        print("OpenAI API quota exceeded, might be out of money:", e.message)
+                        raise
+                if attempt == self.max_retries:
+                    raise
+
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = random.uniform(0.5, 1.0) * min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                print(f"OpenAI API call failed ({type(e).__name__}), retry {attempt+1} / {self.max_retries} in {delay:.1f} seconds...")
+                self.stats.add(retries=1, backoff_seconds=delay)
+                time.sleep(delay)
+
+    def _throttle(self, kwargs):
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.reserve(estimate_request_tokens(kwargs)))
+        if wait > 0:
+            self.stats.add(throttled_seconds=wait)
+            time.sleep(wait)
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_transport() -> LLMTransport:
+    """
+    Return the transport shared by all LLM calls, configured by config.py.
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = LLMTransport(
+                config.llm_transport_mode,
+                config.llm_cassette_path,
+                config.openai_requests_per_minute,
+                config.openai_tokens_per_minute,
+                config.openai_max_retries,
+                config.openai_backoff_base,
+                config.openai_backoff_max,
+                config.budget_usd
+            )
+        return _transport
+
+def set_transport(transport: LLMTransport):
+    global _transport
+    with _transport_lock:
+        _transport = transport
+
+def chat_completion(**kwargs) -> ChatCompletion:
+    """
+    Drop-in replacement for openai_client.chat.completions.create going through the shared transport.
+    """
+    return get_transport().chat_completion(**kwargs)
@@ -1,32 +1,99 @@
 import re
+from functools import lru_cache
+from typing import Iterable, List, Tuple
 
-def divide_statements(session: str, add_special_token = False, special_token="[STAT]"):
+# statement separators, each followed by a space as in the LogPrecis corpus
+SEPARATORS_REGEX = re.compile(r"(; |\|\|? |&& )")
+# quoted strings and escaped characters are matched whole, so only the separators outside them are captured
+SHELL_TOKENS_REGEX = re.compile(r"""'[^']*'?|"(?:[^"\\]|\\.)*"?|\\.|(; |\|\|? |&& )""", re.DOTALL)
+QUOTE_CHARS = frozenset("\\'\"")
+CACHE_SIZE = 65536
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _split_statements(session: str, shell_aware: bool) -> Tuple[str, ...]:
+    if session.strip()[-1] != ";":
+        session += " ;"
+    session += " "
+    if shell_aware and not QUOTE_CHARS.isdisjoint(session):
+        statements = _shell_split(session)
+    else:
+        statements = SEPARATORS_REGEX.split(session)
+    # concatenate with separators
+    if len(statements) != 1:
+        pieces = [
+            "".join(statements[i : i + 2]).strip()
+            for i in range(0, len(statements) - 1, 2)
+        ]
+        # text after the last separator, left by an unterminated quote or a trailing ";\n",
+        # is dropped by the LogPrecis split
+        if shell_aware and statements[-1].strip():
+            pieces.append(_terminate(statements[-1].strip()))
+        return tuple(pieces)
+    # cases in which there is only 1 statement > must end with " ;"
+    if shell_aware:
+        return (_terminate(statements[0].strip()),)
+    return (statements[0].strip() + " ;",)
+
+def _terminate(statement: str) -> str:
+    # the " ;" added to the session is kept inside an unterminated quote
+    return statement if statement.endswith(";") else statement + " ;"
+
+def _shell_split(session: str) -> List[str]:
+    """
+    Same output as SEPARATORS_REGEX.split, but separators within quotes or escaped with a
+    backslash do not split. An unterminated quote runs to the end of the session.
+    """
+    pieces = []
+    start = 0
+    for match in SHELL_TOKENS_REGEX.finditer(session):
+        separator = match.group(1)
+        if separator is not None:
+            pieces.append(session[start:match.start()])
+            pieces.append(separator)
+            start = match.end()
+    pieces.append(session[start:])
+    return pieces
+
+def divide_statements(session: str, add_special_token = False, special_token="[STAT]", shell_aware=True):
     """Divide a session into statements.
     This function splits a session into statements using specified separators. Optionally,
     it adds a special token at the beginning of each statement.
+    Separators within quotes or escaped with a backslash do not split, unless shell_aware is
+    False, which gives the split of the LogPrecis corpus the labels were made for.
+    Sessions repeat a lot in honeypot logs, so splits are cached.
     Args:
         session (str): The session to be divided into statements.
         add_special_token (bool): Whether to add a special token to each statement.
         special_token (str, optional): The special token to be added. Defaults to "[STAT]".
+        shell_aware (bool): Whether quotes and escapes are taken into account. Defaults to True.
     Returns:
         list of str: A list of statements.
     """
-    if session.strip()[-1] != ";":
-        session += " ;"
-    statements = re.split(r"(; |\|\|? |&& )", session + " ")
-    # concatenate with separators
-    if len(statements) != 1:
-        statements = [
-            "".join(statements[i : i + 2]).strip()
-            for i in range(0, len(statements) - 1, 2)
-        ]
-    else:  # cases in which there is only 1 statement > must end with " ;"
-        statements = [statements[0].strip() + " ;"]
+    statements = list(_split_statements(session, shell_aware))
     if add_special_token:
         # Add separator
         statements = [f"{special_token} " + el for el in statements]
     return statements
 
+def divide_sessions(sessions: Iterable[str], add_special_token = False, special_token="[STAT]", shell_aware=True):
+    """Divide many sessions into statements at once.
+    Each distinct session is split once, the others reuse its statements.
+    Args:
+        sessions (iterable of str): The sessions to be divided into statements.
+        add_special_token (bool): Whether to add a special token to each statement.
+        special_token (str, optional): The special token to be added. Defaults to "[STAT]".
+        shell_aware (bool): Whether quotes and escapes are taken into account. Defaults to True.
+    Returns:
+        list of list of str: The statements of each session, in order.
+    """
+    splits = {}
+    result = []
+    for session in sessions:
+        if session not in splits:
+            splits[session] = divide_statements(session, add_special_token, special_token, shell_aware)
+        result.append(list(splits[session]))
+    return result
+
 
 def assign_labels2tokens(labels, statements):
     """Assign labels to tokens based on statements.
@@ -3,7 +3,8 @@ import datetime
 import os
 import json
 from Red.reconfiguration import EntropyReconfigCriterion, BasicReconfigCriterion, \
-    MeanIncreaseReconfigCriterion, NeverReconfigCriterion
+    MeanIncreaseReconfigCriterion, NeverReconfigCriterion, SessionLengthReconfigCriterion, \
+    ChangePointReconfigCriterion, BanditReconfigCriterion
 from Red.model import ReconfigCriteria
 
 def create_experiment_folder(experiment_name=None):
@@ -30,13 +31,15 @@ def create_experiment_folder(experiment_name=None):
     return path
 
 class MetaDataObject:
-    def __init__(self, llm_model_sangria, llm_model_honeypot, num_of_attacks, min_num_of_attacks_reconfig, max_session_length, reconfig_method):
+    def __init__(self, llm_model_sangria, llm_model_honeypot, num_of_attacks, min_num_of_attacks_reconfig, max_session_length, reconfig_method,
+            followup_after_tool_call=True):
         self.llm_model_sangria = llm_model_sangria
         self.llm_model_honeypot = llm_model_honeypot
         self.num_of_attacks = num_of_attacks
         self.min_num_of_attacks_reconfig = min_num_of_attacks_reconfig
         self.max_session_length = max_session_length
         self.reconfig_method = reconfig_method
+        self.followup_after_tool_call = followup_after_tool_call
 
     def to_dict(self):
         return {
@@ -45,7 +48,8 @@ class MetaDataObject:
             "num_of_attacks": self.num_of_attacks,
             "min_num_of_attacks_reconfig": self.min_num_of_attacks_reconfig,
             "max_session_length": self.max_session_length,
-            "reconfig_method": self.reconfig_method
+            "reconfig_method": self.reconfig_method,
+            "followup_after_tool_call": self.followup_after_tool_call
         }
 
 def create_metadata():
@@ -55,7 +59,8 @@ def create_metadata():
         num_of_attacks=config.num_of_attacks,
         min_num_of_attacks_reconfig=config.min_num_of_attacks_reconfig,
         max_session_length=config.max_session_length,
-        reconfig_method=config.reconfig_method
+        reconfig_method=config.reconfig_method,
+        followup_after_tool_call=config.followup_after_tool_call
     )
 
     return md
@@ -86,6 +91,29 @@ def select_reconfigurator(reconfigurator_method: ReconfigCriteria):
                     config.en_window_size,
                     config.reset_every_reconfig
                 )
+        case ReconfigCriteria.SESSION_LENGTH:
+            reconfigurator = SessionLengthReconfigCriterion(
+                    config.sl_statistic,
+                    config.sl_window_size,
+                    config.sl_threshold,
+                    config.reset_every_reconfig
+                )
+        case ReconfigCriteria.CHANGE_POINT:
+            reconfigurator = ChangePointReconfigCriterion(
+                    config.cp_method,
+                    config.cp_delta,
+                    config.cp_threshold,
+                    config.cp_warmup,
+                    config.reset_every_reconfig
+                )
+        case ReconfigCriteria.BANDIT:
+            reconfigurator = BanditReconfigCriterion(
+                    config.ba_algorithm,
+                    config.ba_reward,
+                    config.ba_sessions_per_pull,
+                    config.ba_exploration,
+                    config.reset_every_reconfig
+                )
         case _:
             raise ValueError(f"The reconfiguration criterion {config.reconfig_method} is not supported.")
         
@@ -0,0 +1,140 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from Red.model import LLMModel
+
+class ModelPrice:
+    """USD per 1M input, cached input and output tokens."""
+    def __init__(self, input: float, cached_input: float, output: float):
+        self.input = input
+        self.cached_input = cached_input
+        self.output = output
+
+    def __repr__(self):
+        return f"ModelPrice(input={self.input}, cached_input={self.cached_input}, output={self.output})"
+
+# OpenAI list prices, local Ollama models are free
+PRICES: Dict[LLMModel, ModelPrice] = {
+    LLMModel.GPT_4_1_NANO: ModelPrice(0.10, 0.025, 0.40),
+    LLMModel.GPT_4_1: ModelPrice(2.00, 0.50, 8.00),
+    LLMModel.GPT_3_5_TURBO: ModelPrice(0.50, 0.50, 1.50),
+    LLMModel.GPT_4: ModelPrice(30.00, 30.00, 60.00),
+    LLMModel.GPT_4O_MINI: ModelPrice(0.15, 0.075, 0.60),
+    LLMModel.GPT_4_1_MINI: ModelPrice(0.40, 0.10, 1.60),
+    LLMModel.O4_MINI: ModelPrice(1.10, 0.275, 4.40),
+    LLMModel.OLLAMA_LLAMA32_3b: ModelPrice(0.0, 0.0, 0.0),
+    LLMModel.OLLAMA_DEEPSEEK_R1_5b: ModelPrice(0.0, 0.0, 0.0),
+}
+
+def get_price(model) -> Optional[ModelPrice]:
+    try:
+        return PRICES[LLMModel(model)]
+    except (ValueError, KeyError):
+        return None
+
+def calculate_price(model, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    """
+    Price in USD of the given tokens, prompt_tokens not including the cached ones.
+    Models without a price cost nothing.
+    """
+    price = get_price(model)
+    if price is None:
+        return 0.0
+    return (prompt_tokens * price.input
+        + cached_tokens * price.cached_input
+        + completion_tokens * price.output) / 1_000_000
+
+def usage_tokens(usage) -> Dict[str, int]:
+    """
+    Uncached prompt, cached and completion tokens of the usage of a chat completion.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+    return {
+        "prompt_tokens": usage.prompt_tokens - cached_tokens,
+        "cached_tokens": cached_tokens,
+        "completion_tokens": usage.completion_tokens
+    }
+
+class CostTracker:
+    '''
+        Running spend of all LLM calls, per model. Updated from the usage of every
+        chat completion, so concurrent attacks, the Blue pipeline and the labelers all
+        count towards the same budget. budget_usd=None tracks without a limit.
+
+        Calls made inside category(name) are also added to the spend of that category,
+        e.g. to tell apart what generating configurations in the background costs.
+    '''
+    def __init__(self, budget_usd: float = None):
+        assert budget_usd is None or budget_usd > 0, f"Budget must be positive ({budget_usd})"
+        self.budget_usd = budget_usd
+        self.lock = threading.Lock()
+        self.spent_usd = 0.0
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.unpriced_models = set()
+        self.categories: Dict[str, float] = {}
+        self.local = threading.local()
+
+    def add_usage(self, model, usage) -> float:
+        """
+        Add the usage of a chat completion and return its price.
+        """
+        if usage is None:
+            return 0.0
+        tokens = usage_tokens(usage)
+        cost = calculate_price(model, **tokens)
+        model = str(getattr(model, "value", model))
+        with self.lock:
+            if get_price(model) is None and model not in self.unpriced_models:
+                self.unpriced_models.add(model)
+                print(f"No price known for model {model}, its calls are counted as free.")
+            entry = self.models.setdefault(model, {
+                "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0
+            })
+            for key, value in tokens.items():
+                entry[key] += value
+            entry["cost_usd"] += cost
+            self.spent_usd += cost
+            category = getattr(self.local, "category", None)
+            if category is not None:
+                self.categories[category] = self.categories.get(category, 0.0) + cost
+        return cost
+
+    @contextmanager
+    def category(self, name: str):
+        """
+        Count the calls made by this thread inside the block towards the spend of category name.
+        """
+        previous = getattr(self.local, "category", None)
+        self.local.category = name
+        try:
+            yield
+        finally:
+            self.local.category = previous
+
+    def category_spent(self, name: str) -> float:
+        with self.lock:
+            return self.categories.get(name, 0.0)
+
+    def exceeded(self) -> bool:
+        return self.budget_usd is not None and self.spent_usd >= self.budget_usd
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "budget_usd": self.budget_usd,
+                "spent_usd": self.spent_usd,
+                "models": {model: dict(entry) for model, entry in self.models.items()},
+                "categories": dict(self.categories)
+            }
+
+    def restore(self, state: Dict[str, Any]):
+        """
+        Continue from the spend saved with to_dict, e.g. when resuming an experiment.
+        """
+        with self.lock:
+            self.spent_usd = state["spent_usd"]
+            self.models = {model: dict(entry) for model, entry in state["models"].items()}
+            # checkpoints from before the spend was split into categories
+            self.categories = dict(state.get("categories", {}))
@@ -0,0 +1,119 @@
+import math
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List
+
+from Utils.jsun import save_json_to_file
+
+QUANTILES = [0.5, 0.95, 0.99]
+
+class SessionTracer:
+    '''
+        Lightweight tracer for one attack session. Time spent in each stage of an
+        iteration (OpenAI calls, terminal commands, honeypot logs, log writes) is
+        summed per iteration. Spans outside the iteration loop are kept in a separate
+        session record.
+    '''
+    def __init__(self, attack_index: int = 0):
+        self.attack_index = attack_index
+        self.session: Dict[str, Any] = {"attack": attack_index, "iteration": "session"}
+        self.iterations: List[Dict[str, Any]] = []
+        self.current = self.session
+
+    def start_iteration(self, iteration: int):
+        self.current = {"attack": self.attack_index, "iteration": iteration}
+        self.iterations.append(self.current)
+
+    def end_iteration(self):
+        self.current = self.session
+
+    @contextmanager
+    def span(self, stage: str):
+        record = self.current
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record[stage] = record.get(stage, 0.0) + time.perf_counter() - start
+
+    def records(self) -> List[Dict[str, Any]]:
+        return self.iterations + [self.session]
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+def summarize_records(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Count, mean, total and p50/p95/p99 seconds of every stage over the iteration records.
+    """
+    stages: Dict[str, List[float]] = {}
+    for record in records:
+        if record.get("iteration") == "session":
+            prefix = "session_"
+        else:
+            prefix = ""
+        for key, value in record.items():
+            if key in ("attack", "iteration"):
+                continue
+            stages.setdefault(prefix + key, []).append(value)
+
+    summary = {}
+    for stage, values in sorted(stages.items()):
+        values = sorted(values)
+        summary[stage] = {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "total": sum(values),
+            **{f"p{int(q * 100)}": percentile(values, q) for q in QUANTILES}
+        }
+    return summary
+
+def to_prometheus(summaries: Dict[str, Dict[str, Dict[str, float]]]) -> str:
+    """
+    Prometheus text exposition of the stage summaries of every configuration.
+    """
+    lines = [
+        "# HELP violet_stage_seconds Seconds spent per attack iteration stage.",
+        "# TYPE violet_stage_seconds summary"
+    ]
+    for config_label, summary in summaries.items():
+        for stage, stats in summary.items():
+            labels = f'stage="{stage}",config="{config_label}"'
+            for q in QUANTILES:
+                lines.append(f'violet_stage_seconds{{{labels},quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f"violet_stage_seconds_sum{{{labels}}} {stats['total']:.6f}")
+            lines.append(f"violet_stage_seconds_count{{{labels}}} {stats['count']}")
+    return "\n".join(lines) + "\n"
+
+class TimingRecorder:
+    '''
+        Collects the tracer records of all sessions of an experiment, per configuration,
+        and writes the per-configuration p50/p95/p99 summaries. With export set to
+        "json" or "prometheus", the summaries of all configurations are also written to
+        metrics.json or metrics.prom in the experiment folder after every session.
+    '''
+    def __init__(self, base_path, export: str = None):
+        assert export in (None, "json", "prometheus"), f"Export format '{export}' is not supported."
+        self.base_path = Path(base_path)
+        self.export = export
+        self.records: Dict[str, List[Dict[str, Any]]] = {}
+
+    def add(self, config_label: str, records: List[Dict[str, Any]], config_path):
+        self.records.setdefault(config_label, []).extend(records)
+        summary = summarize_records(self.records[config_label])
+        save_json_to_file(summary, Path(config_path) / "timing_summary.json", False)
+        if self.export is not None:
+            self.write_export()
+
+    def write_export(self):
+        summaries = {label: summarize_records(records) for label, records in self.records.items()}
+        if self.export == "json":
+            save_json_to_file(summaries, self.base_path / "metrics.json", False)
+        else:
+            tmp_path = self.base_path / "metrics.prom.tmp"
+            with open(tmp_path, "w", encoding="utf8") as f:
+                f.write(to_prometheus(summaries))
+            tmp_path.replace(self.base_path / "metrics.prom")
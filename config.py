@@ -12,11 +12,71 @@ reconfig_method: ReconfigCriteria = ReconfigCriteria.BASIC
 
 # General settings
 simulate_command_line = False
+## LLM transport: "passthrough", "record" (store every response) or "replay" (offline from the cassette)
+llm_transport_mode: str = "passthrough"
+llm_cassette_path: str = "logs/cassettes/llm_cassette.sqlite"
+## OpenAI rate limiting shared by all calls, None disables the limit
+openai_requests_per_minute: float = None
+openai_tokens_per_minute: float = None
+openai_max_retries: int = 6
+openai_backoff_base: float = 1.0
+openai_backoff_max: float = 60.0
+## Spend limit in USD of all LLM calls, None disables it. Once it is reached no new
+## attacks are started and the experiment stops after saving its checkpoint, so it can be
+## continued with --resume. Running sessions end at their next iteration if
+## budget_end_sessions, otherwise they finish first. Sessions ended early are not recorded
+## and run again on --resume, their spend is recorded in discarded_attacks.jsonl.
+budget_usd: float = None
+budget_end_sessions: bool = True
+## Per-iteration timings are always saved, optionally also exported for all
+## configurations as "json" (metrics.json) or "prometheus" (metrics.prom), None disables it
+tracing_export: str = None
+
+# Concurrency settings
+## Number of attack sessions running at the same time, at most one per Kali endpoint.
+## Attacks are only started ahead as far as the reconfiguration criterion cannot reconfigure
+## (basic, session_length, bandit and min_num_of_attacks_reconfig bound it), so basic with
+## interval 1 runs one attack at a time. Other criteria can reconfigure after any session,
+## which discards up to num_parallel_attacks - 1 started attacks; their LLM spend still
+## counts towards the budget and is recorded in discarded_attacks.jsonl.
+num_parallel_attacks: int = 1
+## (ssh port, ip) of each Kali container. Empty uses the Kali container of the current RUNID.
+kali_endpoints: list = []
+## SSH sessions to the Kali containers are pooled, new connections are retried with backoff
+ssh_connect_attempts: int = 8
+ssh_backoff_base: float = 1.0
+ssh_backoff_max: float = 30.0
+## Terminal of the attacker: "pexpect" (pooled ssh processes) or "async" (asyncssh
+## shells on one event loop, for many parallel attacks)
+terminal_backend: str = "pexpect"
+## Characters kept from the start of long command output, besides its last 10000
+## characters. 0 keeps only the end, as the attacker prompt describes.
+terminal_output_head_chars: int = 0
+## Deadline of terminal commands. With adaptive_timeouts, every command family (program
+## and flags) gets a deadline learned from its past durations, within the given bounds.
+## The durations are recorded either way and shared between experiments.
+command_timeout: float = 60
+adaptive_timeouts: bool = False
+command_timeout_min: float = 10
+command_timeout_max: float = 600
+timeout_stats_path: str = "logs/timeout_stats.json"
+## Read the honeypot logs from one background `docker logs -f` instead of running
+## `docker logs --since` before every tool call. Keeps the last honeypot_log_buffer_size events.
+follow_honeypot_logs: bool = True
+honeypot_log_buffer_size: int = 100000
 
 # Session settings
 num_of_attacks = 100
 min_num_of_attacks_reconfig = 0
 max_session_length = 1
+## Ask the LLM for a follow-up message after every tool call. When False, the reasoning
+## comes from the next tool-enabled turn, which saves one LLM call per iteration.
+followup_after_tool_call: bool = True
+## Approximate token budget of the attacker context, None sends the full history.
+## Above it, old tool outputs are cut to context_compacted_tool_chars characters.
+context_token_budget: int = None
+context_keep_recent: int = 6
+context_compacted_tool_chars: int = 400
 
 # Reconfiguration settings 
 reset_every_reconfig = True
@@ -31,6 +91,32 @@ mi_reset_techniques: bool = True
 en_variable: str = "techniques"
 en_window_size: int = 1
 en_tolerance: float = 1e-2
+## Session length reconfiguration: "mean" or "median" of the last sl_window_size sessions,
+## reconfigures when it is sl_threshold standard deviations below the mean session length.
+sl_statistic: str = "median"
+sl_window_size: int = 5
+sl_threshold: float = 2.0
+## Change point reconfiguration: "page_hinkley" or "cusum" on the session length,
+## cp_delta and cp_threshold are in standard deviations.
+cp_method: str = "page_hinkley"
+cp_delta: float = 0.5
+cp_threshold: float = 10.0
+cp_warmup: int = 10
+## Bandit reconfiguration: switches between config_pool_size configurations generated in
+## the background. "ucb" or "thompson", rewarded by "new_techniques" or "session_length"
+## over ba_sessions_per_pull sessions. ba_exploration is in units of the reward.
+ba_algorithm: str = "ucb"
+ba_reward: str = "new_techniques"
+ba_sessions_per_pull: int = 5
+ba_exploration: float = 1.0
+config_pool_size: int = 5
+## Generate the next configuration in the background while attacks run, once the criterion
+## reports at most prefetch_lead_sessions sessions until it could reconfigure (None: right
+## away), generated again from the latest sessions every prefetch_refresh_after sessions
+## (None: never). Discarded configurations are still paid for and count towards budget_usd.
+prefetch_config: bool = False
+prefetch_lead_sessions: int = 3
+prefetch_refresh_after: int = 5
 
 # Other
 ISO_FORMAT = "%Y-%m-%dT%H_%M_%S"
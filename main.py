@@ -1,43 +1,84 @@
 # %%
+import argparse
 import json
+import openai
 from dotenv import load_dotenv
 load_dotenv()
 import os
 import config
 from pathlib import Path
 
-from Red import sangria_config
-from Red.sangria import run_single_attack
 from Red.model import ReconfigCriteria
-from Red.extraction import extract_session
+from Red.orchestrator import AttackOrchestrator, get_kali_endpoints
 from Red.reconfiguration import EntropyReconfigCriterion, BasicReconfigCriterion, \
-    MeanIncreaseReconfigCriterion, NeverReconfigCriterion
+    MeanIncreaseReconfigCriterion, NeverReconfigCriterion, BanditReconfigCriterion
 
 from Blue.new_config_pipeline import generate_new_honeypot_config, get_honeypot_config, set_honeypot_config
+from Blue.config_pool import ConfigPool
+from Blue.config_prefetcher import ConfigPrefetcher, ConfigGenerationError
 from Blue_Lagoon.honeypot_tools import init_docker, start_dockers, stop_dockers
 
 from Utils.meta import create_experiment_folder, select_reconfigurator
-from Utils.jsun import save_json_to_file, append_json_to_file
+from Utils.jsun import save_json_to_file, JsonlWriter
+from Utils.llm_client import get_transport
+from Utils.tracing import TimingRecorder
+from Red.ssh_pool import get_ssh_pool
+from Red.simulated_shell import get_command_cache, config_key
+from Red.timeout_policy import get_timeout_policy
+from Red.log_extractor import get_log_follower, stop_log_follower
+from Red.terminal_io import check_terminal_backend
+from Utils.checkpoint import save_checkpoint, load_checkpoint, resolve_experiment_path, truncate_jsonl
 
 
-def main():
-    base_path = create_experiment_folder(experiment_name=config.experiment_name)
-    base_path = Path(base_path)
+def main(resume_experiment=None):
+    '''
+        Runs the experiment, or continues the given experiment from its last checkpoint.
+        A checkpoint is saved to the experiment folder after every attack.
+    '''
+    BOLD   = "\033[1m"
+    RESET  = "\033[0m"
 
-    honeypot_config = get_honeypot_config(id="00", path="")
-    set_honeypot_config(honeypot_config)
-    init_docker()
+    checkpoint = None
+    if resume_experiment:
+        base_path = resolve_experiment_path(resume_experiment)
+        checkpoint = load_checkpoint(base_path)
+        if checkpoint is None:
+            raise FileNotFoundError(f"No checkpoint found in {base_path}")
+    else:
+        base_path = Path(create_experiment_folder(experiment_name=config.experiment_name))
 
-    config_counter = 1
-    config_attack_counter = 0
-    tokens_used_list = []
+    timing_recorder = TimingRecorder(base_path, config.tracing_export)
+    if checkpoint is None:
+        honeypot_config = get_honeypot_config(id="00", path="")
+        first_attack = 0
+        config_counter = 1
+        config_attack_counter = 0
+        config_timing_records = 0
+        tokens_used_list = []
 
-    BOLD   = "\033[1m"
-    RESET  = "\033[0m"
-    print(f"{BOLD}New Configuration: configuration {config_counter}{RESET}")
+        reconfigurator = select_reconfigurator(config.reconfig_method)
+        reconfigurator.reset()
+        print(f"{BOLD}New Configuration: configuration {config_counter}{RESET}")
+    else:
+        honeypot_config = checkpoint["honeypot_config"]
+        first_attack = checkpoint["next_attack"]
+        config_counter = checkpoint["config_counter"]
+        config_attack_counter = checkpoint["config_attack_counter"]
+        config_timing_records = checkpoint["config_timing_records"]
+        tokens_used_list = checkpoint["tokens_used_list"]
+        reconfigurator = checkpoint["reconfigurator"]
+        timing_recorder.records = checkpoint["timing_records"]
+        get_transport().costs.restore(checkpoint["costs"])
+        if get_transport().costs.exceeded():
+            print(f"LLM budget of ${config.budget_usd:.2f} already spent, raise config.budget_usd to continue.")
+            return
+        print(f"{BOLD}Resuming {base_path} at attack {first_attack+1}, configuration {config_counter}{RESET}")
+
+    if not config.simulate_command_line:
+        check_terminal_backend(config.terminal_backend)
 
-    reconfigurator = select_reconfigurator(config.reconfig_method)
-    reconfigurator.reset()
+    set_honeypot_config(honeypot_config)
+    init_docker()
 
     if not config.simulate_command_line:
         start_dockers()
@@ -49,51 +90,212 @@ def main():
     if not config.simulate_command_line:
         save_json_to_file(honeypot_config, config_path / f"honeypot_config.json")
 
-    for i in range(config.num_of_attacks):
-        os.makedirs(config_path, exist_ok=True)
-        print(f"{BOLD}Attack {i+1} / {config.num_of_attacks}, configuration {config_counter}{RESET}")
+    # drop what was written after the checkpoint, the attacks are run again
+    truncate_jsonl(config_path / "tokens_used.jsonl", config_attack_counter)
+    truncate_jsonl(config_path / "sessions.jsonl", config_attack_counter)
+    truncate_jsonl(config_path / "timings.jsonl", config_timing_records)
+
+    tokens_writer = JsonlWriter(config_path / "tokens_used.jsonl")
+    sessions_writer = JsonlWriter(config_path / "sessions.jsonl")
+    timings_writer = JsonlWriter(config_path / "timings.jsonl")
+    # tokens of attacks cancelled by a reconfiguration, they also count towards the budget
+    discarded_writer = JsonlWriter(base_path / "discarded_attacks.jsonl")
+
+    # the bandit switches between configurations prepared in the background
+    config_pool = None
+    if isinstance(reconfigurator, BanditReconfigCriterion):
+        config_pool = ConfigPool(base_path, config.config_pool_size)
+        reconfigurator.attach_pool(config_pool, config_pool.add(honeypot_config))
+        config_pool.start()
+
+    # otherwise the next configuration is prepared while attacks run against this one
+    config_prefetcher = None
+    if config_pool is None and config.prefetch_config and config.reconfig_method != ReconfigCriteria.NO_RECONFIG:
+        config_prefetcher = ConfigPrefetcher(base_path, config.prefetch_refresh_after,
+            lead_sessions=config.prefetch_lead_sessions)
+        config_prefetcher.start()
 
-        logs_path = full_logs_path / f"attack_{i+1}.json"
+    def on_partial_session(attack_index, session):
+        # called by the orchestrator from the attack threads, under its lock
+        reconfigurator.update_partial(session)
 
-        messages = sangria_config.get_messages(i)
-        logs, tokens_used = run_single_attack(messages, config.max_session_length, logs_path, i, config_counter)
+    def sessions_until_reconfigure():
+        with orchestrator.lock:
+            sessions = reconfigurator.sessions_until_reconfigure()
+        if sessions is None:
+            return None
+        return max(sessions, config.min_num_of_attacks_reconfig - config_attack_counter)
 
+    def attack_limit(next_attack):
+        # attacks after the earliest possible reconfiguration would be discarded
+        sessions = sessions_until_reconfigure()
+        return None if sessions is None else next_attack + sessions
 
-        # extract session and add attack pattern to set
-        session = extract_session(logs)
-        reconfigurator.update(session)
+    def record_discarded(discarded):
+        for record in discarded:
+            discarded_writer.write(record)
+        if discarded:
+            discarded_writer.flush()
+            cost = sum(record["cost_usd"] for record in discarded)
+            print(f"Discarded {len(discarded)} started attack(s), ${cost:.4f} of LLM spend.")
 
-        append_json_to_file(tokens_used, config_path / f"tokens_used.json", False)
+    def save_state(next_attack):
+        with orchestrator.lock:
+            save_checkpoint({
+                "next_attack": next_attack,
+                "config_counter": config_counter,
+                "config_attack_counter": config_attack_counter,
+                "config_timing_records": config_timing_records,
+                "tokens_used_list": tokens_used_list,
+                "honeypot_config": honeypot_config,
+                "reconfigurator": reconfigurator,
+                "timing_records": timing_recorder.records,
+                "costs": get_transport().costs.to_dict()
+            }, base_path)
+        save_json_to_file(get_transport().costs.to_dict(), base_path / "costs.json", False)
+
+    orchestrator = AttackOrchestrator(
+        config.num_of_attacks,
+        config.max_session_length,
+        get_kali_endpoints(),
+        config.num_parallel_attacks,
+        on_partial_session,
+        base_path / "partial_sessions.jsonl"
+    )
+    orchestrator.schedule(first_attack, full_logs_path, config_counter, attack_limit(first_attack),
+        config_key(honeypot_config))
+
+    for i in range(first_attack, config.num_of_attacks):
+        os.makedirs(config_path, exist_ok=True)
+
+        # attacks finish in any order, but are handed to the reconfigurator in order
+        try:
+            extractor, tokens_used, timings = orchestrator.result(i)
+        except openai.APIError as e:
+            # retries exhausted or out of quota, the attack is run again when resuming
+            save_state(i)
+            print(f"{BOLD}Attack {i+1} failed, pausing the experiment: {e}\n"
+                f"Continue with --resume {base_path}{RESET}")
+            break
+
+        if tokens_used.get("interrupted"):
+            # cut short by the budget, the attack is run again when resuming
+            record_discarded([{"attack": i, "configuration": config_counter, **tokens_used}])
+            save_state(i)
+            print(f"{BOLD}LLM budget of ${config.budget_usd:.2f} spent, pausing the experiment. "
+                f"Raise config.budget_usd and continue with --resume {base_path}{RESET}")
+            break
+        config_attack_counter += 1
+
+        # the session was extracted while the attack ran, add its attack pattern to set
+        session = extractor.session_log()
+        with orchestrator.lock:
+            reconfigurator.update(session)
+            reconfigure = reconfigurator.should_reconfigure()
+
+        tokens_writer.write(tokens_used)
         tokens_used_list.append(tokens_used)
-        append_json_to_file(session, config_path / f"sessions.json", False)
+        sessions_writer.write(session)
+        if config_prefetcher is not None:
+            config_prefetcher.add_session(sessions_until_reconfigure())
+        for record in timings:
+            timings_writer.write(record)
+        config_timing_records += len(timings)
+        timing_recorder.add(str(config_counter), timings, config_path)
 
-        if reconfigurator.should_reconfigure() and config_attack_counter >= config.min_num_of_attacks_reconfig:    
+        if reconfigure and config_attack_counter >= config.min_num_of_attacks_reconfig:
             print(f"{BOLD}Reconfiguring: Using {config.reconfig_method}.{RESET}")
+            record_discarded(orchestrator.discard_in_flight())
+
+            # the honeypot stays up until the next configuration is ready
+            try:
+                if config_pool is not None:
+                    with orchestrator.lock:
+                        arm = reconfigurator.switch_arm()
+                    next_config = config_pool.get(arm)
+                elif config_prefetcher is not None:
+                    _, next_config = config_prefetcher.take()
+                else:
+                    _, next_config = generate_new_honeypot_config(base_path)
+                    if next_config is None:
+                        raise ConfigGenerationError("Could not generate the next configuration")
+            except (ConfigGenerationError, openai.APIError) as e:
+                save_state(i + 1)
+                print(f"{BOLD}Reconfiguration failed, pausing the experiment: {e}\n"
+                    f"Continue with --resume {base_path}{RESET}")
+                break
+            honeypot_config = next_config
 
             if not config.simulate_command_line:
+                get_ssh_pool().close_all()
                 stop_dockers()
 
-            config_id, honeypot_config = generate_new_honeypot_config(base_path)
+            tokens_writer.close()
+            sessions_writer.close()
+            timings_writer.close()
+
             set_honeypot_config(honeypot_config)
 
             if reconfigurator.reset_every_reconfig:
-                reconfigurator.reset()
+                with orchestrator.lock:
+                    reconfigurator.reset()
 
             config_counter += 1
             config_attack_counter = 0
+            config_timing_records = 0
 
             config_path = base_path / f"hp_config_{config_counter}"
             full_logs_path = config_path / "full_logs"
             os.makedirs(full_logs_path, exist_ok=True)
 
             save_json_to_file(honeypot_config, config_path / f"honeypot_config.json")
+            tokens_writer = JsonlWriter(config_path / "tokens_used.jsonl")
+            sessions_writer = JsonlWriter(config_path / "sessions.jsonl")
+            timings_writer = JsonlWriter(config_path / "timings.jsonl")
 
             if not config.simulate_command_line:
                 start_dockers()
 
+            orchestrator.schedule(i + 1, full_logs_path, config_counter, attack_limit(i + 1),
+                config_key(honeypot_config))
+        else:
+            orchestrator.fill(attack_limit(i + 1))
+
+        save_state(i + 1)
+
+        if get_transport().costs.exceeded():
+            print(f"{BOLD}LLM budget of ${config.budget_usd:.2f} spent, pausing the experiment. "
+                f"Raise config.budget_usd and continue with --resume {base_path}{RESET}")
+            break
+
         print("\n\n")
 
+    record_discarded(orchestrator.shutdown())
+    discarded_writer.close()
+    if config_pool is not None:
+        config_pool.stop()
+    if config_prefetcher is not None:
+        config_prefetcher.stop()
+        save_json_to_file(config_prefetcher.stats(), base_path / "config_prefetch_stats.json", False)
+    tokens_writer.close()
+    sessions_writer.close()
+    timings_writer.close()
+    save_json_to_file(get_transport().stats.to_dict(), base_path / "llm_stats.json", False)
+    if not config.simulate_command_line:
+        save_json_to_file(get_ssh_pool().stats.to_dict(), base_path / "ssh_pool_stats.json", False)
+    else:
+        save_json_to_file(get_command_cache().to_dict(), base_path / "simulated_command_cache.json", False)
+    get_ssh_pool().close_all()
+    get_timeout_policy().save()
+    if not config.simulate_command_line and config.follow_honeypot_logs:
+        save_json_to_file(get_log_follower().parser.stats(), base_path / "honeypot_log_stats.json", False)
+    stop_log_follower()
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run a honeypot reconfiguration experiment.")
+    parser.add_argument("--resume", metavar="EXPERIMENT",
+        help="experiment folder, or its name under logs/, to continue from its last checkpoint")
+    args = parser.parse_args()
+    main(args.resume)
 
 # %%
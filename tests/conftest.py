@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Add parent directory to sys.path to allow imports from project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from Red import async_terminal
+from Red.async_terminal import TOO_LONG_MARKER, AsyncShell
+from Red.terminal_io import check_terminal_backend
+
+KALI_PROMPT = r'└─\x1b\[1;31m#'
+PROMPT = "└─\x1b[1;31m#"
+
+
+class FakeStdout:
+    """Returns the scripted chunks, then blocks (or ends the stream if eof)."""
+    def __init__(self, chunks, eof=False):
+        self.chunks = list(chunks)
+        self.eof = eof
+
+    async def read(self, size):
+        if self.chunks:
+            return self.chunks.pop(0)
+        if self.eof:
+            return ""
+        await asyncio.sleep(3600)
+
+    def at_eof(self):
+        return self.eof and not self.chunks
+
+
+class FakeStdin:
+    def __init__(self, stdout, replies):
+        self.stdout = stdout
+        self.replies = replies
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+        self.stdout.chunks += self.replies.pop(data, [])
+
+
+class FakeProcess:
+    def __init__(self, replies, eof=False):
+        self.stdout = FakeStdout([], eof)
+        self.stdin = FakeStdin(self.stdout, replies)
+
+
+class FakeBackend:
+    def run_coroutine(self, coroutine):
+        return asyncio.run(coroutine)
+
+
+def make_shell(replies, eof=False, tail_chars=10000):
+    return AsyncShell(FakeBackend(), None, FakeProcess(replies, eof), [KALI_PROMPT], tail_chars)
+
+
+def test_command_output_up_to_the_prompt():
+    shell = make_shell({"id\r": ["uid=0(root) gid=0(root)\n", "┌──(root㉿kali)-[~]\n└─\x1b[1;", "31m# "]})
+
+    output = shell.send_command("id", timeout=5)
+
+    # the output is stripped in front of the prompt, as with the pexpect backend
+    assert output == "uid=0(root) gid=0(root)\n┌──(root㉿kali)-[~]" + PROMPT
+    assert not output.timed_out
+    # whatever follows the prompt is kept for the next command
+    assert shell.pending == " "
+
+
+def test_long_output_is_bounded_while_streaming():
+    shell = make_shell({"cat big\r": ["x" * 1000] * 50 + ["end\n" + PROMPT]}, tail_chars=100)
+
+    output = shell.send_command("cat big", timeout=5)
+
+    marker = "***TOO LONG OUTPUT FROM COMMAND, ONLY SHOWING THE FINAL 100 characters***\n"
+    assert output.startswith(marker)
+    assert output.endswith("end" + PROMPT)
+    assert len(output) <= len(marker) + 100 + len(PROMPT)
+    assert output.dropped_chars == 50 * 1000 + len("end\n" + PROMPT) - 100
+
+
+def test_timeout_interrupts_the_command():
+    shell = make_shell({"sleep 100\r": ["sleeping\n"], "\x03": ["^C\n" + PROMPT]})
+
+    output = shell.send_command("sleep 100", timeout=0.05)
+
+    assert output.timed_out
+    assert output == "sleeping" + TOO_LONG_MARKER + "^C" + PROMPT
+    assert shell.process.stdin.written == ["sleep 100\r", "\r\n", "\x03"]
+
+
+def test_closed_connection_returns_what_was_read():
+    shell = make_shell({"exit\r": ["logout\n"]}, eof=True)
+
+    output = shell.send_command("exit", timeout=5)
+
+    assert output == "logout"
+    assert not output.timed_out
+    assert not shell.isalive()
+
+
+def test_backend_selection(monkeypatch):
+    check_terminal_backend("pexpect")
+    with pytest.raises(AssertionError):
+        check_terminal_backend("paramiko")
+
+    monkeypatch.setattr(async_terminal, "asyncssh", None)
+    with pytest.raises(ImportError, match="pip install asyncssh"):
+        check_terminal_backend("async")
+
+    monkeypatch.setattr(async_terminal, "asyncssh", object())
+    check_terminal_backend("async")
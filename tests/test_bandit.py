@@ -0,0 +1,120 @@
+import pickle
+import random
+from collections import Counter
+
+import pytest
+
+from Red.reconfiguration import BanditReconfigCriterion
+
+
+class FakePool:
+    def __init__(self, arm_ids):
+        self.arm_ids = arm_ids
+
+    def ids(self):
+        return list(self.arm_ids)
+
+
+def session(length=0, techniques=()):
+    return {"length": length, "full_session": [{"technique": technique} for technique in techniques]}
+
+
+def run(bandit, mean_lengths, num_sessions, seed=0):
+    """Attack the deployed arm, each arm gives sessions around its mean length, and count its pulls."""
+    rng = random.Random(seed)
+    sessions_per_arm = Counter()
+    for _ in range(num_sessions):
+        bandit.update(session(max(0, round(rng.gauss(mean_lengths[bandit.current_arm], 1)))))
+        sessions_per_arm[bandit.current_arm] += 1
+        if bandit.should_reconfigure():
+            bandit.switch_arm()
+            bandit.reset()
+    return sessions_per_arm
+
+
+def test_pull_is_sessions_per_pull_sessions():
+    bandit = BanditReconfigCriterion(reward="session_length", sessions_per_pull=3)
+    bandit.attach_pool(FakePool(["a", "b"]), "a")
+    assert bandit.sessions_until_reconfigure() == 3
+    bandit.update(session(4))
+    bandit.update(session(8))
+    assert not bandit.should_reconfigure()
+    assert bandit.sessions_until_reconfigure() == 1
+
+    bandit.update(session(6))
+    # untried arms are pulled first
+    assert bandit.should_reconfigure()
+    assert bandit.next_arm == "b"
+    assert bandit.arms["a"].mean == 6
+    assert bandit.total_pulls == 1
+    assert bandit.switch_arm() == "b"
+
+
+def test_without_a_pool_the_current_arm_is_kept():
+    bandit = BanditReconfigCriterion(sessions_per_pull=1)
+    bandit.attach_pool(None, "a")
+    for _ in range(3):
+        bandit.update(session())
+        assert not bandit.should_reconfigure()
+    assert bandit.arms["a"].count == 3
+    assert bandit.next_arm == "a"
+
+
+def test_new_techniques_are_new_to_the_experiment():
+    bandit = BanditReconfigCriterion(reward="new_techniques", sessions_per_pull=3)
+    bandit.attach_pool(FakePool(["a"]), "a")
+    bandit.update(session(techniques=["Brute Force", "Account Discovery", ""]))
+    bandit.update(session(techniques=["Brute Force", "Process Discovery"]))
+    # a reconfiguration does not forget the techniques
+    bandit.reset()
+    bandit.update(session(techniques=["Brute Force", "Process Discovery"]))
+    assert bandit.pull_rewards.mean == 0
+    bandit.update(session(techniques=["Ingress Tool Transfer"]))
+    assert bandit.pull_rewards.mean == 0.5
+
+
+@pytest.mark.parametrize("algorithm", ["ucb", "thompson"])
+def test_the_best_arm_is_pulled_most(algorithm):
+    bandit = BanditReconfigCriterion(algorithm, "session_length", sessions_per_pull=2)
+    bandit.random.seed(0)
+    mean_lengths = {"a": 5, "b": 12, "c": 8}
+    bandit.attach_pool(FakePool(list(mean_lengths)), "a")
+
+    sessions_per_arm = run(bandit, mean_lengths, 600)
+
+    assert set(bandit.arms) == set(mean_lengths)
+    assert sessions_per_arm.most_common(1)[0][0] == "b"
+    assert sessions_per_arm["b"] > 400
+
+
+def test_arms_added_to_the_pool_are_tried():
+    pool = FakePool(["a"])
+    bandit = BanditReconfigCriterion(reward="session_length", sessions_per_pull=1)
+    bandit.attach_pool(pool, "a")
+    run(bandit, {"a": 10, "b": 1}, 5)
+    assert bandit.current_arm == "a"
+
+    pool.arm_ids.append("b")
+    run(bandit, {"a": 10, "b": 1}, 1)
+    assert bandit.current_arm == "b"
+
+
+def test_pickling_leaves_the_pool_out():
+    bandit = BanditReconfigCriterion(reward="session_length", sessions_per_pull=1)
+    bandit.attach_pool(FakePool(["a", "b"]), "a")
+    run(bandit, {"a": 3, "b": 4}, 4)
+
+    restored = pickle.loads(pickle.dumps(bandit))
+    assert restored.pool is None
+    assert restored.current_arm == bandit.current_arm
+    assert {arm_id: stats.count for arm_id, stats in restored.arms.items()} == \
+        {arm_id: stats.count for arm_id, stats in bandit.arms.items()}
+
+
+def test_settings_are_validated():
+    with pytest.raises(AssertionError):
+        BanditReconfigCriterion("epsilon_greedy")
+    with pytest.raises(AssertionError):
+        BanditReconfigCriterion(reward="tokens")
+    with pytest.raises(AssertionError):
+        BanditReconfigCriterion(sessions_per_pull=0)
@@ -0,0 +1,69 @@
+import pickle
+
+import pytest
+
+from Red.reconfiguration import BasicReconfigCriterion, MeanIncreaseReconfigCriterion
+from Utils import checkpoint
+from Utils.checkpoint import load_checkpoint, resolve_experiment_path, save_checkpoint, truncate_jsonl
+
+
+def test_checkpoint_roundtrip_keeps_the_criterion_state(tmp_path):
+    criterion = MeanIncreaseReconfigCriterion("techniques", tolerance=1.0, window_size=3)
+    for technique in ["Brute Force", "Account Discovery", "Brute Force"]:
+        criterion.update({"full_session": [{"technique": technique}]})
+    state = {"next_attack": 4, "config_counter": 2, "reconfig_criterion": criterion}
+
+    save_checkpoint(state, tmp_path)
+    loaded = load_checkpoint(tmp_path)
+
+    assert loaded["next_attack"] == 4
+    assert loaded["reconfig_criterion"].values == criterion.values
+    assert loaded["reconfig_criterion"].techniques == criterion.techniques
+    assert loaded["reconfig_criterion"].should_reconfigure() == criterion.should_reconfigure()
+    assert not (tmp_path / "checkpoint.pkl.tmp").exists()
+
+    # a newer checkpoint replaces the old one
+    save_checkpoint({"next_attack": 5, "reconfig_criterion": BasicReconfigCriterion(2, True)}, tmp_path)
+    assert load_checkpoint(tmp_path)["next_attack"] == 5
+
+
+def test_load_checkpoint_without_checkpoint(tmp_path):
+    assert load_checkpoint(tmp_path) is None
+
+
+def test_failed_save_keeps_the_previous_checkpoint(tmp_path, monkeypatch):
+    save_checkpoint({"next_attack": 1}, tmp_path)
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(checkpoint.pickle, "dump", fail)
+
+    with pytest.raises(OSError):
+        save_checkpoint({"next_attack": 2}, tmp_path)
+    with open(tmp_path / "checkpoint.pkl", "rb") as f:
+        assert pickle.load(f) == {"next_attack": 1}
+
+
+def test_resolve_experiment_path(tmp_path, monkeypatch):
+    experiment = tmp_path / "logs" / "experiment_1"
+    experiment.mkdir(parents=True)
+    assert resolve_experiment_path(experiment) == experiment
+
+    monkeypatch.chdir(tmp_path)
+    assert resolve_experiment_path("experiment_1").resolve() == experiment.resolve()
+    with pytest.raises(FileNotFoundError):
+        resolve_experiment_path("experiment_2")
+
+
+def test_truncate_jsonl(tmp_path):
+    path = tmp_path / "tokens_used.jsonl"
+    path.write_text('{"a": 1}\n{"a": 2}\n{"a": 3}\n')
+
+    truncate_jsonl(path, 5)
+    assert path.read_text().count("\n") == 3
+    truncate_jsonl(path, 2)
+    assert path.read_text() == '{"a": 1}\n{"a": 2}\n'
+    truncate_jsonl(path, 0)
+    assert path.read_text() == ""
+    truncate_jsonl(tmp_path / "missing.jsonl", 1)
+    assert not (tmp_path / "missing.jsonl").exists()
@@ -0,0 +1,77 @@
+import threading
+
+from Blue.config_pool import ConfigPool
+
+
+def config(config_id, services=("ssh",)):
+    return {"id": config_id, "services": list(services)}
+
+
+class FakeGenerator:
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self, experiment_path):
+        self.calls += 1
+        result = self.results.pop(0) if self.results else None
+        if isinstance(result, Exception):
+            raise result
+        return (result["id"], result) if result else (None, None)
+
+
+def test_add_dedupes_and_saves(tmp_path):
+    pool = ConfigPool(tmp_path, size=3)
+    assert pool.add(config("abc")) == "abc"
+    # the same configuration keeps its ID
+    assert pool.add(config("abc")) == "abc"
+    # another configuration with the same ID gets a new one
+    assert pool.add(config("abc", ["http"])) == "abc_1"
+    assert pool.add(config("abc", ["ftp"])) == "abc_2"
+    assert pool.add({"services": []}) == "3"
+    assert pool.ids() == ["abc", "abc_1", "abc_2", "3"]
+    assert pool.get("abc_1") == config("abc", ["http"])
+
+    resumed = ConfigPool(tmp_path, size=3)
+    assert sorted(resumed.ids()) == sorted(pool.ids())
+    assert resumed.get("abc_2") == config("abc", ["ftp"])
+
+
+def test_background_fill_retries_failures(tmp_path):
+    generate = FakeGenerator([None, RuntimeError("LLM down"), config("a"), config("a"), config("b")])
+    pool = ConfigPool(tmp_path, size=2, generate=generate, retry_delay=0.01)
+    pool.start()
+
+    assert pool.wait_for(2, timeout=5)
+    pool.thread.join(timeout=5)
+    assert not pool.thread.is_alive()
+    assert pool.ids() == ["a", "b"]
+    assert pool.failures == 2
+    # the duplicate did not count towards the size
+    assert generate.calls == 5
+
+
+def test_resumed_pool_is_not_filled_again(tmp_path):
+    ConfigPool(tmp_path, size=2).add(config("a"))
+    ConfigPool(tmp_path, size=2).add(config("b"))
+    generate = FakeGenerator([config("c")])
+    pool = ConfigPool(tmp_path, size=2, generate=generate)
+    pool.start()
+    pool.thread.join(timeout=5)
+    assert generate.calls == 0
+
+
+def test_stop_ends_the_retries(tmp_path):
+    generate = FakeGenerator([])
+    pool = ConfigPool(tmp_path, size=1, generate=generate, retry_delay=60)
+    pool.start()
+    pool.stop()
+    pool.thread.join(timeout=5)
+    assert not pool.thread.is_alive()
+    assert not pool.wait_for(1, timeout=0.01)
+
+
+def test_wait_for_wakes_on_add(tmp_path):
+    pool = ConfigPool(tmp_path, size=1)
+    threading.Timer(0.05, pool.add, [config("a")]).start()
+    assert pool.wait_for(1, timeout=5)
@@ -0,0 +1,222 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from Blue.config_prefetcher import ConfigGenerationError, ConfigPrefetcher
+from Red.model import LLMModel
+from Utils.pricing import CostTracker
+
+
+class FakeGenerator:
+    """Returns results in order, each call waits until it is released when gated."""
+    def __init__(self, results, gated=False):
+        self.results = list(results)
+        self.gate = threading.Semaphore(0) if gated else None
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __call__(self, experiment_path):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if self.gate is not None:
+            assert self.gate.acquire(timeout=5)
+        with self.lock:
+            self.in_flight -= 1
+            result = self.results.pop(0) if self.results else None
+        if isinstance(result, Exception):
+            raise result
+        return (result, {"id": result}) if result else (None, None)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_take_without_the_thread_generates_the_configuration(tmp_path):
+    prefetcher = ConfigPrefetcher(tmp_path, generate=FakeGenerator(["a", None]))
+    assert prefetcher.take() == ("a", {"id": "a"})
+    with pytest.raises(ConfigGenerationError):
+        prefetcher.take()
+
+
+def test_configuration_is_prepared_after_the_first_session(tmp_path):
+    generate = FakeGenerator(["a", "b"])
+    prefetcher = ConfigPrefetcher(tmp_path, refresh_after=None, generate=generate)
+    prefetcher.start()
+    time.sleep(0.05)
+    assert generate.calls == 0
+
+    prefetcher.add_session()
+    wait_until(lambda: prefetcher.stats()["generated"] == 1)
+    for _ in range(10):
+        prefetcher.add_session()
+    assert prefetcher.take() == ("a", {"id": "a"})
+    assert generate.calls == 1
+
+    # the next one is prepared for the new configuration
+    prefetcher.add_session()
+    assert prefetcher.take() == ("b", {"id": "b"})
+    prefetcher.stop()
+
+
+def test_take_waits_for_the_generation_in_progress(tmp_path):
+    generate = FakeGenerator(["a"], gated=True)
+    prefetcher = ConfigPrefetcher(tmp_path, generate=generate)
+    prefetcher.start()
+    prefetcher.add_session()
+    wait_until(lambda: generate.calls == 1)
+
+    threading.Timer(0.05, generate.gate.release).start()
+    assert prefetcher.take() == ("a", {"id": "a"})
+    assert generate.calls == 1
+    prefetcher.stop()
+
+
+def test_prepared_configuration_is_refreshed(tmp_path):
+    generate = FakeGenerator(["a", "b", "c"], gated=True)
+    prefetcher = ConfigPrefetcher(tmp_path, refresh_after=2, generate=generate)
+    prefetcher.start()
+    prefetcher.add_session()
+    generate.gate.release()
+    wait_until(lambda: prefetcher.stats()["generated"] == 1)
+
+    prefetcher.add_session()
+    time.sleep(0.05)
+    assert generate.calls == 1
+    prefetcher.add_session()
+    wait_until(lambda: generate.calls == 2)
+    # sessions during the refresh do not start another generation
+    for _ in range(5):
+        prefetcher.add_session()
+    generate.gate.release()
+    wait_until(lambda: prefetcher.stats()["generated"] == 2)
+    assert prefetcher.stats()["generated"] == 2
+    assert prefetcher.stats()["discarded"] == 1
+
+    # the refresh was generated from sessions that are 5 old, so another one starts
+    wait_until(lambda: generate.calls == 3)
+    assert generate.max_in_flight == 1
+    assert prefetcher.take() == ("b", {"id": "b"})
+
+    # generated for the configuration that was replaced
+    generate.gate.release()
+    wait_until(lambda: prefetcher.stats()["generated"] == 3)
+    assert prefetcher.stats()["generated"] == 3
+    assert prefetcher.stats()["discarded"] == 2
+    assert prefetcher.stats()["failed"] == 0
+    assert prefetcher.prepared is None
+    prefetcher.stop()
+
+
+def test_take_retries_a_failed_generation_right_away(tmp_path):
+    generate = FakeGenerator([RuntimeError("LLM down"), "a"])
+    prefetcher = ConfigPrefetcher(tmp_path, generate=generate, retry_delay=60)
+    prefetcher.start()
+    prefetcher.add_session()
+    wait_until(lambda: prefetcher.stats()["failed"] == 1)
+
+    start = time.monotonic()
+    assert prefetcher.take() == ("a", {"id": "a"})
+    assert time.monotonic() - start < 5
+    assert generate.calls == 2
+    prefetcher.stop()
+
+
+def test_take_raises_when_the_retry_fails(tmp_path):
+    generate = FakeGenerator([None, None, "a"])
+    prefetcher = ConfigPrefetcher(tmp_path, generate=generate, retry_delay=60)
+    prefetcher.start()
+    prefetcher.add_session()
+    wait_until(lambda: prefetcher.stats()["failed"] == 1)
+
+    with pytest.raises(ConfigGenerationError):
+        prefetcher.take()
+    assert generate.calls == 2
+    assert prefetcher.stats()["failed"] == 2
+    prefetcher.stop()
+    prefetcher.thread.join(timeout=5)
+    assert not prefetcher.thread.is_alive()
+
+
+def test_configuration_is_prepared_once_a_reconfiguration_is_near(tmp_path):
+    generate = FakeGenerator(["a", "b"])
+    prefetcher = ConfigPrefetcher(tmp_path, refresh_after=1, generate=generate, lead_sessions=2,
+        costs=CostTracker())
+    prefetcher.start()
+    for sessions_until_reconfigure in [10, 5, 3]:
+        prefetcher.add_session(sessions_until_reconfigure)
+    time.sleep(0.05)
+    assert generate.calls == 0
+
+    prefetcher.add_session(2)
+    wait_until(lambda: prefetcher.stats()["generated"] == 1)
+    # not refreshed while the criterion moves away from reconfiguring
+    prefetcher.add_session(4)
+    time.sleep(0.05)
+    assert generate.calls == 1
+    assert prefetcher.take() == ("a", {"id": "a"})
+
+    # criteria that cannot tell prepare it right away
+    prefetcher.add_session(None)
+    wait_until(lambda: prefetcher.stats()["generated"] == 2)
+    prefetcher.stop()
+
+
+def usage(prompt_tokens):
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=0, prompt_tokens_details=None)
+
+
+def test_nothing_is_prepared_once_the_budget_is_spent(tmp_path):
+    costs = CostTracker(budget_usd=1.0)
+    costs.add_usage(LLMModel.GPT_4, usage(100_000))
+    generate = FakeGenerator(["a"])
+    prefetcher = ConfigPrefetcher(tmp_path, generate=generate, costs=costs)
+    prefetcher.start()
+    prefetcher.add_session()
+    time.sleep(0.05)
+    assert generate.calls == 0
+    prefetcher.stop()
+
+
+def test_prefetch_spend_is_counted_in_the_budget(tmp_path):
+    costs = CostTracker(budget_usd=100.0)
+    results = ["a", "b", "c"]
+
+    def generate(experiment_path):
+        # $3 of GPT-4 input tokens per configuration
+        costs.add_usage(LLMModel.GPT_4, usage(100_000))
+        result = results.pop(0)
+        return result, {"id": result}
+
+    prefetcher = ConfigPrefetcher(tmp_path, refresh_after=1, generate=generate, costs=costs)
+    prefetcher.start()
+    prefetcher.add_session()
+    wait_until(lambda: prefetcher.stats()["generated"] == 1)
+    prefetcher.add_session()
+    wait_until(lambda: prefetcher.stats()["generated"] == 2)
+    prefetcher.stop()
+    # an attack running at the same time is not spend of the prefetcher
+    costs.add_usage(LLMModel.GPT_4, usage(100_000))
+
+    assert prefetcher.take() == ("b", {"id": "b"})
+    stats = prefetcher.stats()
+    assert stats["cost_usd"] == pytest.approx(6.0)
+    assert stats["discarded_cost_usd"] == pytest.approx(3.0)
+    assert costs.to_dict()["categories"] == {"config_prefetch": pytest.approx(6.0)}
+    assert costs.spent_usd == pytest.approx(9.0)
+
+
+def test_refresh_after_must_be_positive(tmp_path):
+    with pytest.raises(AssertionError):
+        ConfigPrefetcher(tmp_path, refresh_after=0)
+    with pytest.raises(AssertionError):
+        ConfigPrefetcher(tmp_path, lead_sessions=-1)
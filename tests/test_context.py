@@ -0,0 +1,84 @@
+import copy
+
+import pytest
+
+from Red.context import AttackerContext, compact_tool_content, estimate_tokens
+
+
+def make_history(num_turns, output_chars=2000):
+    messages = [{"role": "system", "content": "You are an attacker."}]
+    for i in range(num_turns):
+        messages.append({"role": "assistant", "content": f"step {i}",
+            "tool_calls": [{"id": f"call_{i}", "function": {"name": "terminal_input", "arguments": "{}"}}]})
+        messages.append({"role": "tool", "tool_call_id": f"call_{i}", "content": f"{i}:" + "x" * output_chars,
+            "honeypot_logs": [{"eventid": "cowrie.command.input"}]})
+    return messages
+
+
+def test_compact_tool_content_keeps_head_and_tail():
+    content = "HEAD" + "x" * 1000 + "TAIL"
+    compacted = compact_tool_content(content, 100)
+    assert compacted.startswith("HEAD")
+    assert compacted.endswith("TAIL")
+    assert "908 CHARACTERS REMOVED" in compacted
+    assert compact_tool_content("short", 100) == "short"
+
+
+def test_estimate_tokens_counts_tool_calls():
+    message = {"role": "assistant", "content": "x" * 400}
+    assert estimate_tokens(message) == 104
+    message["tool_calls"] = [{"id": "call_1"}]
+    assert estimate_tokens(message) > 104
+    assert estimate_tokens({"role": "assistant", "content": None}) == 4
+
+
+def test_without_budget_the_full_history_is_sent():
+    messages = make_history(10)
+    view = AttackerContext().build(messages)
+    assert [message["content"] for message in view] == [message["content"] for message in messages]
+    # log only keys are never sent
+    assert all("honeypot_logs" not in message for message in view)
+    # the history itself is not modified
+    assert "honeypot_logs" in messages[2]
+
+
+def test_old_tool_outputs_are_compacted_above_the_budget():
+    messages = make_history(10)
+    original = copy.deepcopy(messages)
+    context = AttackerContext(token_budget=1000, keep_recent=4, compacted_tool_chars=100)
+
+    view = context.build(messages)
+
+    assert messages == original
+    assert context.boundary == len(messages) - 4
+    for i, message in enumerate(view):
+        if i < context.boundary and message["role"] == "tool":
+            assert len(message["content"]) < 200
+        else:
+            assert message["content"] == messages[i]["content"]
+    assert view[0] == messages[0]
+
+
+def test_boundary_only_moves_forward_in_steps_of_keep_recent():
+    messages = make_history(10)
+    context = AttackerContext(token_budget=1000, keep_recent=4, compacted_tool_chars=100)
+    first_view = context.build(messages)
+    boundary = context.boundary
+
+    # one more turn keeps the prompt prefix unchanged
+    messages += make_history(1)[1:]
+    second_view = context.build(messages)
+    assert context.boundary == boundary
+    assert second_view[:boundary] == first_view[:boundary]
+
+    # enough new turns move the boundary again
+    messages += make_history(2)[1:]
+    context.build(messages)
+    assert context.boundary == len(messages) - 4
+
+
+def test_rejects_invalid_settings():
+    with pytest.raises(AssertionError):
+        AttackerContext(token_budget=0)
+    with pytest.raises(AssertionError):
+        AttackerContext(keep_recent=-1)
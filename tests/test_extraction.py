@@ -0,0 +1,249 @@
+import json
+import random
+
+from Red.extraction import SessionExtractor, extract_everything_session, extract_session, extract_sessions, \
+    iter_session_records
+from Red.log_parser import honeypot_events
+from Utils.jsun import JsonlWriter, iter_jsonl
+from Utils.logprecis import divide_statements, recombine_labels
+
+
+def terminal_call(command, technique="T1082:System Information Discovery", tactic="TA0007:Discovery"):
+    arguments = {"input": command, "tactic_used": tactic, "technique_used": technique}
+    return {"id": "call", "type": "function", "function": {"name": "terminal_input", "arguments": json.dumps(arguments)}}
+
+
+def terminate_call(success=True):
+    return {"id": "call", "type": "function", "function": {"name": "terminate", "arguments": json.dumps({"success": success})}}
+
+
+def honeypot_logs(*commands, protocol="SSH"):
+    return [{"event": {"Protocol": protocol, "Command": command}} for command in commands]
+
+
+def turn(tool_calls, tool_entries, content=None, follow_up=None):
+    """An assistant turn with its tool responses, and a follow-up message if given."""
+    entries = [{"role": "assistant", "content": content, "tool_calls": tool_calls}] + tool_entries
+    if follow_up is not None:
+        entries.append({"role": "assistant", "content": follow_up, "tool_calls": None})
+    return entries
+
+
+def tool_entry(name="terminal_input", content="output", logs=None):
+    entry = {"role": "tool", "name": name, "tool_call_id": "call", "content": content}
+    if logs is not None:
+        entry["honeypot_logs"] = logs
+    return entry
+
+
+def test_commands_are_labeled_with_the_follow_up_message():
+    logs = [{"role": "system", "content": "attack"}, {"role": "user", "content": "go"}]
+    logs += turn([terminal_call("ssh root@honeypot")], [tool_entry(logs=[])], follow_up="I am connecting.")
+    logs += turn([terminal_call("uname -a; id", "T1033:System Owner/User Discovery")],
+        [tool_entry(logs=honeypot_logs("uname -a; id"))], follow_up="It is a Linux host.")
+    logs += turn([terminate_call()], [tool_entry("terminate", True)], follow_up="Done.")
+
+    session = extract_session(logs)
+    omni = extract_everything_session(logs)
+
+    assert session["session"] == "uname -a; id ;"
+    assert session["length"] == 2
+    assert session["techniques"] == "System Owner/User Discovery - 1"
+    assert [record["content"] for record in session["full_session"]] == ["It is a Linux host."] * 2
+    assert session["full_session"][0]["technique_raw"] == "T1033:System Owner/User Discovery"
+    assert "discovered_honeypot" not in session
+
+    assert omni["session"] == "ssh root@honeypot ; uname -a; id ;"
+    assert omni["full_session"][0]["content"] == "I am connecting."
+    assert omni["discovered_honeypot"] == "yes"
+
+
+def test_single_call_mode_labels_with_the_next_turn():
+    logs = [{"role": "system", "content": "attack"}]
+    logs += turn([terminal_call("whoami")], [tool_entry(logs=honeypot_logs("whoami"))])
+    logs += turn([terminal_call("ls")], [tool_entry(logs=honeypot_logs("ls"))], content="root, now list files")
+    logs += turn([terminate_call()], [tool_entry("terminate", False)], content="nothing left")
+
+    omni = extract_everything_session(logs)
+
+    assert [record["content"] for record in omni["full_session"]] == ["root, now list files", "nothing left"]
+    assert omni["discovered_honeypot"] == "no"
+
+
+def test_commands_of_the_last_turn_are_kept():
+    logs = turn([terminal_call("cat /etc/passwd")], [tool_entry(logs=honeypot_logs("cat /etc/passwd"))])
+
+    session = extract_session(logs)
+    omni = extract_everything_session(logs)
+
+    assert session["session"] == "cat /etc/passwd ;"
+    assert session["full_session"][0]["content"] is None
+    assert omni["discovered_honeypot"] == "unknown"
+
+
+def test_only_ssh_commands_seen_by_the_honeypot_count():
+    logs = turn([terminal_call("curl http://honeypot/"), terminal_call("ls")], [
+        tool_entry(logs=[{"event": {"Protocol": "HTTP", "Command": "GET /"}}, {"level": "info"}]),
+        tool_entry(logs=honeypot_logs("ls", " ")),
+    ], follow_up="ok")
+    # a tool call without a honeypot_logs key, e.g. before the attacker reached the honeypot
+    logs += turn([terminal_call("nmap honeypot")], [tool_entry()], follow_up="scanned")
+
+    session = extract_session(logs)
+
+    assert session["session"] == "ls ;"
+    assert extract_everything_session(logs)["length"] == 3
+
+
+def test_missing_labels_and_broken_honeypot_logs():
+    call = {"id": "call", "type": "function", "function": {"name": "terminal_input", "arguments": {"input": "id"}}}
+    broken_logs = {"raw_logs": '{"event": {"Protocol": "ssh", "Command": "id"}}\nnot json', "error": "bad line"}
+    logs = turn([call], [tool_entry(logs=broken_logs)], follow_up="ok")
+
+    session = extract_session(logs)
+
+    assert session["session"] == "id ;"
+    assert session["full_session"][0]["tactic"] == "Error: No tactic found"
+    assert session["full_session"][0]["technique"] == "Error: No technique found"
+
+
+def baseline_sessions(logs):
+    """
+    Session and omni session as extracted before the single pass extractor, one full
+    pass over the loaded log for each of them.
+    """
+    def follow_up_content(i):
+        follow_up_index = i + len(logs[i]["tool_calls"]) + 1
+        if follow_up_index >= len(logs):
+            return None
+        assert logs[follow_up_index]["role"] == "assistant"
+        return logs[follow_up_index]["content"]
+
+    def labels(tool):
+        arguments = tool["function"]["arguments"]
+        if type(arguments) is str:
+            arguments = json.loads(arguments)
+        tactic = arguments.get("tactic_used", "Error: No tactic found")
+        technique = arguments.get("technique_used", "Error: No technique found")
+        return arguments, {
+            "tactic_raw": tactic,
+            "tactic": str(tactic).split(":")[-1] if "tactic_used" in arguments else tactic,
+            "technique_raw": technique,
+            "technique": str(technique).split(":")[-1] if "technique_used" in arguments else technique,
+        }
+
+    session, omni = [], []
+    for i, entry in enumerate(logs):
+        if entry["role"] != "assistant" or not entry["tool_calls"]:
+            continue
+        content = follow_up_content(i)
+        for j, tool in enumerate(entry["tool_calls"]):
+            if tool["function"]["name"] != "terminal_input":
+                continue
+            arguments, tool_labels = labels(tool)
+            if str(arguments["input"]).strip():
+                for command in divide_statements(str(arguments["input"]).strip()):
+                    omni.append({"command": command, **tool_labels, "content": content})
+            hp_entry = logs[i + j + 1]
+            if "honeypot_logs" not in hp_entry:
+                continue
+            for log in honeypot_events(hp_entry["honeypot_logs"]):
+                if "event" not in log or str(log["event"]["Protocol"]).lower() != "ssh":
+                    continue
+                if "Command" in log["event"] and str(log["event"]["Command"]).strip():
+                    for command in divide_statements(str(log["event"]["Command"]).strip()):
+                        session.append({"command": command, **tool_labels, "content": content})
+
+    def session_log(records):
+        return {
+            "session": " ".join(record["command"] for record in records).strip(),
+            "tactics": recombine_labels([record["tactic"] for record in records]),
+            "techniques": recombine_labels([record["technique"] for record in records]),
+            "length": len(records),
+            "full_session": records,
+        }
+
+    discovered_honeypot = "unknown"
+    for entry in logs[-2:]:
+        if entry["role"] == "tool" and entry["name"] == "terminate":
+            discovered_honeypot = "yes" if entry["content"] else "no"
+            break
+    return session_log(session), {**session_log(omni), "discovered_honeypot": discovered_honeypot}
+
+
+def random_log(rng):
+    commands = ["ls -la", "id; whoami", "cat /etc/passwd | grep root", "echo 'a; b'", "cd /tmp && ls", " ", "uname -a"]
+    techniques = ["T1082:System Information Discovery", "T1033:System Owner/User Discovery", "T1110:Brute Force"]
+    followups = rng.random() < 0.5
+    logs = [{"role": "system", "content": "attack"}, {"role": "user", "content": "go"}]
+    for turn_index in range(rng.randint(0, 8)):
+        tool_calls = []
+        for _ in range(rng.randint(1, 3)):
+            if rng.random() < 0.1:
+                tool_calls.append(terminate_call(rng.random() < 0.5))
+            elif rng.random() < 0.1:
+                tool_calls.append({"id": "call", "function": {"name": "terminal_input", "arguments": {"input": "id"}}})
+            else:
+                tool_calls.append(terminal_call(rng.choice(commands), rng.choice(techniques)))
+        tool_entries = []
+        for call in tool_calls:
+            name = call["function"]["name"]
+            if name == "terminate":
+                tool_entries.append(tool_entry("terminate", rng.random() < 0.5))
+            elif rng.random() < 0.2:
+                tool_entries.append(tool_entry())
+            else:
+                events = [{"event": {"Protocol": rng.choice(["SSH", "ssh", "HTTP"]), "Command": rng.choice(commands)}}
+                    for _ in range(rng.randint(0, 3))]
+                if rng.random() < 0.1:
+                    events.append({"level": "info"})
+                tool_entries.append(tool_entry(logs=events))
+        follow_up = f"follow-up {turn_index}" if followups else None
+        logs += turn(tool_calls, tool_entries, content=f"turn {turn_index}", follow_up=follow_up)
+    if followups and rng.random() < 0.3 and logs[-1]["role"] == "assistant":
+        # the session ended before the last follow-up
+        logs.pop()
+    return logs
+
+
+def test_single_pass_matches_the_baseline_extraction():
+    rng = random.Random(0)
+    for _ in range(500):
+        logs = random_log(rng)
+        expected_session, expected_omni = baseline_sessions(logs)
+
+        session, omni = extract_sessions(logs)
+
+        assert session == expected_session
+        assert omni == expected_omni
+        assert extract_session(logs) == expected_session
+        assert extract_everything_session(logs) == expected_omni
+
+
+def test_streaming_from_jsonl_matches_the_loaded_log(tmp_path):
+    rng = random.Random(1)
+    for i in range(20):
+        logs = random_log(rng)
+        path = tmp_path / f"attack_{i}.jsonl"
+        with JsonlWriter(path) as writer:
+            for entry in logs:
+                writer.write(entry)
+
+        assert extract_sessions(iter_jsonl(path)) == extract_sessions(logs)
+
+        records = list(iter_session_records(iter_jsonl(path)))
+        session, omni = extract_sessions(logs)
+        assert [record for kind, record in records if kind == "session"] == session["full_session"]
+        assert [record for kind, record in records if kind == "omni"] == omni["full_session"]
+
+
+def test_extractor_emits_commands_once_their_reasoning_arrives():
+    extractor = SessionExtractor()
+    entries = turn([terminal_call("id")], [tool_entry(logs=honeypot_logs("id"))], follow_up="root")
+
+    assert extractor.add(entries[0]) == []
+    assert extractor.add(entries[1]) == []
+    records = extractor.add(entries[2])
+    assert [(kind, record["command"], record["content"]) for kind, record in records] == [
+        ("omni", "id ;", "root"), ("session", "id ;", "root")]
+    assert extractor.finish() == []
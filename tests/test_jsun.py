@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from Utils.jsun import JsonlWriter, iter_jsonl, load_json, resolve_json_path, save_json_to_file
+
+
+def test_jsonl_writer_appends_one_record_per_line(tmp_path):
+    path = tmp_path / "logs" / "attack_1.jsonl"
+    with JsonlWriter(path) as writer:
+        writer.write({"role": "user", "content": "ls"})
+        writer.write({"role": "assistant", "content": "ä ö"})
+
+    assert path.read_text(encoding="utf8").count("\n") == 2
+    assert list(iter_jsonl(path)) == [
+        {"role": "user", "content": "ls"},
+        {"role": "assistant", "content": "ä ö"},
+    ]
+
+
+def test_jsonl_writer_appends_to_existing_file_unless_truncated(tmp_path):
+    path = tmp_path / "tokens_used.jsonl"
+    with JsonlWriter(path) as writer:
+        writer.write({"attack": 1})
+    with JsonlWriter(path) as writer:
+        writer.write({"attack": 2})
+    assert [record["attack"] for record in iter_jsonl(path)] == [1, 2]
+
+    with JsonlWriter(path, truncate=True) as writer:
+        writer.write({"attack": 3})
+    assert [record["attack"] for record in iter_jsonl(path)] == [3]
+
+
+def test_jsonl_writer_flushes_every_n_records(tmp_path):
+    path = tmp_path / "sessions.jsonl"
+    writer = JsonlWriter(path, flush_every=2)
+
+    writer.write({"session": 1})
+    assert list(iter_jsonl(path)) == []
+    writer.write({"session": 2})
+    assert len(list(iter_jsonl(path))) == 2
+
+    writer.write({"session": 3})
+    writer.flush()
+    assert len(list(iter_jsonl(path))) == 3
+
+    writer.close()
+    writer.close()
+
+
+def test_jsonl_writer_rejects_non_positive_flush_every(tmp_path):
+    with pytest.raises(AssertionError):
+        JsonlWriter(tmp_path / "x.jsonl", flush_every=0)
+
+
+def test_iter_jsonl_skips_blank_lines(tmp_path):
+    path = tmp_path / "sessions.jsonl"
+    path.write_text('{"a": 1}\n\n   \n{"a": 2}\n')
+    assert list(iter_jsonl(path)) == [{"a": 1}, {"a": 2}]
+
+
+def test_load_json_falls_back_to_jsonl(tmp_path):
+    path = tmp_path / "sessions.json"
+    with JsonlWriter(path.with_suffix(".jsonl")) as writer:
+        writer.write({"session": 1})
+
+    assert resolve_json_path(path) == path.with_suffix(".jsonl")
+    assert load_json(path) == [{"session": 1}]
+
+    # the JSON file wins if both exist
+    save_json_to_file([{"session": "json"}], path, verbose=False)
+    assert resolve_json_path(path) == path
+    assert load_json(path) == [{"session": "json"}]
+
+
+def test_load_json_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_json(tmp_path / "missing.json")
+    assert resolve_json_path(tmp_path / "missing.json") is None
+
+    text_file = tmp_path / "notes.txt"
+    text_file.write_text(json.dumps([1]))
+    with pytest.raises(ValueError):
+        load_json(text_file)
@@ -0,0 +1,219 @@
+from types import SimpleNamespace
+
+import openai
+import pytest
+from openai.types.chat import ChatCompletion
+
+from Red.model import LLMModel
+from Utils import llm_client
+from Utils.llm_client import CassetteMissError, CassetteStore, LLMTransport, TokenBucket, \
+    request_key, retry_after_seconds
+
+
+def completion(content, prompt_tokens=100, completion_tokens=10):
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class FakeClient:
+    """Stands in for openai.OpenAI, answering from responses (a list of completions or errors)."""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return ChatCompletion.model_validate(response)
+
+
+def make_transport(mode, tmp_path, responses=(), **kwargs):
+    transport = LLMTransport(mode, tmp_path / "cassette.sqlite" if mode != "passthrough" else None, **kwargs)
+    transport._client = FakeClient(responses)
+    return transport
+
+
+def request(content="ls", **kwargs):
+    return dict(model=LLMModel.GPT_4O_MINI, messages=[{"role": "user", "content": content}], **kwargs)
+
+
+def test_request_key_covers_all_semantic_arguments():
+    base = request()
+    assert request_key(base) == request_key(request())
+    assert request_key(base) != request_key(request("pwd"))
+    assert request_key(base) != request_key(request(temperature=0.2))
+    assert request_key(base) != request_key(request(tools=[{"type": "function"}]))
+    assert request_key(base) != request_key(request(response_format={"type": "json_object"}))
+    assert request_key(base) != request_key(request(tool_choice="required"))
+    assert request_key(base) != request_key(request(seed=1))
+
+
+def test_request_key_ignores_non_semantic_arguments():
+    base = request()
+    assert request_key(base) == request_key(request(timeout=30))
+    assert request_key(base) == request_key(request(extra_headers={"x-trace": "1"}))
+    assert request_key(base) == request_key(request(temperature=None))
+    # the model enum and its value are the same request
+    assert request_key(base) == request_key(dict(base, model="gpt-4o-mini"))
+    # argument order does not matter
+    assert request_key(dict(reversed(list(base.items())))) == request_key(base)
+
+
+def test_cassette_store_roundtrip(tmp_path):
+    store = CassetteStore(tmp_path / "cassettes" / "cassette.sqlite")
+    assert store.get("key", 0) is None
+    assert store.count("key") == 0
+
+    store.put("key", 0, {"a": "ä"})
+    store.put("key", 1, {"a": 2})
+    store.put("key", 1, {"a": 3})
+
+    assert store.count("key") == 2
+    assert store.get("key", 0) == {"a": "ä"}
+    assert store.get("key", 1) == {"a": 3}
+    # recordings persist
+    assert CassetteStore(tmp_path / "cassettes" / "cassette.sqlite").get("key", 1) == {"a": 3}
+
+
+def test_record_then_replay_without_network(tmp_path):
+    recorder = make_transport("record", tmp_path, [completion("first"), completion("second"), completion("other")])
+    assert recorder.chat_completion(**request()).choices[0].message.content == "first"
+    assert recorder.chat_completion(**request()).choices[0].message.content == "second"
+    assert recorder.chat_completion(**request("pwd")).choices[0].message.content == "other"
+
+    player = make_transport("replay", tmp_path)
+    # the n-th identical request gets the n-th recording, then the last one
+    assert player.chat_completion(**request()).choices[0].message.content == "first"
+    assert player.chat_completion(**request(timeout=5)).choices[0].message.content == "second"
+    assert player.chat_completion(**request()).choices[0].message.content == "second"
+    assert player.chat_completion(**request("pwd")).choices[0].message.content == "other"
+    assert player._client.requests == []
+    # replayed responses are free
+    assert player.costs.spent_usd == 0.0
+
+
+def test_replay_miss_raises(tmp_path):
+    player = make_transport("replay", tmp_path)
+    with pytest.raises(CassetteMissError):
+        player.chat_completion(**request())
+
+
+def test_modes_are_validated(tmp_path):
+    with pytest.raises(AssertionError):
+        LLMTransport("rewind", tmp_path / "cassette.sqlite")
+    with pytest.raises(AssertionError):
+        LLMTransport("record")
+
+
+def rate_limit_error(code="rate_limit_exceeded", headers=None):
+    response = SimpleNamespace(request=None, status_code=429, headers=headers or {})
+    return openai.RateLimitError("Rate limit reached", response=response, body={"code": code})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(llm_client.time, "sleep", slept.append)
+    return slept
+
+
+def test_retryable_errors_are_retried_with_backoff(tmp_path, sleeps):
+    transport = make_transport("passthrough", tmp_path,
+        [openai.APITimeoutError(request=None), rate_limit_error(), completion("ok")],
+        backoff_base=1.0, backoff_max=60.0)
+
+    response = transport.chat_completion(**request())
+
+    assert response.choices[0].message.content == "ok"
+    assert len(transport._client.requests) == 3
+    assert 0.5 <= sleeps[0] <= 1.0 and 1.0 <= sleeps[1] <= 2.0
+    assert transport.stats.to_dict()["retries"] == 2
+    assert transport.stats.to_dict()["rate_limited"] == 1
+
+
+def test_retries_are_bounded(tmp_path, sleeps):
+    transport = make_transport("passthrough", tmp_path, [rate_limit_error()] * 3, max_retries=2)
+    with pytest.raises(openai.RateLimitError):
+        transport.chat_completion(**request())
+    assert len(transport._client.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_retry_after_header_sets_the_delay(tmp_path, sleeps):
+    transport = make_transport("passthrough", tmp_path,
+        [rate_limit_error(headers={"retry-after-ms": "1500"}), rate_limit_error(headers={"retry-after": "4"}), completion("ok")])
+    transport.chat_completion(**request())
+    assert sleeps == [1.5, 4.0]
+
+    assert retry_after_seconds(rate_limit_error(headers={"retry-after": "soon"})) is None
+    assert retry_after_seconds(openai.APITimeoutError(request=None)) is None
+
+
+def test_insufficient_quota_is_not_retried(tmp_path, sleeps):
+    transport = make_transport("passthrough", tmp_path, [rate_limit_error("insufficient_quota"), completion("ok")])
+    with pytest.raises(openai.RateLimitError) as error:
+        transport.chat_completion(**request())
+    assert error.value.code == "insufficient_quota"
+    assert isinstance(error.value, openai.APIError)
+    assert sleeps == []
+    assert len(transport._client.requests) == 1
+
+
+def test_other_errors_are_raised_immediately(tmp_path, sleeps):
+    response = SimpleNamespace(request=None, status_code=400, headers={})
+    transport = make_transport("passthrough", tmp_path,
+        [openai.BadRequestError("bad request", response=response, body=None), completion("ok")])
+    with pytest.raises(openai.BadRequestError):
+        transport.chat_completion(**request())
+    assert sleeps == []
+
+
+def test_token_bucket_spaces_out_callers(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_client.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(60)
+
+    # a full minute of tokens is available at once
+    assert bucket.reserve(60) == 0.0
+    # then one token per second
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    now[0] += 10
+    assert bucket.reserve(1) == 0.0
+
+    with pytest.raises(AssertionError):
+        TokenBucket(0)
+
+
+def test_requests_are_throttled_by_the_buckets(tmp_path, sleeps):
+    transport = make_transport("passthrough", tmp_path, [completion("a"), completion("b")], requests_per_minute=1)
+    transport.chat_completion(**request())
+    transport.chat_completion(**request())
+    assert len(sleeps) == 1 and sleeps[0] == pytest.approx(60, abs=1)
+    assert transport.stats.to_dict()["throttled_seconds"] == pytest.approx(60, abs=1)
+
+
+
+def test_usage_of_api_responses_is_priced(tmp_path):
+    transport = make_transport("passthrough", tmp_path, [completion("ok", prompt_tokens=1_000_000, completion_tokens=0)],
+        budget_usd=0.1)
+    transport.chat_completion(**request())
+    assert transport.costs.spent_usd == pytest.approx(0.15)
+    assert transport.costs.exceeded()
@@ -0,0 +1,140 @@
+import json
+
+import pytest
+
+import config
+from Red import log_extractor
+from Red.log_extractor import HoneypotLogCursor, HoneypotLogFollower, timestamp_key
+
+
+def event(command, source_ip="172.11.0.2", session_id="s1"):
+    return {"event": {"Protocol": "SSH", "Command": command, "SourceIp": source_ip, "ID": session_id}}
+
+
+def line(timestamp, payload):
+    return f"{timestamp} {json.dumps(payload) if not isinstance(payload, str) else payload}\n"
+
+
+@pytest.fixture
+def follower(monkeypatch):
+    # no docker here, lines are added by hand
+    monkeypatch.setattr(HoneypotLogFollower, "_follow", lambda self: None)
+    return HoneypotLogFollower(max_events=5)
+
+
+def test_timestamp_key_orders_trimmed_fractions():
+    timestamps = ["2025-07-01T10:00:00.5Z", "2025-07-01T10:00:00.123456789Z", "2025-07-01T10:00:00Z",
+        "2025-07-01T10:00:00.12Z", "2025-07-01T10:00:01.000000001Z"]
+    ordered = ["2025-07-01T10:00:00Z", "2025-07-01T10:00:00.12Z", "2025-07-01T10:00:00.123456789Z",
+        "2025-07-01T10:00:00.5Z", "2025-07-01T10:00:01.000000001Z"]
+    assert sorted(timestamps, key=timestamp_key) == ordered
+
+
+def test_events_are_read_once_in_order(follower):
+    seq = follower.current_seq()
+    follower._add_line(line("2025-07-01T10:00:00.1Z", event("id")))
+    follower._add_line(line("2025-07-01T10:00:00.2Z", event("ls")))
+
+    events, seq, missed = follower.events_since(seq)
+    assert [e["event"]["Command"] for e in events] == ["id", "ls"]
+    assert missed == 0
+
+    assert follower.events_since(seq) == ([], seq, 0)
+    follower._add_line(line("2025-07-01T10:00:00.3Z", event("pwd")))
+    events, seq, _ = follower.events_since(seq)
+    assert [e["event"]["Command"] for e in events] == ["pwd"]
+
+
+def test_lines_repeated_after_a_reconnect_are_skipped(follower):
+    follower._add_line(line("2025-07-01T10:00:00.1Z", event("id")))
+    follower._add_line(line("2025-07-01T10:00:00.2Z", event("ls")))
+    assert follower.since == "2025-07-01T10:00:00.2Z"
+
+    # docker logs --since repeats the last line
+    follower._add_line(line("2025-07-01T10:00:00.2Z", event("ls")))
+    follower._add_line(line("2025-07-01T10:00:00.25Z", event("pwd")))
+    follower._add_line("2025-07-01T10:00:00.3Z \n")
+
+    events, _, _ = follower.events_since(0)
+    assert [e["event"]["Command"] for e in events] == ["id", "ls", "pwd"]
+
+
+def test_ring_buffer_reports_dropped_events(follower):
+    for i in range(8):
+        follower._add_line(line(f"2025-07-01T10:00:0{i}Z", event(str(i))))
+
+    events, seq, missed = follower.events_since(0)
+    assert [e["event"]["Command"] for e in events] == ["3", "4", "5", "6", "7"]
+    assert seq == 8 and missed == 3
+    assert follower.events_since(6)[0][0]["event"]["Command"] == "6"
+
+
+def test_bad_lines_are_quarantined(follower):
+    follower._add_line(line("2025-07-01T10:00:00.1Z", "not json"))
+    follower._add_line(line("2025-07-01T10:00:00.2Z", event("id")))
+    assert len(follower.events_since(0)[0]) == 1
+    assert follower.parser.stats()["quarantined_lines"] == 1
+
+
+class FakePopen:
+    """docker logs -f stand-in, each run prints the next scripted list of lines and exits."""
+    runs = []
+    commands = []
+
+    def __init__(self, command, **kwargs):
+        FakePopen.commands.append(command)
+        self.stdout = iter(FakePopen.runs.pop(0) if FakePopen.runs else [])
+
+    def wait(self):
+        return 0
+
+    def terminate(self):
+        pass
+
+
+def test_follower_reconnects_after_the_last_line(monkeypatch):
+    monkeypatch.setattr(log_extractor.subprocess, "Popen", FakePopen)
+    FakePopen.commands = []
+    FakePopen.runs = [
+        [line("2025-07-01T10:00:00.1Z", event("id")), line("2025-07-01T10:00:00.2Z", event("ls"))],
+        [line("2025-07-01T10:00:00.2Z", event("ls")), line("2025-07-01T10:00:00.3Z", event("pwd"))],
+    ]
+
+    follower = HoneypotLogFollower(reconnect_delay=0.01)
+    with follower.condition:
+        assert follower.condition.wait_for(lambda: follower.next_seq >= 3, timeout=5)
+    follower.stop()
+    follower.thread.join(5)
+
+    events, _, _ = follower.events_since(0)
+    assert [e["event"]["Command"] for e in events] == ["id", "ls", "pwd"]
+    assert FakePopen.commands[1][-1] == "2025-07-01T10:00:00.2Z"
+
+
+def test_cursor_reads_only_its_own_events(follower, monkeypatch):
+    monkeypatch.setattr(config, "follow_honeypot_logs", True)
+    monkeypatch.setattr(log_extractor, "get_log_follower", lambda: follower)
+    follower._add_line(line("2025-07-01T10:00:00.0Z", event("before")))
+
+    first = HoneypotLogCursor("172.11.0.2")
+    second = HoneypotLogCursor("172.12.0.2")
+    follower._add_line(line("2025-07-01T10:00:00.1Z", event("id")))
+    follower._add_line(line("2025-07-01T10:00:00.2Z", event("whoami", "172.12.0.2", "s2")))
+    # events without a source IP belong to the session with the same ID
+    follower._add_line(line("2025-07-01T10:00:00.3Z", {"event": {"Protocol": "SSH", "ID": "s1", "Msg": "closed"}}))
+
+    assert [e["event"].get("Command") for e in first.get_new_logs()] == ["id", None]
+    assert [e["event"].get("Command") for e in second.get_new_logs()] == ["whoami"]
+    assert first.get_new_logs() == []
+
+
+def test_cursor_counts_missed_events(follower, monkeypatch, capsys):
+    monkeypatch.setattr(config, "follow_honeypot_logs", True)
+    monkeypatch.setattr(log_extractor, "get_log_follower", lambda: follower)
+    cursor = HoneypotLogCursor()
+    for i in range(7):
+        follower._add_line(line(f"2025-07-01T10:00:0{i}Z", event(str(i))))
+
+    assert len(cursor.get_new_logs()) == 5
+    assert cursor.missed == 2
+    assert "2 honeypot log events dropped" in capsys.readouterr().out
@@ -0,0 +1,79 @@
+import json
+import random
+
+from Red.log_parser import JsonLinesParser, honeypot_events, parse_json_lines
+
+
+def feed_in_chunks(parser, text, rng):
+    events = []
+    start = 0
+    while start < len(text):
+        end = start + rng.randint(1, 30)
+        events += parser.feed(text[start:end])
+        start = end
+    return events + parser.flush()
+
+
+def test_chunking_does_not_change_the_events():
+    rng = random.Random(0)
+    for _ in range(300):
+        lines = []
+        expected = []
+        for i in range(rng.randint(0, 20)):
+            kind = rng.random()
+            if kind < 0.7:
+                event = {"event": {"Command": f"cmd {i}", "Msg": "ä" * rng.randint(0, 3)}, "n": i}
+                lines.append(json.dumps(event))
+                expected.append(event)
+            elif kind < 0.8:
+                lines.append("")
+            elif kind < 0.9:
+                lines.append("level=info msg=not json")
+            else:
+                lines.append("[1, 2]")
+        text = "\n".join(lines) + rng.choice(["", "\n"])
+
+        assert feed_in_chunks(JsonLinesParser(), text, rng) == expected
+        assert parse_json_lines(text) == expected
+
+
+def test_a_bad_line_only_loses_itself():
+    parser = JsonLinesParser()
+    events = parser.feed('{"a": 1}\ngarbage\n{"a": 2}\n') + parser.flush()
+    assert events == [{"a": 1}, {"a": 2}]
+    assert parser.stats() == {"parsed_lines": 2, "joined_lines": 0, "quarantined_lines": 1}
+    assert list(parser.quarantine) == ["garbage"]
+
+
+def test_split_long_lines_are_joined():
+    parser = JsonLinesParser()
+    events = parser.feed('{"event": {"Command": "cat /etc/pas\nswd"}}\n{"a": 2}\n') + parser.flush()
+    assert events == [{"event": {"Command": "cat /etc/passwd"}}, {"a": 2}]
+    assert parser.stats()["joined_lines"] == 1
+
+
+def test_broken_object_is_quarantined_when_the_next_one_starts():
+    parser = JsonLinesParser()
+    events = parser.feed('{"event": {"Command": \n{"a": 2}\n{"b": \n') + parser.flush()
+    assert events == [{"a": 2}]
+    assert list(parser.quarantine) == ['{"event": {"Command":', '{"b":']
+
+
+def test_pending_lines_are_bounded():
+    parser = JsonLinesParser(max_pending_chars=20)
+    events = parser.feed('{"a": "' + "\n".join("x" * 10 for _ in range(5)) + '"}\n{"b": 1}\n') + parser.flush()
+    assert events == [{"b": 1}]
+    assert parser.stats()["quarantined_lines"] >= 1
+
+
+def test_quarantine_keeps_the_last_lines():
+    parser = JsonLinesParser(max_quarantine=3)
+    parser.feed("".join(f"bad {i}\n" for i in range(10)))
+    assert list(parser.quarantine) == ["bad 7", "bad 8", "bad 9"]
+    assert parser.stats()["quarantined_lines"] == 10
+
+
+def test_honeypot_events_of_old_and_new_logs():
+    assert honeypot_events([{"a": 1}]) == [{"a": 1}]
+    assert honeypot_events(None) == []
+    assert honeypot_events({"raw_logs": '{"a": 1}\nbad\n{"a": 2}', "error": "Expecting value"}) == [{"a": 1}, {"a": 2}]
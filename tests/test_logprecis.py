@@ -0,0 +1,120 @@
+import random
+import re
+
+import pytest
+
+from Utils.logprecis import divide_sessions, divide_statements
+
+
+def old_divide_statements(session, add_special_token=False, special_token="[STAT]"):
+    """divide_statements as it was before it became shell aware."""
+    if session.strip()[-1] != ";":
+        session += " ;"
+    statements = re.split(r"(; |\|\|? |&& )", session + " ")
+    if len(statements) != 1:
+        statements = ["".join(statements[i : i + 2]).strip() for i in range(0, len(statements) - 1, 2)]
+    else:
+        statements = [statements[0].strip() + " ;"]
+    if add_special_token:
+        statements = [f"{special_token} " + el for el in statements]
+    return statements
+
+
+def random_session(rng, alphabet):
+    words = ["ls", "-la", "cat", "/etc/passwd", "echo", "x", ";", "|", "||", "&&", "grep", "root", ""]
+    session = ""
+    for _ in range(rng.randint(1, 12)):
+        session += rng.choice(words) + rng.choice([" ", "  ", ""]) + rng.choice(alphabet)
+    return session if session.strip() else "id"
+
+
+def test_plain_split_matches_the_old_split():
+    rng = random.Random(0)
+    for _ in range(3000):
+        session = random_session(rng, ["", "", ";", "|", "&", " "])
+        assert divide_statements(session, shell_aware=False) == old_divide_statements(session)
+        # without quotes or escapes the shell aware split is the same
+        assert divide_statements(session) == old_divide_statements(session)
+
+
+def test_plain_split_matches_the_old_split_with_quotes():
+    rng = random.Random(1)
+    for _ in range(3000):
+        session = random_session(rng, ["", ";", "|", "'", '"', "\\", " "])
+        assert divide_statements(session, shell_aware=False) == old_divide_statements(session)
+        assert divide_statements(session, True, "[STAT]", shell_aware=False) == old_divide_statements(session, True)
+
+
+def test_plain_split_matches_the_old_split_with_trailing_whitespace():
+    rng = random.Random(3)
+    for _ in range(3000):
+        session = random_session(rng, ["", ";", "|", "'", "\n", "\t", " "])
+        assert divide_statements(session, shell_aware=False) == old_divide_statements(session)
+
+
+@pytest.mark.parametrize("session, statements", [
+    # the LogPrecis split doubles the terminator before a newline and drops the last statement
+    ("ls ;\n", ["ls ; ;"]),
+    ("cd /tmp; ls;\n", ["cd /tmp;"]),
+    ("ls;\t", ["ls; ;"]),
+    ("cat 'a ; b';\n", ["cat 'a ;"]),
+])
+def test_plain_split_keeps_the_legacy_output(session, statements):
+    assert divide_statements(session, shell_aware=False) == statements
+
+
+def test_shell_aware_split_keeps_every_character():
+    rng = random.Random(2)
+    for _ in range(3000):
+        session = random_session(rng, ["", ";", "|", "'", '"', "\\", " "])
+        statements = divide_statements(session)
+        assert all(statement.endswith(";") or statement.endswith(("|", "||", "&&")) for statement in statements)
+        # only whitespace and the added terminator differ from the session
+        assert "".join(statements).replace(" ", "").rstrip(";") == session.replace(" ", "").rstrip(";")
+
+
+@pytest.mark.parametrize("session, statements", [
+    ("ls", ["ls ;"]),
+    ("ls;", ["ls;"]),
+    ("cd /tmp; ls -la | grep x && id", ["cd /tmp;", "ls -la |", "grep x &&", "id ;"]),
+    ("echo 'x ; y'", ["echo 'x ; y' ;"]),
+    ("cat 'a;b' ; ls", ["cat 'a;b' ;", "ls ;"]),
+    ('echo "a | b" | wc -c', ['echo "a | b" |', "wc -c ;"]),
+    ('echo "say \\"hi; there\\"" ; id', ['echo "say \\"hi; there\\"" ;', "id ;"]),
+    ("echo a\\; b; id", ["echo a\\; b;", "id ;"]),
+    ("echo it\\'s; id", ["echo it\\'s;", "id ;"]),
+    # an unterminated quote runs to the end, the terminator is not doubled
+    ("cat 'unterminated ; x", ["cat 'unterminated ; x ;"]),
+    ("echo 'unterminated ;", ["echo 'unterminated ;"]),
+])
+def test_quoted_separators_do_not_split(session, statements):
+    assert divide_statements(session) == statements
+
+
+def test_shell_aware_split_terminates_statements_once():
+    assert divide_statements("ls ;\n") == ["ls ;"]
+    assert divide_statements("cd /tmp; ls;\n") == ["cd /tmp;", "ls;"]
+
+
+def test_plain_split_still_splits_quoted_separators():
+    assert divide_statements("echo 'x ; y'", shell_aware=False) == ["echo 'x ;", "y' ;"]
+    assert divide_statements("cat 'unterminated ; x", shell_aware=False) == ["cat 'unterminated ;", "x ;"]
+
+
+def test_special_token():
+    assert divide_statements("id; ls", add_special_token=True) == ["[STAT] id;", "[STAT] ls ;"]
+    assert divide_statements("id", add_special_token=True, special_token="<s>") == ["<s> id ;"]
+
+
+def test_cached_results_are_not_shared():
+    statements = divide_statements("id; ls")
+    statements.append("changed")
+    assert divide_statements("id; ls") == ["id;", "ls ;"]
+
+
+def test_divide_sessions_matches_divide_statements():
+    sessions = ["id; ls", "echo 'a; b'", "id; ls", "uname -a"]
+    divided = divide_sessions(sessions, add_special_token=True)
+    assert divided == [divide_statements(session, add_special_token=True) for session in sessions]
+    divided[0].append("changed")
+    assert divided[2] == ["[STAT] id;", "[STAT] ls ;"]
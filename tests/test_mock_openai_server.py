@@ -0,0 +1,115 @@
+import importlib.util
+import json
+import threading
+import urllib.error
+import urllib.request
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+SCRIPT_PATH = Path(__file__).resolve().parent.parent / "Scripts" / "mock_openai_server.py"
+spec = importlib.util.spec_from_file_location("mock_openai_server", SCRIPT_PATH)
+mock_openai_server = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mock_openai_server)
+
+TOOLS = [{"type": "function", "function": {"name": "terminal_input", "parameters": {"properties": {
+    "tactic_used": {"enum": ["TA0007:Discovery"]},
+    "technique_used": {"enum": ["T1082:System Information Discovery", "T1018:Remote System Discovery"]},
+}}}}]
+
+
+def make_settings(tmp_path=None, script=None, **overrides):
+    args = dict(latency=0.0, jitter=0.0, rate_limit_prob=0.0, retry_after=2.0, terminate_prob=0.0,
+        cached_fraction=0.5, completion_tokens=0, seed=1, script=None)
+    args.update(overrides)
+    if script is not None:
+        script_path = tmp_path / "script.json"
+        script_path.write_text(json.dumps(script))
+        args["script"] = str(script_path)
+    return mock_openai_server.MockSettings(Namespace(**args))
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(settings):
+        server = mock_openai_server.ThreadingHTTPServer(("127.0.0.1", 0), mock_openai_server.make_handler(settings))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode("utf8"),
+        headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def test_attacker_requests_get_terminal_input_within_the_tool_enums():
+    settings = make_settings()
+    for _ in range(20):
+        response = mock_openai_server.completion_response(
+            {"model": "o4-mini", "messages": [{"role": "user", "content": "attack"}], "tools": TOOLS}, settings)
+        tool_call = response["choices"][0]["message"]["tool_calls"][0]
+        arguments = json.loads(tool_call["function"]["arguments"])
+        assert tool_call["function"]["name"] == "terminal_input"
+        assert arguments["tactic_used"] == "TA0007:Discovery"
+        assert arguments["technique_used"] in TOOLS[0]["function"]["parameters"]["properties"]["technique_used"]["enum"]
+        assert response["choices"][0]["finish_reason"] == "tool_calls"
+        usage = response["usage"]
+        assert usage["prompt_tokens_details"]["cached_tokens"] % 128 == 0
+        assert usage["prompt_tokens_details"]["cached_tokens"] <= usage["prompt_tokens"]
+
+
+def test_scripted_steps_are_replayed_in_order(tmp_path):
+    settings = make_settings(tmp_path, script=[{"command": "id"}, {"terminate": True}])
+    request = {"messages": [{"role": "user", "content": "attack"}], "tools": TOOLS}
+
+    first = mock_openai_server.completion_response(request, settings)["choices"][0]["message"]["tool_calls"][0]
+    second = mock_openai_server.completion_response(request, settings)["choices"][0]["message"]["tool_calls"][0]
+    third = mock_openai_server.completion_response(request, settings)["choices"][0]["message"]["tool_calls"][0]
+
+    assert json.loads(first["function"]["arguments"])["input"] == "id"
+    assert second["function"]["name"] == "terminate"
+    assert json.loads(second["function"]["arguments"]) == {"success": True}
+    assert third["function"]["name"] == "terminal_input"
+
+
+def test_text_requests_follow_the_prompt():
+    settings = make_settings()
+
+    def answer(prompt):
+        response = mock_openai_server.completion_response({"messages": [{"role": "user", "content": prompt}]}, settings)
+        assert response["choices"][0]["message"]["tool_calls"] is None
+        return response["choices"][0]["message"]["content"]
+
+    assert answer("Run the command: uname -a").startswith("uname -a: simulated output")
+    assert "id" in json.loads(answer("Generate a Beelzebub honeypot configuration. Schema: ..."))
+    assert len(json.loads(answer("List MITRE ATT&CK tactics and techniques"))) == 3
+
+
+def test_http_completion_and_rate_limit(serve):
+    url = serve(make_settings(completion_tokens=7))
+    body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hello"}]}
+
+    response = post(url + "/chat/completions", body)
+    assert response["object"] == "chat.completion"
+    assert response["usage"]["completion_tokens"] == 7
+
+    limited_url = serve(make_settings(rate_limit_prob=1.0, retry_after=3))
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(limited_url + "/chat/completions", body)
+    assert error.value.code == 429
+    assert error.value.headers["Retry-After"] == "3"
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(url + "/embeddings", body)
+    assert error.value.code == 404
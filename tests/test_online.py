@@ -0,0 +1,210 @@
+import math
+import random
+import statistics
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from Red.reconfiguration import EntropyReconfigCriterion
+from Red.reconfiguration.online import Cusum, MovingAverage, OnlineEntropy, PageHinkley, WelfordStats, \
+    WindowedMedian
+
+
+def brute_force_entropy(values):
+    counts = Counter(values)
+    total = sum(counts.values())
+    return -sum(n / total * math.log(n / total) for n in counts.values())
+
+
+def test_online_entropy_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(200):
+        entropy = OnlineEntropy()
+        values = []
+        assert entropy.entropy() == 0.0
+        for _ in range(rng.randint(1, 100)):
+            value = rng.choice("abcdefgh"[:rng.randint(1, 8)])
+            count = rng.randint(1, 3)
+            entropy.add(value, count)
+            values += [value] * count
+            assert entropy.entropy() == pytest.approx(brute_force_entropy(values), abs=1e-9)
+
+
+def test_online_entropy_of_a_single_value_is_zero():
+    entropy = OnlineEntropy()
+    for _ in range(10000):
+        entropy.add("T1082")
+    assert entropy.entropy() == 0.0
+
+
+def test_moving_average_matches_brute_force():
+    rng = random.Random(1)
+    for window in range(1, 8):
+        average = MovingAverage(window)
+        values = []
+        for _ in range(50):
+            value = rng.uniform(-5, 5)
+            average.add(value)
+            values.append(value)
+            assert average.ready() == (len(values) > window)
+            assert average.current() == pytest.approx(np.mean(values[-window:]))
+            if len(values) > 1:
+                assert average.previous() == pytest.approx(np.mean(values[-window - 1:-1]))
+    with pytest.raises(AssertionError):
+        MovingAverage(0)
+
+
+def old_entropy_decisions(sessions, window_size, tolerance):
+    """should_reconfigure of the entropy criterion as it was before the online statistics."""
+    entropies = [0]
+    counter = Counter()
+    decisions = []
+    for session in sessions:
+        counter.update(entry["technique"] for entry in session["full_session"] if entry.get("technique"))
+        total = sum(counter.values())
+        entropies.append(-sum(n / total * math.log(n / total) for n in counter.values()))
+        if len(entropies) <= window_size:
+            # the old criterion failed here, one moving average is not enough to compare
+            decisions.append(False)
+            continue
+        smoothed = np.convolve(entropies, np.ones(window_size), "valid") / window_size
+        decisions.append(bool(abs(smoothed[-1] - smoothed[-2]) < tolerance))
+    return decisions
+
+
+def random_sessions(rng, num_sessions):
+    techniques = ["System Information Discovery", "Brute Force", "Account Discovery", "Process Discovery", ""]
+    return [{
+        "length": rng.randint(0, 20),
+        "full_session": [{"technique": rng.choice(techniques[:rng.randint(1, 5)])} for _ in range(rng.randint(0, 8))],
+    } for _ in range(num_sessions)]
+
+
+def test_entropy_criterion_matches_the_old_criterion():
+    rng = random.Random(2)
+    for _ in range(200):
+        window_size = rng.randint(1, 5)
+        tolerance = rng.choice([1e-2, 0.05, 0.2])
+        sessions = random_sessions(rng, 30)
+        criterion = EntropyReconfigCriterion("techniques", tolerance, window_size)
+
+        decisions = []
+        for session in sessions:
+            criterion.update(session)
+            decisions.append(criterion.should_reconfigure())
+
+        assert decisions == old_entropy_decisions(sessions, window_size, tolerance)
+
+
+def test_entropy_of_session_lengths():
+    criterion = EntropyReconfigCriterion("session_length", tolerance=1e-2, window_size=1)
+    lengths = [3, 5, 3, 8]
+    for length in lengths:
+        criterion.update({"length": length})
+    assert criterion.entropy.entropy() == pytest.approx(brute_force_entropy(lengths))
+
+    # the same length every time stops changing the entropy
+    stable = EntropyReconfigCriterion("session_length", window_size=2)
+    stable.update({"length": 4})
+    assert not stable.should_reconfigure()
+    stable.update({"length": 4})
+    assert stable.should_reconfigure()
+
+
+def test_entropy_criterion_reset():
+    criterion = EntropyReconfigCriterion("techniques", window_size=1)
+    criterion.update({"full_session": [{"technique": "Brute Force"}, {"technique": "Account Discovery"}]})
+    criterion.reset()
+    assert criterion.entropy.total == 0
+    assert not criterion.should_reconfigure()
+    with pytest.raises(AssertionError):
+        EntropyReconfigCriterion("commands")
+
+
+def test_welford_matches_the_sample_statistics():
+    rng = random.Random(3)
+    stats = WelfordStats()
+    values = []
+    assert stats.variance() == 0.0
+    for _ in range(500):
+        value = rng.gauss(1e6, 3)
+        stats.add(value)
+        values.append(value)
+        if len(values) > 1:
+            assert stats.mean == pytest.approx(statistics.fmean(values))
+            assert stats.variance() == pytest.approx(statistics.variance(values), rel=1e-6)
+            assert stats.std() == pytest.approx(statistics.stdev(values), rel=1e-6)
+
+
+@pytest.mark.parametrize("window", [1, 2, 3, 4, 7])
+def test_windowed_median_matches_brute_force(window):
+    rng = random.Random(window)
+    median = WindowedMedian(window)
+    values = []
+    assert median.median() == 0.0
+    for _ in range(2000):
+        # few distinct values, so equal values leave the window often
+        value = rng.choice([rng.randint(0, 5), rng.uniform(0, 5)])
+        median.add(value)
+        values.append(value)
+        assert len(median) == min(window, len(values))
+        assert median.median() == statistics.median(values[-window:])
+        assert len(median.low) + len(median.high) <= 2 * window + 2
+
+
+def brute_force_page_hinkley(values, delta, threshold, warmup):
+    warmup = max(2, warmup)
+    cumulative = minimum = 0.0
+    detections = []
+    for i, value in enumerate(values):
+        if i >= warmup:
+            before = values[:i]
+            std = statistics.stdev(before) or abs(statistics.fmean(before)) or 1.0
+            cumulative += (statistics.fmean(before) - value) / std - delta
+            minimum = min(minimum, cumulative)
+        detections.append(cumulative - minimum > threshold)
+    return detections
+
+
+def brute_force_cusum(values, delta, threshold, warmup):
+    warmup = max(2, warmup)
+    baseline = values[:warmup]
+    total = 0.0
+    detections = []
+    for i, value in enumerate(values):
+        if i >= warmup:
+            std = statistics.stdev(baseline) or abs(statistics.fmean(baseline)) or 1.0
+            total = max(0.0, total + (statistics.fmean(baseline) - value) / std - delta)
+        detections.append(total > threshold)
+    return detections
+
+
+@pytest.mark.parametrize("detector, brute_force", [(PageHinkley, brute_force_page_hinkley), (Cusum, brute_force_cusum)])
+def test_change_point_detectors_match_brute_force(detector, brute_force):
+    rng = random.Random(4)
+    for _ in range(100):
+        delta = rng.choice([0.0, 0.5, 1.0])
+        threshold = rng.choice([1.0, 5.0, 10.0])
+        warmup = rng.randint(0, 10)
+        change = rng.randint(0, 60)
+        values = [rng.randint(8, 12) if i < change else rng.randint(0, 4) for i in range(60)]
+        if rng.random() < 0.2:
+            values = [7] * 60
+
+        online = detector(delta, threshold, warmup)
+        assert [online.add(value) for value in values] == brute_force(values, delta, threshold, warmup)
+
+
+def test_change_point_detectors_find_a_drop():
+    for detector in (PageHinkley(0.5, 10.0, 10), Cusum(0.5, 10.0, 10)):
+        rng = random.Random(5)
+        detected_at = None
+        for i in range(200):
+            length = rng.gauss(20, 2) if i < 50 else rng.gauss(5, 2)
+            if detector.add(length) and detected_at is None:
+                detected_at = i
+        assert 50 <= detected_at < 60
+
+        stable = type(detector)(0.5, 10.0, 10)
+        assert not any(stable.add(random.Random(i).gauss(20, 2)) for i in range(200))
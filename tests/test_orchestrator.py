@@ -0,0 +1,217 @@
+import importlib
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+import config
+from Utils.jsun import iter_jsonl
+from Red.reconfiguration import BasicReconfigCriterion, BanditReconfigCriterion, \
+    SessionLengthReconfigCriterion, EntropyReconfigCriterion
+
+
+@pytest.fixture
+def orchestrator_module(monkeypatch):
+    """
+    Red.orchestrator with a fake run_single_attack, so no LLM, Kali or MITRE data is needed.
+    Every attack sleeps for the time given in delays (default 10 ms) and returns its index.
+    The partial sessions in partials are handed on before it sleeps, those in late_partials after.
+    """
+    calls = []
+    delays = {}
+    partials = {}
+    late_partials = {}
+    lock = threading.Lock()
+
+    def run_single_attack(messages, max_session_length, logs_path, attack_index, config_counter,
+            endpoint, stop_event, tracer, config_id=None, on_partial_session=None):
+        with lock:
+            calls.append((attack_index, config_counter, endpoint))
+        logs_path.parent.mkdir(parents=True, exist_ok=True)
+        logs_path.write_text("{}\n")
+        for session in partials.get(attack_index, []):
+            on_partial_session(session)
+        time.sleep(delays.get(attack_index, 0.01))
+        for session in late_partials.get(attack_index, []):
+            on_partial_session(session)
+        return attack_index, {"cost_usd": 0.5, "prompt_tokens": 10}
+
+    sangria = types.ModuleType("Red.sangria")
+    sangria.run_single_attack = run_single_attack
+    sangria_config = types.ModuleType("Red.sangria_config")
+    sangria_config.get_messages = lambda i=0: []
+    monkeypatch.setitem(sys.modules, "Red.sangria", sangria)
+    monkeypatch.setitem(sys.modules, "Red.sangria_config", sangria_config)
+    monkeypatch.delitem(sys.modules, "Red.orchestrator", raising=False)
+    module = importlib.import_module("Red.orchestrator")
+    module.calls = calls
+    module.delays = delays
+    module.partials = partials
+    module.late_partials = late_partials
+    yield module
+    sys.modules.pop("Red.orchestrator", None)
+
+
+def test_results_are_handed_back_in_attack_order(orchestrator_module, tmp_path):
+    orchestrator = orchestrator_module.AttackOrchestrator(6, 1, ["a", "b", "c"], 3)
+    # later attacks finish first
+    orchestrator_module.delays.update({0: 0.15, 1: 0.1, 2: 0.05})
+    orchestrator.schedule(0, tmp_path, 1)
+
+    results = []
+    for i in range(6):
+        extractor, tokens_used, timings = orchestrator.result(i)
+        results.append(extractor)
+        orchestrator.fill()
+    orchestrator.shutdown()
+
+    assert results == list(range(6))
+    assert sorted(call[0] for call in orchestrator_module.calls) == list(range(6))
+
+
+def test_runs_at_most_one_attack_per_endpoint(orchestrator_module, tmp_path):
+    orchestrator = orchestrator_module.AttackOrchestrator(4, 1, ["a", "b"], 8)
+    assert orchestrator.num_workers == 2
+    orchestrator.schedule(0, tmp_path, 1)
+    assert len(orchestrator.in_flight) == 2
+    for i in range(4):
+        orchestrator.result(i)
+        orchestrator.fill()
+    orchestrator.shutdown()
+
+
+def test_fill_stops_at_the_limit(orchestrator_module, tmp_path):
+    orchestrator = orchestrator_module.AttackOrchestrator(10, 1, ["a", "b", "c", "d"], 4)
+    orchestrator.schedule(0, tmp_path, 1, limit=2)
+    assert sorted(orchestrator.in_flight) == [0, 1]
+
+    orchestrator.result(0)
+    orchestrator.fill(3)
+    assert sorted(orchestrator.in_flight) == [1, 2]
+    orchestrator.shutdown()
+
+
+def test_discard_in_flight_returns_spend_and_removes_logs(orchestrator_module, tmp_path):
+    orchestrator = orchestrator_module.AttackOrchestrator(5, 1, ["a", "b", "c"], 3)
+    orchestrator.schedule(0, tmp_path, 1)
+    orchestrator.result(0)
+    # attacks 1 and 2 already started against configuration 1
+    time.sleep(0.05)
+
+    discarded = orchestrator.discard_in_flight()
+
+    assert [record["attack"] for record in discarded] == [1, 2]
+    assert all(record["configuration"] == 1 and record["cost_usd"] == 0.5 for record in discarded)
+    assert not (tmp_path / "attack_2.jsonl").exists()
+    assert not (tmp_path / "attack_3.jsonl").exists()
+    assert orchestrator.in_flight == {}
+
+    # the discarded attacks run again against the new configuration
+    orchestrator.schedule(1, tmp_path, 2)
+    assert orchestrator.result(1)[0] == 1
+    assert (1, 2) in [(call[0], call[1]) for call in orchestrator_module.calls]
+    orchestrator.shutdown()
+
+
+def partial_session(*techniques):
+    return {"length": len(techniques), "full_session": [{"command": "id", "technique": technique} for technique in techniques]}
+
+
+def test_partial_sessions_are_handed_on_and_logged(orchestrator_module, tmp_path):
+    received = []
+    orchestrator = orchestrator_module.AttackOrchestrator(5, 1, ["a", "b"], 2,
+        lambda attack_index, session: received.append((attack_index, session["length"])),
+        tmp_path / "partial_sessions.jsonl")
+    orchestrator_module.partials[0] = [partial_session("Account Discovery"),
+        partial_session("Account Discovery", ""), partial_session("Account Discovery", "", "Brute Force")]
+    orchestrator_module.delays[0] = 0.1
+    # attack 1 grows after it was discarded
+    orchestrator_module.late_partials[1] = [partial_session("Brute Force")]
+    orchestrator_module.delays[1] = 0.2
+    orchestrator.schedule(0, tmp_path, 1, limit=2)
+
+    time.sleep(0.05)
+    assert orchestrator.partial_sessions[0]["length"] == 3
+    orchestrator.result(0)
+    assert 0 not in orchestrator.partial_sessions
+    orchestrator.discard_in_flight()
+    orchestrator.shutdown()
+
+    assert received == [(0, 1), (0, 2), (0, 3)]
+    lines = list(iter_jsonl(tmp_path / "partial_sessions.jsonl"))
+    assert [(line["attack"], line["configuration"], line["length"], line["techniques"]) for line in lines] == \
+        [(0, 1, 1, 1), (0, 1, 2, 1), (0, 1, 3, 2)]
+    assert orchestrator.partial_sessions == {}
+
+
+def test_no_attacks_are_discarded_when_the_limit_follows_the_criterion(orchestrator_module, tmp_path):
+    criterion = BasicReconfigCriterion(3, True)
+    orchestrator = orchestrator_module.AttackOrchestrator(10, 1, ["a", "b", "c", "d"], 4)
+    orchestrator.schedule(0, tmp_path, 1, criterion.sessions_until_reconfigure())
+    config_counter = 1
+
+    discarded = []
+    for i in range(10):
+        orchestrator.result(i)
+        criterion.update({})
+        limit = i + 1 + criterion.sessions_until_reconfigure()
+        if criterion.should_reconfigure():
+            discarded += orchestrator.discard_in_flight()
+            criterion.reset()
+            config_counter += 1
+            orchestrator.schedule(i + 1, tmp_path, config_counter, i + 1 + criterion.sessions_until_reconfigure())
+        else:
+            orchestrator.fill(limit)
+    discarded += orchestrator.shutdown()
+
+    assert discarded == []
+    attacks = [call[0] for call in orchestrator_module.calls]
+    assert sorted(attacks) == list(range(10))
+    assert [call[1] for call in sorted(orchestrator_module.calls)] == [1, 1, 1, 2, 2, 2, 3, 3, 3, 4]
+
+
+def test_sessions_until_reconfigure():
+    basic = BasicReconfigCriterion(3, True)
+    assert basic.sessions_until_reconfigure() == 3
+    basic.update({})
+    assert basic.sessions_until_reconfigure() == 2
+    basic.update({})
+    basic.update({})
+    assert basic.should_reconfigure()
+    # without a reset it reconfigures after every session
+    assert basic.sessions_until_reconfigure() == 1
+
+    session_length = SessionLengthReconfigCriterion("median", window_size=4)
+    assert session_length.sessions_until_reconfigure() == 5
+
+    bandit = BanditReconfigCriterion(sessions_per_pull=3)
+    bandit.update({"full_session": []})
+    assert bandit.sessions_until_reconfigure() == 2
+
+    # criteria that can reconfigure after any session cannot tell
+    assert EntropyReconfigCriterion("techniques").sessions_until_reconfigure() is None
+
+
+def test_get_kali_endpoints_warns_about_missing_endpoints(orchestrator_module, monkeypatch, capsys):
+    monkeypatch.setattr(config, "simulate_command_line", False)
+    monkeypatch.setattr(config, "num_parallel_attacks", 3)
+    monkeypatch.setattr(config, "kali_endpoints", [])
+    monkeypatch.setenv("RUNID", "11")
+
+    endpoints = orchestrator_module.get_kali_endpoints()
+
+    assert [endpoint.port for endpoint in endpoints] == ["3011"]
+    assert "3 parallel attacks requested but only 1 Kali endpoint" in capsys.readouterr().out
+
+
+def test_get_kali_endpoints_from_config(orchestrator_module, monkeypatch, capsys):
+    monkeypatch.setattr(config, "simulate_command_line", False)
+    monkeypatch.setattr(config, "num_parallel_attacks", 2)
+    monkeypatch.setattr(config, "kali_endpoints", [(3011, "10.0.0.2"), (3012, "10.0.0.3")])
+
+    endpoints = orchestrator_module.get_kali_endpoints()
+
+    assert [(endpoint.port, endpoint.ip) for endpoint in endpoints] == [("3011", "10.0.0.2"), ("3012", "10.0.0.3")]
+    assert "Warning" not in capsys.readouterr().out
@@ -0,0 +1,129 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from Red.model import LLMModel
+from Utils.API_call_price import calculate_experiment_price
+from Utils.jsun import JsonlWriter, save_json_to_file
+from Utils.pricing import CostTracker, calculate_price, get_price, usage_tokens
+
+
+def usage(prompt_tokens, completion_tokens, cached_tokens=None):
+    details = SimpleNamespace(cached_tokens=cached_tokens) if cached_tokens is not None else None
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, prompt_tokens_details=details)
+
+
+def test_calculate_price_per_million_tokens():
+    assert calculate_price(LLMModel.GPT_4O_MINI, 1_000_000, 0, 0) == pytest.approx(0.15)
+    assert calculate_price("gpt-4o-mini", 0, 1_000_000, 1_000_000) == pytest.approx(0.075 + 0.60)
+    assert calculate_price(LLMModel.OLLAMA_LLAMA32_3b, 10**6, 10**6, 10**6) == 0.0
+    # unknown models cost nothing
+    assert get_price("gpt-99") is None
+    assert calculate_price("gpt-99", 10**6, 0, 0) == 0.0
+
+
+def test_usage_tokens_separates_cached_tokens():
+    assert usage_tokens(usage(1000, 50, 768)) == {"prompt_tokens": 232, "cached_tokens": 768, "completion_tokens": 50}
+    assert usage_tokens(usage(1000, 50)) == {"prompt_tokens": 1000, "cached_tokens": 0, "completion_tokens": 50}
+    assert usage_tokens(usage(1000, 50, None))["cached_tokens"] == 0
+
+
+def test_cost_tracker_budget():
+    tracker = CostTracker(budget_usd=1.0)
+    assert not tracker.exceeded()
+
+    cost = tracker.add_usage(LLMModel.O4_MINI, usage(500_000, 0))
+    assert cost == pytest.approx(0.55)
+    assert not tracker.exceeded()
+    tracker.add_usage(LLMModel.O4_MINI, usage(500_000, 0))
+    assert tracker.exceeded()
+    assert tracker.add_usage(LLMModel.O4_MINI, None) == 0.0
+
+    state = tracker.to_dict()
+    assert state["models"]["o4-mini"]["prompt_tokens"] == 1_000_000
+    assert state["spent_usd"] == pytest.approx(1.1)
+
+    # without a budget the spend is only tracked
+    unlimited = CostTracker()
+    unlimited.add_usage(LLMModel.GPT_4, usage(10**7, 10**7))
+    assert not unlimited.exceeded()
+
+    with pytest.raises(AssertionError):
+        CostTracker(budget_usd=0)
+
+
+def test_cost_tracker_restore():
+    tracker = CostTracker(budget_usd=2.0)
+    tracker.add_usage(LLMModel.GPT_4_1, usage(100_000, 10_000))
+    resumed = CostTracker(budget_usd=2.0)
+    resumed.restore(tracker.to_dict())
+    assert resumed.to_dict() == tracker.to_dict()
+
+    resumed.add_usage(LLMModel.GPT_4_1, usage(100_000, 10_000))
+    # the saved state is not shared with the resumed tracker
+    assert tracker.to_dict()["models"]["gpt-4.1"]["prompt_tokens"] == 100_000
+
+
+def test_unpriced_models_are_reported_once(capsys):
+    tracker = CostTracker()
+    tracker.add_usage("my-finetune", usage(10, 10))
+    tracker.add_usage("my-finetune", usage(10, 10))
+    assert capsys.readouterr().out.count("No price known for model my-finetune") == 1
+    assert tracker.to_dict()["models"]["my-finetune"]["prompt_tokens"] == 20
+
+
+def test_cost_tracker_is_thread_safe():
+    tracker = CostTracker()
+
+    def add():
+        for _ in range(1000):
+            tracker.add_usage(LLMModel.GPT_4O_MINI, usage(1000, 0))
+
+    threads = [threading.Thread(target=add) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert tracker.to_dict()["models"]["gpt-4o-mini"]["prompt_tokens"] == 8_000_000
+    assert tracker.spent_usd == pytest.approx(8 * 0.15)
+
+
+def test_cost_tracker_categories():
+    tracker = CostTracker()
+    tracker.add_usage(LLMModel.GPT_4O_MINI, usage(1_000_000, 0))
+    with tracker.category("config_prefetch"):
+        tracker.add_usage(LLMModel.GPT_4O_MINI, usage(1_000_000, 0))
+        # calls of other threads are not in the category
+        thread = threading.Thread(target=tracker.add_usage, args=(LLMModel.GPT_4O_MINI, usage(1_000_000, 0)))
+        thread.start()
+        thread.join()
+        with tracker.category("labeling"):
+            tracker.add_usage(LLMModel.GPT_4O_MINI, usage(2_000_000, 0))
+        tracker.add_usage(LLMModel.GPT_4O_MINI, usage(1_000_000, 0))
+
+    assert tracker.spent_usd == pytest.approx(6 * 0.15)
+    assert tracker.category_spent("config_prefetch") == pytest.approx(2 * 0.15)
+    assert tracker.category_spent("labeling") == pytest.approx(2 * 0.15)
+    assert tracker.category_spent("attacks") == 0.0
+
+    resumed = CostTracker()
+    resumed.restore(tracker.to_dict())
+    assert resumed.to_dict() == tracker.to_dict()
+    # checkpoints saved before the categories
+    state = tracker.to_dict()
+    del state["categories"]
+    resumed.restore(state)
+    assert resumed.categories == {}
+
+
+def test_experiment_price_prefers_logged_costs(tmp_path):
+    save_json_to_file({"llm_model_sangria": "gpt-4o-mini"}, tmp_path / "metadata.json", False)
+    save_json_to_file([{"prompt_tokens": 1_000_000, "cached_tokens": 0, "completion_tokens": 0}],
+        tmp_path / "hp_config_1" / "tokens_used.json", False)
+    with JsonlWriter(tmp_path / "hp_config_2" / "tokens_used.jsonl") as writer:
+        writer.write({"prompt_tokens": 1_000_000, "cached_tokens": 0, "completion_tokens": 0, "cost_usd": 2.0})
+    (tmp_path / "hp_config_3").mkdir()
+
+    assert calculate_experiment_price(tmp_path) == pytest.approx(2.15)
+    assert calculate_experiment_price(tmp_path, LLMModel.GPT_4_1) == pytest.approx(4.0)
@@ -0,0 +1,124 @@
+import importlib
+import json
+import sys
+import types
+from types import SimpleNamespace
+
+import pytest
+
+import config
+import Red
+from Red.reconfiguration import BasicReconfigCriterion
+
+ENDPOINT = SimpleNamespace(port=3011, ip="172.20.0.3")
+
+
+def llm_response(command=None, content=None):
+    tool_calls = None
+    if command is not None:
+        arguments = json.dumps({"input": command, "tactic_used": "TA0007:Discovery", "technique_used": "T1082:System Information Discovery"})
+        tool_calls = [SimpleNamespace(id="call_1", function=SimpleNamespace(name="terminal_input", arguments=arguments))]
+    dump = {"role": "assistant", "content": content, "tool_calls": tool_calls and [{
+        "id": "call_1", "type": "function", "function": {"name": "terminal_input", "arguments": tool_calls[0].function.arguments}}]}
+    message = SimpleNamespace(content=content, tool_calls=tool_calls, model_dump=lambda: dict(dump))
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, prompt_tokens_details=SimpleNamespace(cached_tokens=0))
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class FakeCursor:
+    def __init__(self, ip):
+        self.ip = ip
+
+    def get_new_logs(self):
+        return []
+
+
+@pytest.fixture
+def sangria(monkeypatch):
+    """
+    Red.sangria with fake tools, so no MITRE data, Kali or LLM is needed. The LLM answers
+    with the responses queued in sangria.responses, an exception in the queue is raised.
+    """
+    sangria_config = types.ModuleType("Red.sangria_config")
+    sangria_config.tools = []
+    sangria_config.get_messages = lambda i=0: []
+    red_tools = types.ModuleType("Red.tools")
+    red_tools.handle_tool_call = lambda name, args, ssh: ({"content": f"ran {args['input']}"}, None)
+    monkeypatch.setitem(sys.modules, "Red.sangria_config", sangria_config)
+    monkeypatch.setitem(sys.modules, "Red.tools", red_tools)
+    monkeypatch.delitem(sys.modules, "Red.sangria", raising=False)
+    # the submodules are also set on the package, they are restored after the test
+    monkeypatch.setattr(Red, "sangria_config", sangria_config, raising=False)
+    monkeypatch.setattr(Red, "tools", red_tools, raising=False)
+    monkeypatch.setattr(Red, "sangria", None, raising=False)
+    module = importlib.import_module("Red.sangria")
+    monkeypatch.setitem(sys.modules, "Red.sangria", module)
+
+    module.responses = []
+    module.released = []
+
+    def openai_call(model, messages, tools, tool_choice):
+        response = module.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(module, "openai_call", openai_call)
+    monkeypatch.setattr(module, "start_ssh", lambda port: f"shell on {port}")
+    monkeypatch.setattr(module, "release_ssh", lambda ssh, port, discard=False: module.released.append((ssh, port, discard)))
+    monkeypatch.setattr(module.log_extractor, "HoneypotLogCursor", FakeCursor)
+    monkeypatch.setattr(config, "simulate_command_line", False)
+    monkeypatch.setattr(config, "followup_after_tool_call", False)
+    monkeypatch.setattr(config, "budget_end_sessions", False)
+    return module
+
+
+def test_session_is_released_after_the_attack(sangria, tmp_path):
+    sangria.responses = [llm_response("id"), llm_response(content="done")]
+
+    extractor, tokens_used = sangria.run_single_attack([], 2, tmp_path / "attack_1.jsonl", endpoint=ENDPOINT)
+
+    assert extractor.omni_session_log()["length"] == 1
+    assert sangria.released == [("shell on 3011", 3011, False)]
+
+
+def test_criterion_sees_the_commands_before_the_session_ends(sangria, tmp_path, monkeypatch):
+    class RecordingCriterion(BasicReconfigCriterion):
+        def reset(self):
+            super().reset()
+            self.partial_lengths = []
+
+        def update_partial(self, session):
+            self.partial_lengths.append(session["length"])
+
+    class CursorWithLogs(FakeCursor):
+        def get_new_logs(self):
+            return [{"event": {"Protocol": "SSH", "Command": "previous command"}}]
+
+    criterion = RecordingCriterion(interval=5)
+    monkeypatch.setattr(sangria.log_extractor, "HoneypotLogCursor", CursorWithLogs)
+    seen_during_attack = []
+
+    def openai_call(model, messages, tools, tool_choice):
+        seen_during_attack.append(list(criterion.partial_lengths))
+        return sangria.responses.pop(0)
+
+    monkeypatch.setattr(sangria, "openai_call", openai_call)
+    sangria.responses = [llm_response("id"), llm_response("uname -a"), llm_response("ls"), llm_response(content="done")]
+
+    extractor, _ = sangria.run_single_attack([], 4, tmp_path / "attack_1.jsonl", endpoint=ENDPOINT,
+        on_partial_session=criterion.update_partial)
+
+    # id was handed on with its honeypot logs, before the LLM was asked after uname -a
+    assert seen_during_attack == [[], [], [1], [1, 2]]
+    assert extractor.session_log()["length"] == 3
+
+
+@pytest.mark.parametrize("error", [RuntimeError("LLM budget exceeded"), TimeoutError("no prompt")])
+def test_session_is_discarded_when_the_attack_fails(sangria, tmp_path, error):
+    sangria.responses = [llm_response("id"), error]
+
+    with pytest.raises(type(error)):
+        sangria.run_single_attack([], 5, tmp_path / "attack_1.jsonl", endpoint=ENDPOINT)
+
+    assert sangria.released == [("shell on 3011", 3011, True)]
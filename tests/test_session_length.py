@@ -0,0 +1,83 @@
+import random
+import statistics
+
+import pytest
+
+from Red.reconfiguration import ChangePointReconfigCriterion, SessionLengthReconfigCriterion
+
+
+def feed(criterion, lengths):
+    decisions = []
+    for length in lengths:
+        criterion.update({"length": length})
+        decisions.append(criterion.should_reconfigure())
+    return decisions
+
+
+def brute_force_decisions(lengths, statistic, window_size, threshold):
+    decisions = []
+    for i in range(1, len(lengths) + 1):
+        seen = lengths[:i]
+        if len(seen) <= window_size:
+            decisions.append(False)
+            continue
+        window = seen[-window_size:]
+        windowed = statistics.median(window) if statistic == "median" else statistics.fmean(window)
+        decisions.append(windowed < statistics.fmean(seen) - threshold * statistics.stdev(seen))
+    return decisions
+
+
+@pytest.mark.parametrize("statistic", ["mean", "median"])
+def test_session_length_criterion_matches_brute_force(statistic):
+    rng = random.Random(0)
+    for _ in range(100):
+        window_size = rng.randint(1, 6)
+        threshold = rng.choice([0.5, 1.0, 2.0])
+        change = rng.randint(0, 40)
+        lengths = [rng.randint(10, 20) if i < change else rng.randint(0, 5) for i in range(40)]
+
+        decisions = feed(SessionLengthReconfigCriterion(statistic, window_size, threshold), lengths)
+
+        expected = brute_force_decisions(lengths, statistic, window_size, threshold)
+        assert decisions == expected
+
+
+def test_session_length_criterion_waits_for_sessions_before_the_window():
+    criterion = SessionLengthReconfigCriterion("median", window_size=3, threshold=1.0)
+    assert feed(criterion, [10, 10, 10]) == [False, False, False]
+    assert criterion.sessions_until_reconfigure() == 1
+    assert feed(criterion, [10, 0, 0]) == [False, False, True]
+
+    criterion.reset()
+    assert criterion.stats.count == 0
+    assert criterion.sessions_until_reconfigure() == 4
+
+
+def test_session_length_criterion_ignores_stable_sessions():
+    criterion = SessionLengthReconfigCriterion("mean", window_size=5, threshold=2.0)
+    rng = random.Random(1)
+    assert not any(feed(criterion, [rng.randint(8, 12) for _ in range(200)]))
+    with pytest.raises(AssertionError):
+        SessionLengthReconfigCriterion("mode")
+    with pytest.raises(AssertionError):
+        SessionLengthReconfigCriterion("mean", window_size=0)
+
+
+@pytest.mark.parametrize("method", ["page_hinkley", "cusum"])
+def test_change_point_criterion_detects_less_engagement(method):
+    rng = random.Random(2)
+    criterion = ChangePointReconfigCriterion(method, delta=0.5, threshold=10.0, warmup=10)
+    decisions = feed(criterion, [rng.gauss(20, 2) for _ in range(40)] + [rng.gauss(5, 2) for _ in range(20)])
+    assert not any(decisions[:40])
+    assert any(decisions[40:50])
+
+    criterion.reset()
+    assert not criterion.should_reconfigure()
+    assert criterion.sessions_until_reconfigure() is None
+
+
+def test_change_point_criterion_validates_its_settings():
+    with pytest.raises(AssertionError):
+        ChangePointReconfigCriterion("adwin")
+    with pytest.raises(AssertionError):
+        ChangePointReconfigCriterion(threshold=0)
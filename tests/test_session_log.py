@@ -0,0 +1,114 @@
+import json
+
+from Red.extraction import extract_sessions
+from Red.session_log import SessionLog, serialize_message
+from Utils.jsun import iter_jsonl
+
+
+def assistant(command=None, content=None, tool="terminal_input"):
+    tool_calls = None
+    if command is not None:
+        arguments = {"input": command, "tactic_used": "TA0007:Discovery", "technique_used": "T1082:System Information Discovery"}
+        tool_calls = [{"id": "call_1", "type": "function", "function": {"name": tool, "arguments": json.dumps(arguments)}}]
+    return {"role": "assistant", "content": content, "tool_calls": tool_calls}
+
+
+def tool_response(name="terminal_input", content="output"):
+    return {"role": "tool", "name": name, "tool_call_id": "call_1", "content": content}
+
+
+def hp_event(command):
+    return {"event": {"Protocol": "SSH", "Command": command}}
+
+
+def run_session(path, followups=True):
+    """Write a session the way run_single_attack does, honeypot logs arrive before the next tool call."""
+    session_log = SessionLog(path)
+    session_log.append({"role": "system", "content": "attack"})
+    for command, follow_up in [("id", "I am root."), ("ls /root", "Nothing here."), ("cat /etc/passwd", "Users found.")]:
+        session_log.append(assistant(command, None if followups else f"before {command}"))
+        session_log.add_honeypot_logs([hp_event(f"logs of the previous command, before {command}")])
+        session_log.append(tool_response(), awaiting_honeypot_logs=True)
+        if followups:
+            session_log.append(assistant(content=follow_up))
+    session_log.add_honeypot_logs([hp_event("cat /etc/passwd")])
+    return session_log.close()
+
+
+def test_honeypot_logs_are_added_to_the_previous_command(tmp_path):
+    path = tmp_path / "attack_1.jsonl"
+    run_session(path)
+
+    entries = list(iter_jsonl(path))
+    tool_entries = [entry for entry in entries if entry["role"] == "tool"]
+    assert tool_entries[0]["honeypot_logs"] == [hp_event("logs of the previous command, before ls /root")]
+    assert tool_entries[2]["honeypot_logs"] == [hp_event("cat /etc/passwd")]
+    # messages are written in order, each once
+    assert [entry["role"] for entry in entries] == ["system"] + ["assistant", "tool", "assistant"] * 3
+
+
+def test_incremental_extraction_matches_the_written_log(tmp_path):
+    for followups in (True, False):
+        path = tmp_path / f"attack_{followups}.jsonl"
+        extractor = run_session(path, followups)
+
+        session, omni = extract_sessions(iter_jsonl(path))
+        assert extractor.session_log() == session
+        assert extractor.omni_session_log() == omni
+        assert omni["length"] == 3
+
+
+def test_partial_sessions_are_handed_on_while_the_session_runs(tmp_path):
+    partial_sessions = []
+    session_log = SessionLog(tmp_path / "attack_1.jsonl", partial_sessions.append)
+    session_log.append({"role": "system", "content": "attack"})
+    previous = None
+    for command in ["id", "ls /root", "cat /etc/passwd"]:
+        session_log.append(assistant(command))
+        session_log.add_honeypot_logs([hp_event(previous)] if previous else [])
+        session_log.append(tool_response(), awaiting_honeypot_logs=True)
+        previous = command
+    # the commands before the last one were extracted before the session is closed
+    assert [session["length"] for session in partial_sessions] == [1, 2]
+    assert partial_sessions[-1]["session"] == "id ; ls /root ;"
+
+    extractor = session_log.close()
+    assert len(partial_sessions) == 2
+    assert extractor.session_log()["length"] == 2
+
+
+def test_logs_without_a_running_command_are_dropped(tmp_path):
+    path = tmp_path / "attack_1.jsonl"
+    session_log = SessionLog(path)
+    session_log.add_honeypot_logs([hp_event("ssh login")])
+    session_log.append(assistant("nmap 10.0.0.1"))
+    session_log.append(tool_response())
+    session_log.add_honeypot_logs([hp_event("still no command")])
+    session_log.close()
+
+    entries = list(iter_jsonl(path))
+    assert all("honeypot_logs" not in entry for entry in entries)
+
+
+def test_log_is_truncated_on_a_new_run(tmp_path):
+    path = tmp_path / "attack_1.jsonl"
+    path.write_text('{"role": "system", "content": "from an interrupted run"}\n')
+    session_log = SessionLog(path)
+    session_log.append({"role": "system", "content": "attack"})
+    session_log.close()
+    assert [entry["content"] for entry in iter_jsonl(path)] == ["attack"]
+
+
+def test_serialize_message_parses_arguments_and_tool_content():
+    message = assistant("id")
+    serialized = serialize_message(message)
+    assert serialized["tool_calls"][0]["function"]["arguments"]["input"] == "id"
+    # the history sent to the LLM keeps its string arguments
+    assert isinstance(message["tool_calls"][0]["function"]["arguments"], str)
+
+    assert serialize_message(tool_response(content='{"a": 1}'))["content"] == {"a": 1}
+    assert serialize_message(tool_response(content="{'success': True}"))["content"] == {"success": True}
+    assert serialize_message(tool_response(content="uid=0(root)"))["content"] == "uid=0(root)"
+    broken = assistant("id")
+    broken["tool_calls"][0]["function"]["arguments"] = "{not json"
+    assert serialize_message(broken)["tool_calls"][0]["function"]["arguments"] == "{not json"
@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import pytest
+
+from Red import simulated_shell
+from Red.simulated_shell import CommandCache, SimulatedShell, config_key, is_recon_command, normalize_command
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Fake chat_completion answering every command with a numbered output."""
+    requests = []
+
+    def chat_completion(model, messages):
+        requests.append([dict(message) for message in messages])
+        content = f"output {len(requests)}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    monkeypatch.setattr(simulated_shell, "chat_completion", chat_completion)
+    return requests
+
+
+@pytest.mark.parametrize("command", [
+    "uname -a", "uname -r -m", "id", "id -u", "whoami", "hostname", "hostname -I", "lscpu", "ifconfig", "ifconfig -a",
+    "nproc --all", "cat /etc/passwd", "cat /etc/os-release /proc/version", "ip a", "ip route",
+])
+def test_recon_commands(command):
+    assert is_recon_command(command)
+
+
+@pytest.mark.parametrize("command", [
+    "", "ls", "cat /etc/shadow", "cat /etc/passwd /tmp/x", "id; rm -rf /", "uname -a | tee /tmp/x",
+    "echo $(id)", "whoami > /tmp/me", "ip link set eth0 down", "ip a add 10.0.0.2 dev eth0", "cat",
+    # recon programs given anything but a read-only flag may change the machine
+    "hostname attacker", "hostname -F /tmp/name", "ifconfig eth0 down", "ifconfig eth0 172.17.0.5",
+    "ifconfig eth0 hw ether 00:11:22:33:44:55", "uname --help -a", "id root", "groups root",
+])
+def test_commands_with_side_effects_or_state_are_not_recon(command):
+    assert not is_recon_command(command)
+
+
+def test_config_key_is_a_content_hash():
+    config = {"services": [{"port": 22, "banner": "ä"}], "id": "abc"}
+    reordered = {"id": "abc", "services": [{"banner": "ä", "port": 22}]}
+    assert config_key(config) == config_key(reordered)
+    assert config_key(config) != config_key({**config, "id": "abd"})
+    assert len(config_key(config)) == 16
+
+
+def test_sessions_have_their_own_history(llm):
+    first = SimulatedShell("config", CommandCache())
+    second = SimulatedShell("config", CommandCache())
+
+    first.run("cd /tmp")
+    first.run("ls")
+    second.run("ls")
+
+    assert len(llm[1]) == 4
+    # the second session does not see the first one's commands
+    assert [message["content"] for message in llm[2]][1:] == ["Run the command: ls"]
+
+
+def test_recon_output_is_shared_per_configuration(llm):
+    cache = CommandCache()
+    first = SimulatedShell("config_a", cache)
+    assert first.run("uname  -a") == "output 1"
+
+    second = SimulatedShell("config_a", cache)
+    assert second.run("uname -a") == "output 1"
+    # the cached answer is kept in the history, later commands stay consistent with it
+    assert second.messages[-1] == {"role": "assistant", "content": "output 1"}
+    assert len(llm) == 1
+
+    other_config = SimulatedShell("config_b", cache)
+    assert other_config.run("uname -a") == "output 2"
+    assert cache.to_dict() == {"hits": 1, "misses": 2, "cached_commands": 2}
+
+
+def test_stateful_commands_are_never_cached(llm):
+    cache = CommandCache()
+    SimulatedShell("config", cache).run("ls /root")
+    SimulatedShell("config", cache).run("ls /root")
+    assert len(llm) == 2
+    assert cache.to_dict()["cached_commands"] == 0
+
+
+def test_commands_changing_the_machine_stop_the_cache(llm):
+    cache = CommandCache()
+    SimulatedShell("config", cache).run("hostname")
+    assert len(llm) == 1
+
+    attacker = SimulatedShell("config", cache)
+    assert attacker.run("ifconfig eth0 172.17.0.5") == "output 2"
+    # neither the change nor what the session sees after it is served to other sessions
+    assert attacker.run("hostname") == "output 3"
+    assert attacker.run("ifconfig") == "output 4"
+    assert cache.to_dict()["cached_commands"] == 1
+
+    assert SimulatedShell("config", cache).run("ifconfig eth0 172.17.0.5") == "output 5"
+    assert SimulatedShell("config", cache).run("hostname") == "output 1"
+
+
+def test_without_cache_every_command_is_simulated(llm):
+    shell = SimulatedShell()
+    shell.run("id")
+    shell.run("id")
+    assert len(llm) == 2
+
+
+def test_normalize_command():
+    assert normalize_command("  cat   /etc/passwd \n") == "cat /etc/passwd"
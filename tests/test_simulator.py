@@ -0,0 +1,111 @@
+import json
+import random
+
+import pytest
+
+from Red.reconfiguration.simulator import compact_session, expand_grid, load_experiment_sessions, \
+    simulate_policy, sweep
+
+TECHNIQUES = ["System Information Discovery", "Brute Force", "Account Discovery", "Process Discovery",
+    "File and Directory Discovery", "Ingress Tool Transfer"]
+
+GRID = {
+    "no_reconfig": {},
+    "basic": {"interval": [1, 3, 7], "min_num_of_attacks_reconfig": [0, 4]},
+    "mean_increase": {
+        "variable": ["techniques", "max_session_length"],
+        "tolerance": [0.1, 0.5],
+        "window_size": [1, 3],
+        "reset_every_reconfig": [True, False],
+        "min_num_of_attacks_reconfig": [0, 3],
+    },
+    "entropy": {
+        "variable": ["techniques", "session_length"],
+        "tolerance": [1e-3, 0.05],
+        "window_size": [1, 4],
+        "reset_every_reconfig": [True, False],
+        "min_num_of_attacks_reconfig": [0, 3],
+    },
+    "session_length": {
+        "statistic": ["mean", "median"],
+        "window_size": [2, 5],
+        "threshold": [0.5, 1.0],
+        "reset_every_reconfig": [True, False],
+    },
+    "change_point": {
+        "method": ["page_hinkley", "cusum"],
+        "delta": [0.5],
+        "threshold": [2.0, 5.0],
+        "warmup": [3],
+        "reset_every_reconfig": [True, False],
+    },
+}
+
+
+def random_sessions(rng, num_sessions):
+    sessions = []
+    for _ in range(num_sessions):
+        full_session = [{"command": "id", "technique": rng.choice(TECHNIQUES + [""])}
+            for _ in range(rng.randint(0, 6))]
+        sessions.append({"length": rng.randint(0, 25), "full_session": full_session, "tactics": "ignored"})
+    return sessions
+
+
+def test_expand_grid():
+    policies = expand_grid(GRID)
+    assert len(policies) == 1 + 6 + 32 + 32 + 16 + 8
+    assert {"criterion": "no_reconfig"} in policies
+    assert {"criterion": "basic", "interval": 7, "min_num_of_attacks_reconfig": 4} in policies
+    with pytest.raises(ValueError):
+        expand_grid({"sometimes": {}})
+
+
+def test_compact_session_keeps_what_the_criteria_read():
+    session = {"length": 3, "full_session": [{"command": "id", "technique": "Account Discovery"},
+        {"command": "ls", "technique": ""}, {"command": "cd"}], "tactics": "Discovery"}
+    assert compact_session(session) == {"length": 3, "full_session": [{"technique": "Account Discovery"}]}
+    assert compact_session({}) == {"length": 0, "full_session": []}
+
+
+def test_simulate_policy():
+    sessions = [compact_session(session) for session in random_sessions(random.Random(0), 10)]
+    never = simulate_policy({"criterion": "no_reconfig"}, sessions, keep_curve=True)
+    assert never["reconfigurations"] == []
+    assert never["num_configurations"] == 1
+    assert never["discoveries"] == len({entry["technique"] for session in sessions for entry in session["full_session"]})
+    assert never["discovery_curve"][-1] == never["discoveries"]
+
+    every_third = simulate_policy({"criterion": "basic", "interval": 3, "reset_every_reconfig": True}, sessions)
+    assert every_third["reconfigurations"] == [2, 5, 8]
+    assert every_third["discoveries_per_configuration"] == every_third["discoveries"] / 4
+    assert "discovery_curve" not in every_third
+
+    # without a reset the criterion keeps asking, min_num_of_attacks_reconfig spaces the reconfigurations
+    spaced = simulate_policy({"criterion": "basic", "interval": 3, "min_num_of_attacks_reconfig": 2}, sessions)
+    assert spaced["reconfigurations"] == [2, 4, 6, 8]
+
+
+@pytest.mark.parametrize("num_workers", [1, 3])
+def test_sweep_matches_replaying_each_policy(num_workers):
+    rng = random.Random(num_workers)
+    policies = expand_grid(GRID)
+    rng.shuffle(policies)
+    for _ in range(5):
+        sessions = random_sessions(rng, rng.randint(0, 80))
+        compact = [compact_session(session) for session in sessions]
+
+        results = sweep(policies, sessions, keep_curve=True, num_workers=num_workers)
+
+        assert results == [simulate_policy(policy, compact, keep_curve=True) for policy in policies]
+
+
+def test_load_experiment_sessions_in_run_order(tmp_path):
+    for config, lengths in [(2, [2]), (10, [10]), (1, [1, 1])]:
+        config_path = tmp_path / f"hp_config_{config}"
+        config_path.mkdir()
+        (config_path / "sessions.json").write_text(json.dumps([{"length": length} for length in lengths]))
+    # a configuration that was interrupted before its sessions were saved
+    (tmp_path / "hp_config_3").mkdir()
+    (tmp_path / "hp_config_4.json").write_text("{}")
+
+    assert [session["length"] for session in load_experiment_sessions(tmp_path)] == [1, 1, 2, 10]
@@ -0,0 +1,148 @@
+import re
+
+import pexpect
+import pytest
+
+from Red import ssh_pool
+from Red.ssh_pool import HOSTNAME_PATTERN, RESET_COMMAND, SSHPool
+
+
+class FakeSSH:
+    """pexpect.spawn stand-in on a shell of the given host, which changes when the attacker logs in elsewhere."""
+    def __init__(self, hostname="kali"):
+        self.hostname = hostname
+        self.alive = True
+        self.closed = False
+        self.timeout = False
+        self.sent = []
+        self.match = None
+
+    def isalive(self):
+        return self.alive
+
+    def close(self, force=False):
+        self.closed = True
+        self.alive = False
+
+    def sendline(self, line):
+        self.sent.append(line)
+
+    def sendcontrol(self, char):
+        self.sent.append(f"^{char}")
+
+    def expect(self, pattern, timeout=None):
+        if self.timeout:
+            raise pexpect.exceptions.TIMEOUT("no prompt")
+        if pattern == HOSTNAME_PATTERN:
+            self.match = re.search(pattern, f"@@{self.hostname}@@")
+        return 0
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = SSHPool(max_attempts=3, backoff_base=1.0, backoff_max=30.0)
+    pool.sleeps = []
+    pool.connections = []
+    monkeypatch.setattr(ssh_pool.time, "sleep", pool.sleeps.append)
+
+    def connect(port):
+        ssh = FakeSSH()
+        pool.hostnames[id(ssh)] = pool._hostname(ssh)
+        pool.connections.append(ssh)
+        return ssh
+    pool.connect = connect
+    return pool
+
+
+def test_released_sessions_are_reset_and_reused(pool):
+    ssh = pool.acquire(3011)
+    pool.release(3011, ssh)
+
+    assert pool.acquire("3011") is ssh
+    assert "^c" in ssh.sent and RESET_COMMAND in ssh.sent
+    assert len(pool.connections) == 1
+    stats = pool.stats.to_dict()
+    assert stats["acquired"] == 2 and stats["reused"] == 1 and stats["connected"] == 1
+
+
+def test_sessions_are_pooled_per_port(pool):
+    ssh = pool.acquire(3011)
+    pool.release(3011, ssh)
+    assert pool.acquire(3012) is not ssh
+    assert len(pool.connections) == 2
+
+
+def test_sessions_left_on_another_host_are_discarded(pool):
+    ssh = pool.acquire(3011)
+    # the attack ended logged into the honeypot
+    ssh.hostname = "honeypot"
+    pool.release(3011, ssh)
+
+    new_ssh = pool.acquire(3011)
+
+    assert new_ssh is not ssh
+    assert ssh.closed
+    assert pool.stats.to_dict()["discarded"] == 1
+
+
+def test_dead_or_stuck_sessions_are_discarded(pool):
+    dead = pool.acquire(3011)
+    dead.alive = False
+    pool.release(3011, dead)
+    assert pool.idle.get("3011", []) == []
+
+    stuck = pool.acquire(3011)
+    pool.release(3011, stuck)
+    stuck.timeout = True
+    assert pool.acquire(3011) is not stuck
+    assert stuck.closed
+    assert pool.stats.to_dict()["discarded"] == 2
+
+    pool.release(3011, None)
+
+
+def test_sessions_of_failed_attacks_are_closed(pool):
+    ssh = pool.acquire(3011)
+    pool.release(3011, ssh, discard=True)
+    assert ssh.closed
+    assert pool.idle.get("3011", []) == []
+    assert pool.acquire(3011) is not ssh
+    assert pool.stats.to_dict()["discarded"] == 1
+
+
+def test_connections_are_retried_with_backoff(pool):
+    attempts = []
+    connect = pool.connect
+
+    def flaky_connect(port):
+        attempts.append(port)
+        if len(attempts) < 3:
+            raise pexpect.exceptions.EOF("connection refused")
+        return connect(port)
+    pool.connect = flaky_connect
+
+    pool.acquire(3011)
+
+    assert len(attempts) == 3
+    assert len(pool.sleeps) == 2
+    assert 0.5 <= pool.sleeps[0] <= 1.0 and 1.0 <= pool.sleeps[1] <= 2.0
+    assert pool.stats.to_dict()["failed_attempts"] == 2
+
+
+def test_unreachable_endpoint_raises(pool):
+    def refuse(port):
+        raise pexpect.exceptions.TIMEOUT("no prompt")
+    pool.connect = refuse
+
+    with pytest.raises(ConnectionError):
+        pool.acquire(3011)
+    assert len(pool.sleeps) == 2
+
+
+def test_close_all(pool):
+    sessions = [pool.acquire(3011), pool.acquire(3011), pool.acquire(3012)]
+    for ssh in sessions:
+        pool.release(3011, ssh)
+    pool.close_all()
+    assert all(ssh.closed for ssh in sessions)
+    assert pool.idle == {}
@@ -0,0 +1,92 @@
+import random
+import re
+
+from Red.terminal_buffer import OutputWindow, PromptDetector, TerminalOutput
+
+KALI_PROMPT = r'└─\x1b\[1;31m#'
+PATTERNS = [KALI_PROMPT, r' \x1b\[0m> ', 's password: ']
+
+
+def random_chunks(text, rng):
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + rng.randint(1, 40)
+        chunks.append(text[start:end])
+        start = end
+    return chunks
+
+
+def test_prompt_split_across_chunks_is_found():
+    detector = PromptDetector(PATTERNS)
+    assert detector.feed("total 0\n└─\x1b[1") is None
+    assert detector.feed(";31m# trailing") == len(";31m#")
+    assert detector.matched == "└─\x1b[1;31m#"
+
+
+def test_prompts_already_seen_are_not_found_again():
+    detector = PromptDetector(PATTERNS, overlap=16)
+    assert detector.feed("root@kali's password: ") is not None
+    detector.reset()
+    assert detector.matched == ""
+    assert detector.feed("x" * 5) is None
+    # the carried over output holds no prompt that ends in the new chunk
+    assert detector.feed("y") is None
+
+
+def test_incremental_detection_matches_a_full_search():
+    rng = random.Random(0)
+    prompts = ["└─\x1b[1;31m#", " \x1b[0m> ", "root@honeypot's password: "]
+    regex = re.compile("|".join(f"(?:{pattern})" for pattern in PATTERNS))
+    for _ in range(500):
+        text = "".join(rng.choice(["ls -la\n", "drwxr-xr-x 2 root root\n", "└─", "#", "> ", "\x1b[0m", "pass"])
+            for _ in range(rng.randint(0, 30)))
+        if rng.random() < 0.8:
+            text += rng.choice(prompts) + "after"
+        expected = regex.search(text)
+
+        detector = PromptDetector(PATTERNS)
+        consumed = 0
+        found = None
+        for chunk in random_chunks(text, rng):
+            end = detector.feed(chunk)
+            if end is not None:
+                found = consumed + end
+                break
+            consumed += len(chunk)
+
+        assert found == (expected.end() if expected else None)
+        if expected:
+            assert detector.matched == expected.group(0)
+
+
+def test_terminal_output_is_a_string_with_metadata():
+    output = TerminalOutput("done", dropped_chars=12, timed_out=True)
+    assert output == "done"
+    assert output.dropped_chars == 12 and output.timed_out
+    assert TerminalOutput("x").dropped_chars == 0 and not TerminalOutput("x").timed_out
+
+
+def test_output_window_matches_head_and_tail_of_the_full_output():
+    rng = random.Random(1)
+    for _ in range(500):
+        tail_chars = rng.randint(1, 50)
+        head_chars = rng.randint(0, 20)
+        window = OutputWindow(tail_chars, head_chars)
+        output = ""
+        for _ in range(rng.randint(0, 30)):
+            chunk = "".join(rng.choice("abc\n") for _ in range(rng.randint(0, 60)))
+            window.append(chunk)
+            output += chunk
+
+        head = output[:head_chars]
+        rest = output[head_chars:]
+        tail = rest[-tail_chars:] if rest else ""
+        dropped = len(rest) - len(tail)
+        assert window.text() == head + tail
+        assert window.total_dropped() == dropped
+        assert len(window.tail) <= 2 * tail_chars
+        if dropped:
+            assert window.text("[{dropped} dropped]") == f"{head}[{dropped} dropped]{tail}"
+        else:
+            assert window.text("[{dropped} dropped]") == output
